@@ -3,6 +3,8 @@ from component import NextPyComponent
 
 class TodoApp(NextPyComponent):
     template_path = 'todo_app.html'
+    immutable_state = True
+
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
         self.name = "Todo App"
@@ -14,7 +16,6 @@ class TodoApp(NextPyComponent):
             'todo-item': TodoItem
         }
         self.methods['add_todo'] = self.add_todo
-        self.methods['update_new_todo'] = self.update_new_todo
         self.methods['remove_todo'] = self.remove_todo
         self.methods['update_todo_status'] = self.update_todo_status
         self.methods['go_to_hello'] = self.go_to_hello
@@ -35,12 +36,6 @@ class TodoApp(NextPyComponent):
             })
             # Only updates the todo list and clears the input
 
-    def update_new_todo(self, value):
-        self.set_state({
-            **self.state,
-            'new_todo': value
-        }, rerender=False)
-
     def remove_todo(self, index):
         self.set_state({
             **self.state,
@@ -48,6 +43,4 @@ class TodoApp(NextPyComponent):
         })
 
     def update_todo_status(self, index, completed):
-        todos = self.state['todos'].copy()
-        todos[index]['completed'] = completed
-        self.set_state({'todos': todos})
+        self.set_state_in(['todos', index, 'completed'], completed)
@@ -0,0 +1,90 @@
+import asyncio
+import logging
+
+from PyQt6.QtCore import QObject, QTimer
+
+from batch import batch_updates
+
+
+class NextPyAsyncLoop(QObject):
+    """
+    Runs an asyncio event loop inside the Qt event loop, on the GUI thread.
+    While tasks are pending, a timer steps the asyncio loop without blocking, so coroutines can await I/O
+    and call set_state directly. State changes made during a step are batched into one render per component.
+    The timer stops when no task is pending, so an idle loop costs nothing.
+    """
+    def __init__(self, interval=5, parent=None):
+        """
+        Constructor for NextPyAsyncLoop
+        :param interval: milliseconds between two steps of the asyncio loop while tasks are pending
+        :param parent: the parent QObject
+        """
+        super().__init__(parent)
+        self.loop = asyncio.new_event_loop()
+        self._tasks = set()
+
+        self._timer = QTimer(self)
+        self._timer.setInterval(interval)
+        self._timer.timeout.connect(self.step)
+
+    def create_task(self, coroutine) -> asyncio.Task:
+        """
+        Schedule a coroutine
+        :param coroutine: the coroutine to run
+        :return: the task, which can be cancelled
+        """
+        task = self.loop.create_task(coroutine)
+        self._tasks.add(task)
+        task.add_done_callback(self._on_task_done)
+
+        if not self._timer.isActive():
+            self._timer.start()
+        return task
+
+    def step(self):
+        """Run every asyncio callback that is ready, without waiting"""
+        with batch_updates():
+            self.loop.call_soon(self.loop.stop)
+            self.loop.run_forever()
+
+        if not self._tasks:
+            self._timer.stop()
+
+    def run_until_complete(self, coroutine):
+        """
+        Run a coroutine to completion, blocking. Meant for tests and scripts, not for the GUI
+        :param coroutine: the coroutine to run
+        :return: the coroutine's result
+        """
+        task = self.create_task(coroutine)
+        while not task.done():
+            self.step()
+        return task.result()
+
+    def run_until_idle(self):
+        """
+        Run until every pending task is done, blocking. Meant for tests and scripts, not for the GUI
+        :return: void
+        """
+        while self._tasks:
+            self.step()
+
+    def _on_task_done(self, task):
+        self._tasks.discard(task)
+        if task.cancelled():
+            return
+
+        exception = task.exception()
+        if exception is not None:
+            logging.error("Unhandled exception in component task", exc_info=exception)
+
+
+_async_loop = None
+
+
+def async_loop() -> NextPyAsyncLoop:
+    """Get the asyncio loop shared by every component, creating it on first use"""
+    global _async_loop
+    if _async_loop is None:
+        _async_loop = NextPyAsyncLoop()
+    return _async_loop
@@ -0,0 +1,43 @@
+from contextlib import contextmanager
+
+# Components changed while batching, mapped to their state before the first change
+_pending = None
+
+
+@contextmanager
+def batch_updates():
+    """
+    Collect state changes and re-render every changed component once, when the outermost batch ends
+    e.g.
+        with batch_updates():
+            component.set_state({'loading': False})
+            component.set_state({'items': items})
+    """
+    global _pending
+    if _pending is not None:
+        # already inside a batch, the outer one renders
+        yield
+        return
+
+    _pending = {}
+    try:
+        yield
+    finally:
+        pending, _pending = _pending, None
+        for component, old_state in pending.items():
+            component._handle_state_change(old_state, component.state)
+
+
+def defer_state_change(component, old_state) -> bool:
+    """
+    Hold a state change until the current batch ends
+    :param component: the component whose state changed
+    :param old_state: the state before the change
+    :return: True if the change is batched, False if there is no batch and it should render now
+    """
+    if _pending is None:
+        return False
+
+    # keep the state from before the first change of this batch
+    _pending.setdefault(component, old_state)
+    return True
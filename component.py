@@ -1,11 +1,47 @@
-from typing import Dict, Any
+import asyncio
+import inspect
+from typing import Dict, Any, Iterable
 
+from async_loop import async_loop
+from batch import defer_state_change
 from lifecycle import NextPyComponentLifecycle
 from renderer import NextPyRenderer
+from scheduler import Priority
+from signals import NextPySignal, NextPyComputedSignal
+from snapshot import SNAPSHOT_VERSION, component_class_path, element_to_vnode, vnode_to_element
+from state import NextPyState, freeze, thaw, set_in, diff_paths
+from template_analyzer import template_metadata
+
+
+class NextPyMethods(dict):
+    """
+    The methods of a component by name.
+    async methods are wrapped so calling them, e.g. from a button, runs them as a task of the component
+    """
+    def __init__(self, component):
+        super().__init__()
+        self.component = component
+
+    def __setitem__(self, name, method):
+        if inspect.iscoroutinefunction(method):
+            method = self.component.wrap_async(method)
+        elif inspect.iscoroutinefunction(getattr(method, 'func', None)):
+            # rate limited methods keep the function they wrap in func and call it later, it is wrapped
+            # instead of the limiter so the coroutine created when the limiter fires runs too
+            method.func = self.component.wrap_async(method.func)
+        super().__setitem__(name, method)
+
+    def update(self, *args, **kwargs):
+        for name, method in dict(*args, **kwargs).items():
+            self[name] = method
 
 
 class NextPyComponent(NextPyComponentLifecycle):
     template_path = None
+    # The events this component emits, mapped from on_<event> attributes of its <component> tag
+    emits = []
+    # When True, state is kept in immutable NextPyState containers and changes are found by identity
+    immutable_state = False
     def __init__(self, template_path=None, template_engine=None, props=None, parent_component=None, events=None, main_widget=None, name=None, **kwargs):
         """
         Constructor for NextPyComponent
@@ -18,17 +54,20 @@ class NextPyComponent(NextPyComponentLifecycle):
         :param kwargs: any other keyword arguments are passed to the parent component.
         """
         self.template_path = template_path or self.template_path
-        self._state = {}
+        self._state = NextPyState() if self.immutable_state else {}
         self.name = name
         self.computed = {}
-        self.methods = {}
+        self.methods = NextPyMethods(self)
         self.components = {}
         self.refs = {}
-        self.emits = []
+        self.signals = {}
+        self.emits = list(self.emits)
         self.props = props or {}
         self.mapped_events = events
         self.template_engine = template_engine
         self.window = None
+        self._tasks = set()
+        self._unmounted = False
 
         self.main_widget = main_widget
         self.parent_component = parent_component
@@ -41,8 +80,11 @@ class NextPyComponent(NextPyComponentLifecycle):
         self.renderer.props = self.get_props
         self.renderer.state = self.get_state
 
-        self.renderer.component_did_mount = self.component_did_mount
+        self.renderer.component_did_mount = self._did_mount
         self.renderer.components = self.get_components
+        self.renderer.signals = self.get_signals
+        self.renderer.set_state_in = self.set_state_in
+        self.renderer.template_metadata = self.get_template_metadata
 
     def get_methods(self):
         """
@@ -79,6 +121,41 @@ class NextPyComponent(NextPyComponentLifecycle):
         """
         return self.components
 
+    def get_signals(self):
+        """
+        Get the signals of this component
+        :return: the signals of this component
+        """
+        return self.signals
+
+    def get_template_metadata(self):
+        """
+        Get the analysis of this component's template, analyzed the first time a component of this class renders it
+        :return: the NextPyTemplateMetadata of the template, None if it can't be analyzed
+        """
+        return template_metadata(self)
+
+    def create_signal(self, name: str, value: Any = None) -> NextPySignal:
+        """
+        Create a signal templates can bind to a widget property, e.g. <QLabel signal:text="name">.
+        Setting the signal updates the bound properties without re-rendering the component.
+        :param name: the name of the signal
+        :param value: the initial value
+        :return: the signal
+        """
+        self.signals[name] = NextPySignal(value, name=name)
+        return self.signals[name]
+
+    def create_computed_signal(self, name: str, func) -> NextPyComputedSignal:
+        """
+        Create a signal derived from other signals
+        :param name: the name of the signal
+        :param func: function computing the value, reading other signals with .get()
+        :return: the computed signal
+        """
+        self.signals[name] = NextPyComputedSignal(func, name=name)
+        return self.signals[name]
+
     def set_window(self, window):
         """
         Set the window reference for this component
@@ -103,8 +180,12 @@ class NextPyComponent(NextPyComponentLifecycle):
         :param value:
         :return:
         """
-        old_state = self._state.copy()
-        self._state = value
+        if self.immutable_state:
+            old_state = self._state
+            self._state = freeze(value)
+        else:
+            old_state = self._state.copy()
+            self._state = value
         self._handle_state_change(old_state, self._state)
 
     def render(self):
@@ -112,8 +193,30 @@ class NextPyComponent(NextPyComponentLifecycle):
         Render the component
         :return: void
         """
+        if self.template_engine is not None:
+            self.template_engine.track_component(self)
         return self.renderer.render()
 
+    def render_steps(self):
+        """
+        Render the component one element at a time, see NextPyRenderer.render_steps
+        :return: generator returning the component widget
+        """
+        if self.template_engine is not None:
+            self.template_engine.track_component(self)
+        return self.renderer.render_steps()
+
+    def render_sliced(self, priority=Priority.BACKGROUND, on_progress=None):
+        """
+        Render the component over several event loop ticks, see NextPyRenderer.render_sliced
+        :param priority: the scheduler priority
+        :param on_progress: optional function called with (elements created, total elements)
+        :return: a placeholder widget, replaced by the rendered tree once complete
+        """
+        if self.template_engine is not None:
+            self.template_engine.track_component(self)
+        return self.renderer.render_sliced(priority=priority, on_progress=on_progress)
+
     def set_state(self, new_state: Dict[str, Any], rerender=True):
         """
         Set the state of this component
@@ -121,12 +224,82 @@ class NextPyComponent(NextPyComponentLifecycle):
         :param rerender: if rerender is False, will not rerender state
         :return: void
         """
-        old_state = self._state.copy()
-        self._state.update(new_state)
+        if self.immutable_state:
+            old_state = self._state
+            self._state = self._state.merge(new_state)
+        else:
+            old_state = self._state.copy()
+            self._state.update(new_state)
 
         if rerender is True:
             self._handle_state_change(old_state, self._state)
 
+    def set_state_in(self, path: Iterable, value: Any, rerender=True):
+        """
+        Set a nested value of the state, copying only the containers along the path instead of mutating them
+        e.g. self.set_state_in(['todos', 0, 'completed'], True)
+        :param path: the keys/indexes leading to the value
+        :param value: the new value
+        :param rerender: if rerender is False, will not rerender state
+        :return: void
+        """
+        path = list(path)
+        key, rest = path[0], path[1:]
+        # a single key may not be in the state yet, e.g. bind:value="state.new_field"
+        if rest:
+            value = set_in(self._state[key], rest, value)
+        self.set_state({key: value}, rerender=rerender)
+
+    def snapshot(self, include_vnodes=True) -> Dict[str, Any]:
+        """
+        Snapshot this component and its mounted children: class, state, props, signals and, optionally,
+        the last rendered element tree. Serialize it with snapshot.dumps.
+        State, props and signal values must be JSON values: dicts, lists, strings, numbers, booleans or None.
+        dumps rejects anything else, e.g. a NextPyDataSource, keep those out of the state or rebuild them on restore
+        :param include_vnodes: if include_vnodes is True, restoring rebuilds the widgets without running the templates
+        :return: JSON friendly snapshot
+        """
+        snapshot = {
+            'version': SNAPSHOT_VERSION,
+            'component': component_class_path(type(self)),
+            'state': thaw(self._state),
+            'props': thaw(self.props),
+            'signals': {
+                name: signal.get() for name, signal in self.signals.items()
+                if not isinstance(signal, NextPyComputedSignal)
+            },
+            'children': [
+                [component_id, child.snapshot(include_vnodes=include_vnodes)]
+                for component_id, child in self.renderer.mounted_child_components()
+            ],
+        }
+
+        root_element = self.renderer.widget_element_data.get(self.renderer.main_widget)
+        if include_vnodes and root_element is not None:
+            snapshot['vnode'] = element_to_vnode(root_element)
+
+        return snapshot
+
+    def load_snapshot(self, snapshot: Dict[str, Any]):
+        """
+        Restore state and signals from a snapshot. The next render uses the snapshot's element tree, if it has one,
+        and restores the child components from their own snapshots
+        :param snapshot: the snapshot created by snapshot()
+        :return: void
+        """
+        self.set_state(snapshot['state'], rerender=False)
+        for name, value in snapshot.get('signals', {}).items():
+            if name in self.signals:
+                self.signals[name].set(value)
+
+        restored_children = {}
+        for component_id, child_snapshot in snapshot['children']:
+            restored_children.setdefault(component_id, []).append(child_snapshot)
+        self.renderer.restored_children = restored_children
+
+        if snapshot.get('vnode'):
+            self.renderer.restored_root_element = vnode_to_element(snapshot['vnode'])
+
     def emit_event(self, event, *args, **kwargs):
         """
         Emit an event to this component
@@ -136,8 +309,75 @@ class NextPyComponent(NextPyComponentLifecycle):
         if event in self.mapped_events:
             self.mapped_events[event](*args, **kwargs)
 
+    def run_async(self, coroutine) -> asyncio.Task:
+        """
+        Run a coroutine on the shared asyncio loop. It is cancelled when this component unmounts.
+        set_state calls made from it are batched into one render per loop step
+        :param coroutine: the coroutine to run
+        :return: the task
+        """
+        task = async_loop().create_task(coroutine)
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        return task
+
+    def wrap_async(self, method):
+        """
+        Wrap an async method so calling it runs it as a task of this component
+        :param method: the async method
+        :return: function returning the task
+        """
+        def run(*args, **kwargs):
+            result = method(*args, **kwargs)
+            if inspect.iscoroutine(result):
+                return self.run_async(result)
+            return result
+
+        return run
+
+    def unmount(self):
+        """
+        Unmount this component and its child components: release their widgets, elements and registries,
+        cancel pending tasks and call component_did_unmount. Calling it again does nothing
+        :return: void
+        """
+        if self._unmounted:
+            return
+        self._unmounted = True
+
+        # unmounts the child components as well
+        self.renderer.unmount()
+
+        for task in list(self._tasks):
+            task.cancel()
+
+        if self.template_engine is not None:
+            self.template_engine.untrack_component(self)
+
+        result = self.component_did_unmount()
+        if inspect.iscoroutine(result):
+            async_loop().create_task(result)
+
+    def _did_mount(self):
+        """Call component_did_mount, running it as a task if it is async"""
+        self._unmounted = False
+        result = self.component_did_mount()
+        if inspect.iscoroutine(result):
+            self.run_async(result)
+
     def _handle_state_change(self, old_state: Dict[str, Any], new_state: Dict[str, Any]):
         """Handle state changes and trigger selective updates"""
+        if defer_state_change(self, old_state):
+            return
+
+        if isinstance(old_state, NextPyState) and isinstance(new_state, NextPyState):
+            # Unchanged values are shared between states, so identity is enough
+            changed_paths = diff_paths(old_state, new_state)
+            changed_keys = {path[0] for path in changed_paths}
+            if changed_keys:
+                self.renderer.rerender_component(changed_keys, changed_paths=changed_paths)
+            return
+
         changed_keys = set()
         for key in set(old_state.keys()) | set(new_state.keys()):
             if old_state.get(key) != new_state.get(key):
@@ -148,7 +388,7 @@ class NextPyComponent(NextPyComponentLifecycle):
 
     def component_did_mount(self) -> None:
         """
-        Mount this component
+        Mount this component. May be async, e.g. to fetch data, in which case it runs as a task of this component
         :return: void
         """
         pass
@@ -6,6 +6,14 @@ class HelloWorldApp(NextPyComponent):
         super().__init__(*args, **kwargs)
         self.name = "Hello World App"
         self.methods["redirect_todo"] = self.redirect_todo
+        self.methods["count_click"] = self.count_click
+
+        # Signals update their bound label directly, without re-rendering the template
+        self.clicks = self.create_signal("clicks", 0)
+        self.create_computed_signal("clicks_label", lambda: f"Clicked {self.clicks.get()} times")
 
     def redirect_todo(self):
-        self.window.navigate_to("todo_app")
\ No newline at end of file
+        self.window.navigate_to("todo_app")
+
+    def count_click(self):
+        self.clicks.update(lambda clicks: clicks + 1)
\ No newline at end of file
@@ -0,0 +1,195 @@
+import os
+from collections.abc import Mapping
+from typing import Callable, Dict, Iterable, List
+
+# Kinds of changes passed to NextPyDataSource subscribers, with the (start, stop) range of rows
+CHANGED = 'changed'
+INSERTED = 'inserted'
+RESET = 'reset'
+
+
+def _python_value(value):
+    """Convert NumPy scalars into plain python values, so templates and Qt can use them"""
+    return value.item() if hasattr(value, 'item') and hasattr(value, 'dtype') else value
+
+
+class NextPyRowView(Mapping):
+    """
+    A row of a NextPyDataSource. Reads its values from the columns when accessed, nothing is copied.
+    Views are created on access and read whatever the columns hold, until the source is replaced.
+    """
+    __slots__ = ('_source', '_index')
+
+    def __init__(self, source: "NextPyDataSource", index: int):
+        self._source = source
+        self._index = index
+
+    def __getitem__(self, column):
+        return _python_value(self._source.column(column)[self._index])
+
+    def __iter__(self):
+        return iter(self._source.column_names)
+
+    def __len__(self):
+        return len(self._source.column_names)
+
+    def __repr__(self):
+        return f"{self.__class__.__name__}({self._index}, {dict(self)!r})"
+
+
+class NextPyDataSource:
+    """
+    Rows stored as columns, e.g. NumPy arrays or memory-mapped files, that list and table elements bind to
+    e.g. self.state = {'rows': NextPyDataSource.from_npy('data/')} and <QTable bind:rows="state.rows" columns="a,b"/>.
+    Rows are views created on access and never copied into dicts. Changes are notified by row range,
+    so bound elements update the changed rows without comparing the others.
+    Kept as is in immutable state: writing to the source does not re-render the component.
+    """
+    def __init__(self, columns: Mapping):
+        """
+        Constructor for NextPyDataSource
+        :param columns: mapping of column name to an indexable column of the same length: NumPy array,
+            memmap, array.array, list...
+        """
+        self._columns: Dict[str, object] = dict(columns)
+        self._check_lengths()
+        self._subscribers = []
+
+    @classmethod
+    def from_structured(cls, array) -> "NextPyDataSource":
+        """
+        Create a source over a NumPy structured array or record memmap, each field viewed as a column without copying
+        :param array: the structured array
+        :return: the data source
+        """
+        return cls({name: array[name] for name in array.dtype.names})
+
+    @classmethod
+    def from_npy(cls, path: str, columns: Iterable[str] = None, mmap_mode='r') -> "NextPyDataSource":
+        """
+        Create a source over a directory holding one <column>.npy file per column, memory mapped so only the
+        rows that are read are loaded. A single .npy file holding a structured array is also accepted
+        :param path: the directory or .npy file
+        :param columns: the columns to load, defaults to every .npy file of the directory
+        :param mmap_mode: the NumPy memory map mode, 'r+' to write changes back to the files
+        :return: the data source
+        """
+        import numpy
+
+        if os.path.isfile(path):
+            return cls.from_structured(numpy.load(path, mmap_mode=mmap_mode))
+
+        if columns is None:
+            columns = sorted(name[:-4] for name in os.listdir(path) if name.endswith('.npy'))
+        return cls({name: numpy.load(os.path.join(path, f"{name}.npy"), mmap_mode=mmap_mode) for name in columns})
+
+    def _check_lengths(self):
+        lengths = {len(column) for column in self._columns.values()}
+        if len(lengths) > 1:
+            raise ValueError(f"Columns must have the same length, got {sorted(lengths)}")
+
+    @property
+    def column_names(self) -> List[str]:
+        return list(self._columns)
+
+    def column(self, name: str):
+        """Get a column as stored, e.g. the NumPy array"""
+        return self._columns[name]
+
+    def __len__(self):
+        return len(next(iter(self._columns.values()))) if self._columns else 0
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [NextPyRowView(self, row) for row in range(*index.indices(len(self)))]
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError(f"Row {index} out of range")
+        return NextPyRowView(self, index)
+
+    def __iter__(self):
+        for index in range(len(self)):
+            yield NextPyRowView(self, index)
+
+    def __repr__(self):
+        return f"{self.__class__.__name__}({len(self)} rows, columns={self.column_names})"
+
+    def subscribe(self, callback: Callable[[str, int, int], None]) -> Callable[[], None]:
+        """
+        Call callback(kind, start, stop) when rows change, kind being one of CHANGED, INSERTED or RESET
+        :param callback: the callback to call
+        :return: a function that unsubscribes the callback
+        """
+        self._subscribers.append(callback)
+
+        def unsubscribe():
+            if callback in self._subscribers:
+                self._subscribers.remove(callback)
+
+        return unsubscribe
+
+    def _notify(self, kind, start, stop):
+        for callback in list(self._subscribers):
+            callback(kind, start, stop)
+
+    def notify_changed(self, start: int, stop: int):
+        """
+        Notify that rows start to stop (excluded) were changed in place, e.g. by writing to the columns directly
+        :return: void
+        """
+        if stop > start:
+            self._notify(CHANGED, start, stop)
+
+    def set(self, index: int, column: str, value):
+        """
+        Write a single value and notify the change
+        :param index: the row
+        :param column: the column name
+        :param value: the new value
+        :return: void
+        """
+        self._columns[column][index] = value
+        self._notify(CHANGED, index, index + 1)
+
+    def set_range(self, start: int, column: str, values):
+        """
+        Write consecutive values of a column and notify the change once
+        :param start: the first row
+        :param column: the column name
+        :param values: the new values
+        :return: void
+        """
+        stop = start + len(values)
+        self._columns[column][start:stop] = values
+        self.notify_changed(start, stop)
+
+    def extend(self, columns: Mapping):
+        """
+        Append a batch of rows. Columns are concatenated, which copies them once per batch
+        :param columns: mapping of column name to the new values, for every column
+        :return: void
+        """
+        start = len(self)
+        for name, column in self._columns.items():
+            self._columns[name] = _concatenate(column, columns[name])
+        self._check_lengths()
+        if len(self) > start:
+            self._notify(INSERTED, start, len(self))
+
+    def replace(self, columns: Mapping):
+        """
+        Replace every column, e.g. with the next record batch
+        :param columns: mapping of column name to column
+        :return: void
+        """
+        self._columns = dict(columns)
+        self._check_lengths()
+        self._notify(RESET, 0, len(self))
+
+
+def _concatenate(column, values):
+    if hasattr(column, 'dtype'):
+        import numpy
+        return numpy.concatenate([column, numpy.asarray(values, dtype=column.dtype)])
+    return column + type(column)(values)
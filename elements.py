@@ -1,4 +1,5 @@
 # elements.py
+from PyQt6 import sip
 from PyQt6.QtCore import Qt
 from PyQt6.QtWidgets import (
     QWidget, QVBoxLayout, QHBoxLayout, QPushButton,
@@ -6,21 +7,169 @@ from PyQt6.QtWidgets import (
 )
 from PyQt6.QtGui import QFont, QPalette
 
+import importlib
+from functools import lru_cache
+from typing import Optional
+
+from rate_limit import rate_limit
+from scheduler import scheduler
 from utils import is_value_true, parse_method_call
 import logging
 
 
+@lru_cache(maxsize=1024)
+def parse_stylesheet(styles: str) -> str:
+    """
+    Convert a style attribute into a Qt stylesheet.
+    Cached, as list items usually share the same few style strings
+    """
+    style_dict = {}
+
+    styles = styles.split(';')
+    for style in styles:
+        if style:
+            key, value = style.split(':')
+            style_dict[key.strip()] = value.strip()
+
+    stylesheet_parts = []
+    for key, value in style_dict.items():
+        stylesheet_parts.append(f"{key}: {value};")
+
+    return ' '.join(stylesheet_parts)
+
+
+def build_stylesheet(style_dict: dict) -> str:
+    """Convert a style dictionary to a Qt stylesheet string."""
+    if not style_dict:
+        return ""
+    # Convert camelCase keys to kebab-case and build stylesheet parts
+    stylesheet_parts = [
+        f"{''.join(f'-{c.lower()}' if c.isupper() else c for c in key).lstrip('-')}: {value};"
+        for key, value in style_dict.items()
+    ]
+    return ' '.join(stylesheet_parts)
+
+
 class NextPyElement:
+    # Widget setters used to bind signals to properties, e.g. <QLabel signal:text="count">
+    PROPERTY_SETTERS = {
+        'text': 'setText',
+        'checked': 'setChecked',
+        'value': 'setValue',
+        'placeholder': 'setPlaceholderText',
+        'enabled': 'setEnabled',
+        'visible': 'setVisible',
+        'style': 'setStyleSheet',
+    }
+
+    # Attributes applied when they change on re-render, by name of the element method applying them.
+    # Subclasses only declare their own, the ones of base classes are merged into attribute_dispatch
+    ATTRIBUTE_SETTERS = {
+        'style': '_update_style',
+        'disabled': '_update_disabled',
+        'hidden': '_update_hidden',
+    }
+
+    # Widget method showing the element content, e.g. 'setText'. None if the content is not shown
+    CONTENT_SETTER = None
+
+    # Attributes the element can't be created without, checked by the template analyzer
+    REQUIRED_ATTRIBUTES = ()
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        cls.attribute_dispatch = cls._build_attribute_dispatch()
+
+    @classmethod
+    def _build_attribute_dispatch(cls) -> dict:
+        """Resolve the ATTRIBUTE_SETTERS of the class and its bases to attribute name -> function, once per class"""
+        setters = {}
+        for klass in reversed(cls.__mro__):
+            setters.update(klass.__dict__.get('ATTRIBUTE_SETTERS', {}))
+        return {name: getattr(cls, method) for name, method in setters.items()}
+
     def __init__(self, element):
         self.element = element
+        # The engine of the component template, set by the renderer for elements rendering templates of their own
+        self.template_engine = None
+        # The analysis of the component template, set by the renderer, see template_analyzer
+        self.template_metadata = None
+        self.attributes = {}
+        self.content = ''
         self.listeners = []
         self.widget = None
         self.callback_name = None
         self.callback_params = None
+        self.callback_modifiers = []
+        self.signal_bindings = []
+        self.bound_path = None
+        self.bound_write = None
+        self.connections = []
 
     def add_listener(self, listener):
         self.listeners.append(listener)
 
+    def connect(self, signal, slot):
+        """Connect a Qt signal of the widget, remembering it so destroy can disconnect it"""
+        signal.connect(slot)
+        self.connections.append((signal, slot))
+
+    def destroy(self):
+        """
+        Release everything keeping this element reachable: signal connections, signal bindings,
+        pending rate limited calls and listeners. Called when its widget leaves the tree
+        """
+        for signal, slot in self.connections:
+            try:
+                signal.disconnect(slot)
+            except (TypeError, RuntimeError):
+                # already disconnected, or the widget is gone
+                pass
+        self.connections = []
+
+        for unsubscribe in self.signal_bindings:
+            unsubscribe()
+        self.signal_bindings = []
+
+        for callback in self.listeners + [self.bound_write]:
+            if hasattr(callback, 'cancel'):
+                callback.cancel()
+        self.listeners = []
+        self.bound_write = None
+        self.widget = None
+
+    def set_property(self, name, value):
+        """Set a single widget property"""
+        if name == 'text':
+            value = str(value)
+        elif name in ('checked', 'enabled', 'visible'):
+            value = bool(value)
+
+        setter = self.PROPERTY_SETTERS.get(name)
+        if setter and hasattr(self.widget, setter):
+            getattr(self.widget, setter)(value)
+        else:
+            self.widget.setProperty(name, value)
+
+    def bind_signal(self, name, signal):
+        """Keep a widget property in sync with a signal, bypassing the template render"""
+        def on_change(value):
+            if self.widget is None or sip.isdeleted(self.widget):
+                unsubscribe()
+                return
+            self.set_property(name, value)
+
+        unsubscribe = signal.subscribe(on_change)
+        self.signal_bindings.append(unsubscribe)
+
+    def bind_value(self, name, path, value, write, modifiers=()):
+        """Two-way bind a widget property to a state path, rate limiting writes with debounce/throttle modifiers"""
+        raise ValueError(f"{self.__class__.__name__} does not support bind:{name}")
+
+    def set_bound_value(self, value):
+        """Push a new state value into the bound widget property"""
+        pass
+
     def create_widget(self):
         if hasattr(self.element, 'style'):
             self.apply_styles(self.element.get('style'))
@@ -29,7 +178,84 @@ class NextPyElement:
 
     def attach_callback(self, methods: dict):
         if self.callback_name in methods:
-            self.add_listener(methods[self.callback_name])
+            self.add_listener(rate_limit(methods[self.callback_name], self.callback_modifiers))
+
+    def update_attributes(self, new_attributes: dict, methods: dict):
+        """
+        Apply the attributes that changed since the last render through the class dispatch table.
+        Removed attributes are applied with None.
+        :param new_attributes: the new attributes of the element
+        :param methods: the component methods, to re-attach changed callbacks
+        :return: void
+        """
+        old_attributes = self.attributes or {}
+        applied = set()
+        names = list(new_attributes) + [name for name in old_attributes if name not in new_attributes]
+        for name in names:
+            value = new_attributes.get(name)
+            if value == old_attributes.get(name):
+                continue
+
+            # on_click.debounce.200 is applied by the on_click setter
+            setter = self.attribute_dispatch.get(name.split('.')[0])
+            if setter is not None and setter not in applied:
+                applied.add(setter)
+                setter(self, value, methods)
+
+        self.attributes = new_attributes
+
+    def update_content(self, content: str):
+        """Show new content, if the element shows its content"""
+        if content == self.content:
+            return
+        if self.CONTENT_SETTER is not None:
+            getattr(self.widget, self.CONTENT_SETTER)(content)
+        self.content = content
+
+    def _update_style(self, style, methods):
+        if isinstance(style, dict):
+            self.widget.setStyleSheet(build_stylesheet(style))
+        elif style is None:
+            self.widget.setStyleSheet('')
+        else:
+            self.apply_styles(style)
+
+    def _update_disabled(self, disabled, methods):
+        self.widget.setEnabled(disabled is None or not is_value_true(disabled))
+
+    def _update_hidden(self, hidden, methods):
+        self.widget.setVisible(hidden is None or not is_value_true(hidden))
+
+    def _reattach_callback(self, methods: dict):
+        """Replace the listeners after the callback attribute changed"""
+        for listener in self.listeners:
+            if hasattr(listener, 'cancel'):
+                listener.cancel()
+        self.listeners.clear()
+        self.attach_callback(methods)
+
+    def get_event_attribute(self, name):
+        """
+        Get an event attribute and its modifiers, e.g. on_change.debounce.200="update" gives ("update", ["debounce", "200"])
+        :param name: the event attribute name, e.g. on_change
+        :return: tuple of the attribute value and its modifiers
+        """
+        for attribute, value in self.element.attrs.items():
+            if attribute == name:
+                return value, []
+            if attribute.startswith(name + '.'):
+                return value, attribute.split('.')[1:]
+        return None, []
+
+    def parse_handler(self, value):
+        """
+        Parse a handler attribute, e.g. "remove(1)" gives ("remove", ["1"]), taken from the template metadata
+        when the template has the value literally
+        :param value: the attribute value
+        :return: tuple of the method name and its params, as parse_method_call gives them
+        """
+        handler = self.template_metadata.handlers.get(value) if self.template_metadata is not None else None
+        return handler if handler is not None else parse_method_call(value)
 
     def apply_styles(self, styles):
         """Apply styles to the widget"""
@@ -39,33 +265,30 @@ class NextPyElement:
         if styles is None:
             return
 
-        style_dict = {}
-
-        styles = styles.split(';')
-        for style in styles:
-            if style:
-                key, value = style.split(':')
-                style_dict[key.strip()] = value.strip()
-
-        stylesheet_parts = []
-        for key, value in style_dict.items():
-            stylesheet_parts.append(f"{key}: {value};")
-
-        if stylesheet_parts:
-            self.widget.setStyleSheet(' '.join(stylesheet_parts))
+        stylesheet = parse_stylesheet(styles)
+        if stylesheet:
+            self.widget.setStyleSheet(stylesheet)
 
 
 class NextPyButtonElement(NextPyElement):
+    ATTRIBUTE_SETTERS = {
+        'text': '_update_text',
+        'on_click': '_update_on_click',
+    }
+    CONTENT_SETTER = 'setText'
+    REQUIRED_ATTRIBUTES = ('on_click',)
+
     def create_widget(self):
         self.widget = QPushButton(self.element.get_text(strip=True) or "Button")
 
         try:
             # get the func name of the callback
-            self.callback_name, self.callback_params = parse_method_call(self.element.get("on_click"))
+            on_click, self.callback_modifiers = self.get_event_attribute("on_click")
+            self.callback_name, self.callback_params = self.parse_handler(on_click)
         except AttributeError:
             raise ValueError("Button element must have a 'on_click' attribute")
 
-        self.widget.clicked.connect(lambda: self._on_click(self.callback_params))
+        self.connect(self.widget.clicked, lambda: self._on_click(self.callback_params))
 
         return super().create_widget()
 
@@ -73,8 +296,19 @@ class NextPyButtonElement(NextPyElement):
         for listener in self.listeners:
             listener(*params)
 
+    def _update_text(self, text, methods):
+        if text is not None:
+            self.widget.setText(text)
+
+    def _update_on_click(self, _value, methods):
+        on_click, self.callback_modifiers = self.get_event_attribute("on_click")
+        self.callback_name, self.callback_params = self.parse_handler(on_click) if on_click else (None, [])
+        self._reattach_callback(methods)
+
 
 class NextPyLabelElement(NextPyElement):
+    CONTENT_SETTER = 'setText'
+
     def create_widget(self):
         text = self.element.text.strip() if self.element.text else ""
         self.widget = QLabel(text)
@@ -83,6 +317,12 @@ class NextPyLabelElement(NextPyElement):
 
 
 class NextPyInputElement(NextPyElement):
+    ATTRIBUTE_SETTERS = {
+        'placeholder': '_update_placeholder',
+        'value': '_update_value',
+        'on_change': '_update_on_change',
+    }
+
     def create_widget(self):
         self.widget = QLineEdit()
         self.palette = QPalette()
@@ -91,7 +331,7 @@ class NextPyInputElement(NextPyElement):
 
         try:
             # get the func name of the callback
-            self.callback_name = self.element.get("on_change")
+            self.callback_name, self.callback_modifiers = self.get_event_attribute("on_change")
         except AttributeError as e:
             raise ValueError(
                 f"{self.__class__.__name__} element is missing required attribute. "
@@ -104,7 +344,7 @@ class NextPyInputElement(NextPyElement):
         if self.element.get('placeholder'):
             self.widget.setPlaceholderText(self.element.get('placeholder'))
 
-        self.widget.textChanged.connect(lambda x: self._on_value_changed(x))
+        self.connect(self.widget.textChanged, lambda x: self._on_value_changed(x))
 
         return super().create_widget()
 
@@ -112,6 +352,65 @@ class NextPyInputElement(NextPyElement):
         for listener in self.listeners:
             listener(value)
 
+    def _update_placeholder(self, placeholder, methods):
+        self.widget.setPlaceholderText(placeholder or '')
+
+    def _update_value(self, value, methods):
+        # Skip setting the text the input already shows, so the cursor does not jump
+        if value is not None and value != self.widget.text():
+            self.widget.setText(value)
+
+    def _update_on_change(self, _value, methods):
+        self.callback_name, self.callback_modifiers = self.get_event_attribute("on_change")
+        self._reattach_callback(methods)
+
+    def bind_value(self, name, path, value, write, modifiers=()):
+        if name != 'value':
+            return super().bind_value(name, path, value, write, modifiers)
+
+        self.bound_path = path
+        self._write_state = write
+        self.bound_write = rate_limit(self._write_bound_value, modifiers)
+        self._bound_state_value = value
+        self._set_text(value)
+        self.connect(self.widget.textChanged, self._on_bound_value_changed)
+        # Write waiting text as soon as the user leaves the input, e.g. to click a button using it
+        if hasattr(self.bound_write, 'flush'):
+            self.connect(self.widget.editingFinished, self.bound_write.flush)
+
+    def set_bound_value(self, value):
+        # Unchanged state means this re-render did not come from a change to the bound value,
+        # the input may still hold newer text waiting for a debounced write
+        if value == self._bound_state_value:
+            return
+
+        # The state was changed elsewhere, it wins over any text still waiting to be written
+        self._bound_state_value = value
+        if hasattr(self.bound_write, 'cancel'):
+            self.bound_write.cancel()
+        self._set_text(value)
+
+    def _set_text(self, value):
+        value = '' if value is None else str(value)
+        # Setting the text the input already shows would move the cursor
+        if value == self.widget.text():
+            return
+
+        self._setting_bound_value = True
+        try:
+            self.widget.setText(value)
+        finally:
+            self._setting_bound_value = False
+
+    def _on_bound_value_changed(self, value):
+        # Ignore the echo of a value that came from the state
+        if not getattr(self, '_setting_bound_value', False):
+            self.bound_write(value)
+
+    def _write_bound_value(self, value):
+        self._bound_state_value = value
+        self._write_state(value)
+
 
 class NextPyDivElement(NextPyElement):
     ALIGNMENT_TYPES = {
@@ -184,22 +483,157 @@ class NextPyDivElement(NextPyElement):
         return layout
 
 class NextPyCheckboxElement(NextPyElement):
+    ATTRIBUTE_SETTERS = {
+        'checked': '_update_checked',
+        'on_checked': '_update_on_checked',
+    }
+    REQUIRED_ATTRIBUTES = ('on_checked',)
+
     def create_widget(self):
         self.widget = QCheckBox()
 
         try:
             # get the func name of the callback
-            self.callback_name, self.callback_params = parse_method_call(self.element.get("on_checked"))
+            on_checked, self.callback_modifiers = self.get_event_attribute("on_checked")
+            self.callback_name, self.callback_params = self.parse_handler(on_checked)
         except AttributeError:
             raise ValueError("Button element must have a 'on_checked' attribute")
 
         if self.element.get("checked"):
             self.widget.setChecked(is_value_true(self.element.get("checked")))
 
-        self.widget.clicked.connect(lambda: self._on_checked(self.callback_params))
+        self.connect(self.widget.clicked, lambda: self._on_checked(self.callback_params))
 
         return super().create_widget()
 
     def _on_checked(self, params):
         for listener in self.listeners:
             listener(*params)
+
+    def _update_checked(self, checked, methods):
+        if checked is not None:
+            self.widget.setChecked(is_value_true(checked))
+
+    def _update_on_checked(self, _value, methods):
+        on_checked, self.callback_modifiers = self.get_event_attribute("on_checked")
+        self.callback_name, self.callback_params = self.parse_handler(on_checked) if on_checked else (None, [])
+        self._reattach_callback(methods)
+
+
+class NextPySuspenseElement(NextPyDivElement):
+    """
+    Container showing a fallback while its children are created over later event loop ticks
+    e.g. <suspense fallback="Loading..."> ... </suspense>
+    """
+    def create_widget(self):
+        super().create_widget()
+        self.pending = []
+        self.fallback_widget = QLabel(self.element.get('fallback') or '')
+        self.add_child(self.fallback_widget)
+        return self.widget
+
+    def resolve(self):
+        """Remove the fallback once every child has been attached"""
+        self.pending = []
+        if self.fallback_widget is not None:
+            self.widget.layout().removeWidget(self.fallback_widget)
+            self.fallback_widget.deleteLater()
+            self.fallback_widget = None
+
+    def cancel_pending(self):
+        """Cancel children not attached yet, the caller creates them instead"""
+        for handle in self.pending:
+            scheduler().cancel(handle)
+        self.resolve()
+
+    def destroy(self):
+        # children waiting to be attached would keep this element alive
+        for handle in self.pending:
+            scheduler().cancel(handle)
+        self.pending = []
+        self.fallback_widget = None
+        super().destroy()
+
+
+NextPyElement.attribute_dispatch = NextPyElement._build_attribute_dispatch()
+
+
+class NextPyElementRegistry:
+    """
+    Maps template tags to element classes, shared by every renderer.
+    A class can be registered by import path, e.g. 'charts:NextPyChartElement',
+    so its module, and the Qt modules it needs, are only imported the first time a template uses the tag.
+    """
+    def __init__(self):
+        self._classes = {}
+
+    def register(self, tag: str, element_class):
+        """
+        Register the element class creating the widgets of a tag
+        :param tag: the template tag, case insensitive
+        :param element_class: a NextPyElement subclass, or its 'module:ClassName' import path
+        :return: void
+        """
+        if not isinstance(element_class, str) and not (
+                isinstance(element_class, type) and issubclass(element_class, NextPyElement)):
+            raise TypeError(f"Element class for '{tag}' must be a NextPyElement subclass or an import path")
+        self._classes[tag.lower()] = element_class
+
+    def get(self, tag: str) -> Optional[type]:
+        """
+        Get the element class of a tag, importing it if it was registered by import path
+        :param tag: the template tag, case insensitive
+        :return: the element class, None for unknown tags
+        """
+        tag = tag.lower()
+        element_class = self._classes.get(tag)
+        if isinstance(element_class, str):
+            module_name, class_name = element_class.split(':')
+            element_class = getattr(importlib.import_module(module_name), class_name)
+            self._classes[tag] = element_class
+        return element_class
+
+    def tags(self):
+        """The registered tags"""
+        return list(self._classes)
+
+    def __contains__(self, tag):
+        return tag.lower() in self._classes
+
+
+element_registry = NextPyElementRegistry()
+
+
+def register_element(tag: str, element_class=None):
+    """
+    Register an element class for a template tag, without editing the renderer.
+    Also usable as a class decorator
+    e.g.
+        @register_element('qslider')
+        class NextPySliderElement(NextPyElement): ...
+    or, importing the module on first use:
+        register_element('qslider', 'sliders:NextPySliderElement')
+    :param tag: the template tag, case insensitive
+    :param element_class: a NextPyElement subclass or its 'module:ClassName' import path
+    :return: the element class, or the decorator if element_class is not given
+    """
+    if element_class is None:
+        def decorator(cls):
+            element_registry.register(tag, cls)
+            return cls
+        return decorator
+
+    element_registry.register(tag, element_class)
+    return element_class
+
+
+register_element('qpushbutton', NextPyButtonElement)
+register_element('qlabel', NextPyLabelElement)
+register_element('qlineedit', NextPyInputElement)
+register_element('qwidget', NextPyDivElement)
+register_element('qcheckbox', NextPyCheckboxElement)
+register_element('suspense', NextPySuspenseElement)
+register_element('qtable', 'table_elements:NextPyTableElement')
+register_element('qtree', 'table_elements:NextPyTreeElement')
+register_element('qlist', 'table_elements:NextPyListElement')
+register_element('qimage', 'image_elements:NextPyImageElement')
@@ -0,0 +1,91 @@
+import logging
+import os
+
+from PyQt6.QtCore import QObject, QFileSystemWatcher, QTimer
+
+
+class NextPyTemplateWatcher(QObject):
+    """
+    Watches a template directory and hot reloads changed templates without restarting the app.
+    Uses QFileSystemWatcher (inotify on linux), so an idle watcher costs nothing.
+    """
+    def __init__(self, template_engine, extensions=('.html',), delay=50, parent=None):
+        """
+        Constructor for NextPyTemplateWatcher
+        :param template_engine: the NextPyTemplate whose templates are watched
+        :param extensions: the file extensions that count as templates
+        :param delay: milliseconds to wait for an editor to finish writing before reloading
+        :param parent: the parent QObject
+        """
+        super().__init__(parent)
+        self.template_engine = template_engine
+        self.template_dir = os.path.abspath(template_engine.template_dir)
+        self.extensions = tuple(extensions)
+
+        self._mtimes = {}
+        self._pending = set()
+
+        self._timer = QTimer(self)
+        self._timer.setSingleShot(True)
+        self._timer.setInterval(delay)
+        self._timer.timeout.connect(self._flush)
+
+        self._watcher = QFileSystemWatcher(self)
+        self._watcher.fileChanged.connect(self._on_file_changed)
+        self._watcher.directoryChanged.connect(self._on_directory_changed)
+
+        self._scan(self.template_dir, reload=False)
+
+    def _scan(self, directory, reload=True):
+        """Watch a directory, its sub directories and templates, queueing templates that changed"""
+        if directory not in self._watcher.directories():
+            self._watcher.addPath(directory)
+
+        for entry in os.scandir(directory):
+            if entry.is_dir():
+                self._scan(entry.path, reload=reload)
+            elif entry.name.endswith(self.extensions):
+                self._check_file(entry.path, reload=reload)
+
+    def _check_file(self, path, reload=True):
+        """Queue a template for reloading if its modification time changed"""
+        try:
+            mtime = os.stat(path).st_mtime_ns
+        except FileNotFoundError:
+            self._mtimes.pop(path, None)
+            return
+
+        # editors that save by replacing the file drop it from the watcher
+        if path not in self._watcher.files():
+            self._watcher.addPath(path)
+
+        if self._mtimes.get(path) == mtime:
+            return
+
+        known = path in self._mtimes
+        self._mtimes[path] = mtime
+        if reload and known:
+            self._pending.add(path)
+            self._timer.start()
+
+    def _on_file_changed(self, path):
+        self._check_file(path)
+
+    def _on_directory_changed(self, directory):
+        if os.path.isdir(directory):
+            self._scan(directory)
+
+    def _flush(self):
+        """Reload every template changed since the last flush"""
+        pending, self._pending = self._pending, set()
+
+        for path in sorted(pending):
+            template_path = os.path.relpath(path, self.template_dir).replace(os.sep, '/')
+            try:
+                components = self.template_engine.reload_template(template_path)
+            except Exception as e:
+                # a half written template should not take the app down
+                logging.error(f"Failed to hot reload '{template_path}': {e}")
+                continue
+
+            logging.info(f"Hot reloaded '{template_path}', re-rendered {len(components)} component(s)")
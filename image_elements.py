@@ -0,0 +1,240 @@
+import logging
+from collections import OrderedDict
+from typing import Callable, Optional, Tuple
+
+from PyQt6 import sip
+from PyQt6.QtCore import QObject, QRunnable, QSize, QThreadPool, Qt, pyqtSignal
+from PyQt6.QtGui import QImage, QImageReader, QPixmap
+from PyQt6.QtWidgets import QLabel
+
+from elements import NextPyElement
+
+
+class _DecodeSignals(QObject):
+    # (cache key, decoded QImage, null if decoding failed), delivered on the GUI thread
+    decoded = pyqtSignal(object, object)
+
+
+class _DecodeJob(QRunnable):
+    """Decodes an image on a worker thread, scaled while decoding when the format supports it"""
+    def __init__(self, key, signals: _DecodeSignals):
+        super().__init__()
+        self.key = key
+        self.signals = signals
+
+    def run(self):
+        path, (width, height) = self.key
+        reader = QImageReader(path)
+        reader.setAutoTransform(True)
+
+        size = reader.size()
+        if size.isValid() and (width or height):
+            if width and height:
+                size = size.scaled(width, height, Qt.AspectRatioMode.KeepAspectRatio)
+            elif width:
+                size = QSize(width, max(1, round(size.height() * width / size.width())))
+            else:
+                size = QSize(max(1, round(size.width() * height / size.height())), height)
+            reader.setScaledSize(size)
+
+        image = reader.read()
+        if image.isNull():
+            logging.error(f"Could not decode image {path}: {reader.errorString()}")
+
+        try:
+            self.signals.decoded.emit(self.key, image)
+        except RuntimeError:
+            # the cache was deleted while decoding
+            pass
+
+
+class NextPyPixmapCache(QObject):
+    """
+    Decodes images on worker threads into a least recently used pixmap cache, bounded in bytes.
+    Pixmaps are keyed by path and target size and shared by every element showing them,
+    and an image requested again while decoding is decoded once.
+    """
+    def __init__(self, max_bytes=64 * 1024 * 1024, max_threads=2, parent=None):
+        """
+        Constructor for NextPyPixmapCache
+        :param max_bytes: the decoded size of the pixmaps kept, least recently used ones are dropped first
+        :param max_threads: the number of images decoded at the same time
+        :param parent: the parent QObject
+        """
+        super().__init__(parent)
+        self.max_bytes = max_bytes
+        self._pixmaps = OrderedDict()
+        self._bytes = 0
+        self._waiting = {}
+        self.hits = 0
+        self.misses = 0
+
+        self._pool = QThreadPool(self)
+        self._pool.setMaxThreadCount(max_threads)
+        self._signals = _DecodeSignals(self)
+        self._signals.decoded.connect(self._on_decoded)
+
+    @staticmethod
+    def _key(path: str, size: Tuple[int, int]):
+        return path, (size[0] or 0, size[1] or 0)
+
+    def get(self, path: str, size: Tuple[int, int] = (0, 0)) -> Optional[QPixmap]:
+        """
+        Get a decoded pixmap
+        :param path: the image path
+        :param size: the target (width, height), 0 keeps the aspect ratio or the image size
+        :return: the pixmap, None if it is not decoded yet
+        """
+        key = self._key(path, size)
+        pixmap = self._pixmaps.get(key)
+        if pixmap is None:
+            self.misses += 1
+            return None
+
+        self.hits += 1
+        self._pixmaps.move_to_end(key)
+        return pixmap
+
+    def load(self, path: str, size: Tuple[int, int], callback: Callable[[Optional[QPixmap]], None]):
+        """
+        Decode an image on a worker thread, unless it is already decoding
+        :param path: the image path
+        :param size: the target (width, height), 0 keeps the aspect ratio or the image size
+        :param callback: called on the GUI thread with the pixmap, or None if the image could not be decoded
+        :return: a handle that can be passed to cancel
+        """
+        key = self._key(path, size)
+        waiting = self._waiting.get(key)
+        if waiting is None:
+            waiting = self._waiting[key] = []
+            self._pool.start(_DecodeJob(key, self._signals))
+        waiting.append(callback)
+        return key, callback
+
+    def cancel(self, handle):
+        """
+        Drop a callback passed to load. The image is still decoded and cached
+        :param handle: the handle returned by load
+        :return: void
+        """
+        if handle is None:
+            return
+        key, callback = handle
+        waiting = self._waiting.get(key, [])
+        if callback in waiting:
+            waiting.remove(callback)
+
+    def clear(self):
+        """Drop every cached pixmap"""
+        self._pixmaps.clear()
+        self._bytes = 0
+
+    def _on_decoded(self, key, image: QImage):
+        pixmap = None
+        if not image.isNull():
+            pixmap = QPixmap.fromImage(image)
+            self._store(key, pixmap)
+
+        for callback in self._waiting.pop(key, []):
+            callback(pixmap)
+
+    def _store(self, key, pixmap: QPixmap):
+        self._pixmaps[key] = pixmap
+        self._bytes += self._cost(pixmap)
+        while self._bytes > self.max_bytes and len(self._pixmaps) > 1:
+            _, dropped = self._pixmaps.popitem(last=False)
+            self._bytes -= self._cost(dropped)
+
+    @staticmethod
+    def _cost(pixmap: QPixmap) -> int:
+        return pixmap.width() * pixmap.height() * max(1, pixmap.depth() // 8)
+
+
+_pixmap_cache = None
+
+
+def pixmap_cache() -> NextPyPixmapCache:
+    """Get the pixmap cache shared by every image element, creating it on first use"""
+    global _pixmap_cache
+    if _pixmap_cache is None:
+        _pixmap_cache = NextPyPixmapCache()
+    return _pixmap_cache
+
+
+def pixmap_cache_stats() -> Tuple[int, int]:
+    """The (hits, misses) of the pixmap cache, without creating it"""
+    if _pixmap_cache is None:
+        return 0, 0
+    return _pixmap_cache.hits, _pixmap_cache.misses
+
+
+class NextPyImageElement(NextPyElement):
+    """
+    Image decoded off the GUI thread, showing the placeholder text until it is ready
+    e.g. <QImage src="images/avatar.png" width="32" height="32" placeholder="..." alt="No avatar"/>
+    width and height are the size the image is decoded at, giving only one keeps the aspect ratio.
+    An image already in the pixmap cache is shown right away
+    """
+    ATTRIBUTE_SETTERS = {
+        'src': '_update_source',
+        'width': '_update_source',
+        'height': '_update_source',
+    }
+
+    def create_widget(self):
+        self.widget = QLabel()
+        self.widget.setAlignment(Qt.AlignmentFlag.AlignCenter)
+        self._load_handle = None
+        self._load()
+        return super().create_widget()
+
+    def _size(self) -> Tuple[int, int]:
+        size = []
+        for name in ('width', 'height'):
+            try:
+                size.append(int(self.element.get(name) or 0))
+            except ValueError:
+                logging.error(f"Image {name} {self.element.get(name)} not an integer")
+                size.append(0)
+        return size[0], size[1]
+
+    def _load(self):
+        cache = pixmap_cache()
+        cache.cancel(self._load_handle)
+        self._load_handle = None
+
+        width, height = self._size()
+        # keep the space of the image while it decodes, so the layout does not jump
+        self.widget.setMinimumSize(width, height)
+
+        src = self.element.get('src')
+        if not src:
+            self.widget.setText(self.element.get('alt') or '')
+            return
+
+        pixmap = cache.get(src, (width, height))
+        if pixmap is not None:
+            self.widget.setPixmap(pixmap)
+            return
+
+        self.widget.setText(self.element.get('placeholder') or '')
+        self._load_handle = cache.load(src, (width, height), self._on_loaded)
+
+    def _on_loaded(self, pixmap):
+        self._load_handle = None
+        if self.widget is None or sip.isdeleted(self.widget):
+            return
+
+        if pixmap is None:
+            self.widget.setText(self.element.get('alt') or '')
+        else:
+            self.widget.setPixmap(pixmap)
+
+    def _update_source(self, _value, methods):
+        self._load()
+
+    def destroy(self):
+        # a pending callback would keep this element alive until the image is decoded
+        pixmap_cache().cancel(getattr(self, '_load_handle', None))
+        self._load_handle = None
+        super().destroy()
@@ -0,0 +1,35 @@
+from snapshot import import_component_class
+
+
+class NextPyLazyComponent:
+    """
+    A component registered in self.components that is only loaded when first rendered.
+    Until it is loaded, a placeholder is shown and the component is created on a later event loop tick.
+    e.g. self.components['chart'] = NextPyLazyComponent('components.chart:Chart')
+    """
+    def __init__(self, loader, fallback=''):
+        """
+        Constructor for NextPyLazyComponent
+        :param loader: a "module:Class" import path, or a function returning the component class
+        :param fallback: text shown while the component loads
+        """
+        self.loader = loader
+        self.fallback = fallback
+        self.component_class = None
+
+    @property
+    def resolved(self) -> bool:
+        """True once the component class has been loaded"""
+        return self.component_class is not None
+
+    def resolve(self):
+        """
+        Load the component class, once
+        :return: the component class
+        """
+        if self.component_class is None:
+            if isinstance(self.loader, str):
+                self.component_class = import_component_class(self.loader)
+            else:
+                self.component_class = self.loader()
+        return self.component_class
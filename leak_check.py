@@ -0,0 +1,70 @@
+import gc
+from collections import Counter
+from typing import Callable, Dict
+
+from PyQt6.QtCore import QCoreApplication, QEvent
+from PyQt6.QtWidgets import QApplication, QWidget, QVBoxLayout
+
+from component import NextPyComponent
+from elements import NextPyElement
+
+
+def flush_deleted_widgets():
+    """Process pending deleteLater calls, so deleted widgets are really gone"""
+    QCoreApplication.sendPostedEvents(None, QEvent.Type.DeferredDelete.value)
+
+
+def count_live_objects() -> Dict[str, int]:
+    """
+    Count the live components, elements and widgets
+    :return: dict with the number of live NextPyComponent, NextPyElement and QWidget objects
+    """
+    flush_deleted_widgets()
+    gc.collect()
+
+    counts = Counter()
+    for obj in gc.get_objects():
+        if isinstance(obj, NextPyComponent):
+            counts['NextPyComponent'] += 1
+        elif isinstance(obj, NextPyElement):
+            counts['NextPyElement'] += 1
+    counts['QWidget'] = len(QApplication.allWidgets())
+
+    return {name: counts[name] for name in ('NextPyComponent', 'NextPyElement', 'QWidget')}
+
+
+def check_for_leaks(component_factory: Callable[[], NextPyComponent], cycles=10000, exercise=None, warmup=10) -> Dict[str, int]:
+    """
+    Mount and unmount a component many times and report how many objects were left behind
+    :param component_factory: function creating the component to mount
+    :param cycles: the number of mount/unmount cycles
+    :param exercise: optional function called with each mounted component, e.g. to drive its methods
+    :param warmup: cycles run before counting, so caches filled on first use are not reported
+    :return: dict of object type to the number of objects leaked over all cycles, 0 when nothing leaks
+    """
+    host = QWidget()
+    host.setLayout(QVBoxLayout())
+
+    def cycle():
+        component = component_factory()
+        widget = component.render()
+        host.layout().addWidget(widget)
+        if exercise is not None:
+            exercise(component)
+
+        component.unmount()
+        host.layout().removeWidget(widget)
+        widget.deleteLater()
+        flush_deleted_widgets()
+
+    for _ in range(warmup):
+        cycle()
+    before = count_live_objects()
+
+    for _ in range(cycles):
+        cycle()
+    after = count_live_objects()
+
+    host.deleteLater()
+    return {name: after[name] - before[name] for name in before}
+
@@ -4,23 +4,31 @@ from router import NextPyRouter
 from template_engine import NextPyTemplate
 from window import NextPyWindow
 
+# One engine for the whole app, so every route shares the compiled templates.
+# Pass auto_reload=False in production to skip the template file checks.
+template_engine = NextPyTemplate("templates")
+
 def hello_world_component_factory(*kwargs):
-    return HelloWorldApp(template_engine=NextPyTemplate("templates"), *kwargs)
+    return HelloWorldApp(template_engine=template_engine, *kwargs)
 
 def root_component_factory(*kwargs):
     return TodoApp(
-        template_engine=NextPyTemplate("templates"),
+        template_engine=template_engine,
         *kwargs
     )
 
 # Usage example:
 if __name__ == "__main__":
     from PyQt6.QtWidgets import QApplication
+    from hot_reload import NextPyTemplateWatcher
     import sys
 
     # Create the application
     app = QApplication(sys.argv)
 
+    # Re-render components as their templates are edited
+    template_watcher = NextPyTemplateWatcher(template_engine)
+
     # Create router instance
     router = NextPyRouter()
 
@@ -28,7 +36,7 @@ if __name__ == "__main__":
     router.register_route("hello_world", hello_world_component_factory)
 
     # Create and show window
-    window = NextPyWindow(hello_world_component_factory(), router, title="Todo App")
+    window = NextPyWindow(hello_world_component_factory(), router, title="Todo App", route="hello_world")
     window.show()
 
     # Start the event loop
@@ -0,0 +1,232 @@
+import math
+import time
+from collections import deque
+from contextlib import contextmanager
+from typing import Callable, Dict, Tuple
+
+from PyQt6.QtCore import QObject
+from PyQt6.QtNetwork import QHostAddress, QLocalServer, QTcpServer
+from PyQt6.QtWidgets import QWidget
+
+
+class NextPyRouteMetrics:
+    """Render statistics of a single route"""
+    def __init__(self, max_samples=1000):
+        """
+        Constructor for NextPyRouteMetrics
+        :param max_samples: the number of recent render latencies kept for the average and p95
+        """
+        self.render_count = 0
+        self.latencies = deque(maxlen=max_samples)
+
+    def record_render(self, seconds: float):
+        self.render_count += 1
+        self.latencies.append(seconds)
+
+    @property
+    def average_latency(self) -> float:
+        """Average render latency in seconds, over the recent renders"""
+        return sum(self.latencies) / len(self.latencies) if self.latencies else 0.0
+
+    @property
+    def p95_latency(self) -> float:
+        """95th percentile render latency in seconds, over the recent renders"""
+        if not self.latencies:
+            return 0.0
+        ordered = sorted(self.latencies)
+        return ordered[max(0, math.ceil(len(ordered) * 0.95) - 1)]
+
+
+class NextPyMetrics:
+    """
+    Render metrics of a window, per route: live components and widgets, render count and latency,
+    plus hit rates of the registered caches.
+    Only outermost renders are timed, a child rendered as part of its parent counts towards the parent's render.
+    """
+    def __init__(self, max_samples=1000):
+        """
+        Constructor for NextPyMetrics
+        :param max_samples: the number of recent render latencies kept per route
+        """
+        self.max_samples = max_samples
+        self.routes: Dict[str, NextPyRouteMetrics] = {}
+        self.route = None
+        self.root_component = None
+        self._caches: Dict[str, Callable[[], Tuple[int, int]]] = {}
+        self._depth = 0
+
+    def set_route(self, route: str, root_component):
+        """
+        Set the route the following renders are recorded for
+        :param route: the route name
+        :param root_component: the root component of the route
+        :return: void
+        """
+        self.route = route
+        self.root_component = root_component
+        self.routes.setdefault(route, NextPyRouteMetrics(self.max_samples))
+
+    def register_cache(self, name: str, stats: Callable[[], Tuple[int, int]]):
+        """
+        Report the hit rate of a cache
+        :param name: the cache name, e.g. templates
+        :param stats: function returning (hits, misses)
+        :return: void
+        """
+        self._caches[name] = stats
+
+    @contextmanager
+    def measure_render(self):
+        """Time a render, only the outermost one is recorded"""
+        self._depth += 1
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self._depth -= 1
+            if self._depth == 0 and self.route is not None:
+                self.routes[self.route].record_render(time.perf_counter() - start)
+
+    def _live_counts(self) -> Tuple[int, int]:
+        """Count the live components and widgets of the current route"""
+        root = self.root_component
+        if root is None or not root.renderer.is_mounted():
+            return 0, 0
+
+        components = 0
+        pending = [root]
+        while pending:
+            component = pending.pop()
+            components += 1
+            pending.extend(child for _, child in component.renderer.mounted_child_components())
+
+        main_widget = root.renderer.main_widget
+        return components, 1 + len(main_widget.findChildren(QWidget))
+
+    def snapshot(self) -> dict:
+        """
+        Read the current metrics
+        :return: dict with 'routes', by route name, and 'caches', by cache name
+        """
+        live_components, live_widgets = self._live_counts()
+
+        routes = {}
+        for name, route in self.routes.items():
+            current = name == self.route
+            routes[name] = {
+                'live_components': live_components if current else 0,
+                'live_widgets': live_widgets if current else 0,
+                'render_count': route.render_count,
+                'render_latency_avg': route.average_latency,
+                'render_latency_p95': route.p95_latency,
+            }
+
+        caches = {}
+        for name, stats in self._caches.items():
+            hits, misses = stats()
+            caches[name] = {
+                'hits': hits,
+                'misses': misses,
+                'hit_rate': hits / (hits + misses) if hits + misses else 0.0,
+            }
+
+        return {'routes': routes, 'caches': caches}
+
+    def to_prometheus(self) -> str:
+        """
+        Format the current metrics in the Prometheus text exposition format
+        :return: the metrics text
+        """
+        snapshot = self.snapshot()
+        families = [
+            ('nextpy_live_components', 'gauge', 'Live components of the route', 'routes', 'route', 'live_components'),
+            ('nextpy_live_widgets', 'gauge', 'Live widgets of the route', 'routes', 'route', 'live_widgets'),
+            ('nextpy_renders_total', 'counter', 'Renders of the route', 'routes', 'route', 'render_count'),
+            ('nextpy_render_latency_avg_seconds', 'gauge', 'Average render latency', 'routes', 'route', 'render_latency_avg'),
+            ('nextpy_render_latency_p95_seconds', 'gauge', '95th percentile render latency', 'routes', 'route', 'render_latency_p95'),
+            ('nextpy_cache_hits_total', 'counter', 'Cache hits', 'caches', 'cache', 'hits'),
+            ('nextpy_cache_misses_total', 'counter', 'Cache misses', 'caches', 'cache', 'misses'),
+            ('nextpy_cache_hit_ratio', 'gauge', 'Cache hit ratio', 'caches', 'cache', 'hit_rate'),
+        ]
+
+        lines = []
+        for metric, metric_type, description, group, label, field in families:
+            lines.append(f"# HELP {metric} {description}")
+            lines.append(f"# TYPE {metric} {metric_type}")
+            for name, values in snapshot[group].items():
+                escaped = str(name).replace('\\', '\\\\').replace('"', '\\"')
+                lines.append(f'{metric}{{{label}="{escaped}"}} {values[field]}')
+
+        return '\n'.join(lines) + '\n'
+
+
+class NextPyMetricsServer(QObject):
+    """
+    Serves metrics in the Prometheus text format from the Qt event loop,
+    over loopback HTTP and/or a local (unix) socket. Metrics are read on the GUI thread, no locking needed.
+    """
+    def __init__(self, metrics: NextPyMetrics, port=None, unix_socket=None, parent=None):
+        """
+        Constructor for NextPyMetricsServer
+        :param metrics: the metrics to serve
+        :param port: the loopback HTTP port, None to disable. 0 picks a free port, see http_port
+        :param unix_socket: the local socket name or path, None to disable. Connecting reads the metrics text
+        :param parent: the parent QObject
+        """
+        super().__init__(parent)
+        self.metrics = metrics
+        self.http_server = None
+        self.local_server = None
+
+        if port is not None:
+            self.http_server = QTcpServer(self)
+            self.http_server.newConnection.connect(self._on_http_connection)
+            if not self.http_server.listen(QHostAddress(QHostAddress.SpecialAddress.LocalHost), port):
+                raise OSError(f"Could not serve metrics on port {port}: {self.http_server.errorString()}")
+
+        if unix_socket is not None:
+            QLocalServer.removeServer(unix_socket)
+            self.local_server = QLocalServer(self)
+            self.local_server.newConnection.connect(self._on_local_connection)
+            if not self.local_server.listen(unix_socket):
+                raise OSError(f"Could not serve metrics on {unix_socket}: {self.local_server.errorString()}")
+
+    @property
+    def http_port(self):
+        """The port the HTTP endpoint listens on"""
+        return self.http_server.serverPort() if self.http_server else None
+
+    def close(self):
+        """Stop serving metrics"""
+        for server in (self.http_server, self.local_server):
+            if server is not None:
+                server.close()
+
+    def _on_http_connection(self):
+        while self.http_server.hasPendingConnections():
+            connection = self.http_server.nextPendingConnection()
+            connection.readyRead.connect(lambda connection=connection: self._respond_http(connection))
+
+    def _respond_http(self, connection):
+        request = bytes(connection.readAll()).decode('latin-1')
+        if not request.startswith('GET'):
+            status, body = '405 Method Not Allowed', ''
+        else:
+            status, body = '200 OK', self.metrics.to_prometheus()
+
+        payload = body.encode('utf-8')
+        connection.write(
+            f"HTTP/1.1 {status}\r\n"
+            f"Content-Type: text/plain; version=0.0.4; charset=utf-8\r\n"
+            f"Content-Length: {len(payload)}\r\n"
+            f"Connection: close\r\n\r\n".encode('latin-1') + payload
+        )
+        connection.disconnectFromHost()
+        connection.disconnected.connect(connection.deleteLater)
+
+    def _on_local_connection(self):
+        while self.local_server.hasPendingConnections():
+            connection = self.local_server.nextPendingConnection()
+            connection.write(self.metrics.to_prometheus().encode('utf-8'))
+            connection.disconnectFromServer()
+            connection.disconnected.connect(connection.deleteLater)
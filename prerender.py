@@ -0,0 +1,215 @@
+import logging
+import multiprocessing
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from typing import List, Optional
+
+from bs4 import BeautifulSoup, Tag
+from jinja2 import meta
+
+from snapshot import element_to_vnode, vnode_to_element
+from template_cache import parse_root
+
+
+# The template version each environment of this worker process was compiled at, see _render_vnode
+_worker_versions = {}
+
+
+def _render_vnode(job):
+    """
+    Render a template and parse it into a vnode, in a worker process.
+    Uses the worker's own template registry, so every template is compiled once per worker.
+    The job carries the version of the templates in the GUI process, a newer one means templates were
+    invalidated or hot reloaded there, and the worker drops what it compiled before
+    :return: (vnode, None), or (None, error message) if rendering failed
+    """
+    from template_engine import template_registry
+
+    template_dir, auto_reload, version, template_path, context = job
+    try:
+        environment = template_registry.get_environment(template_dir, auto_reload=auto_reload)
+        if _worker_versions.get((template_dir, auto_reload), 0) != version:
+            if environment.cache is not None:
+                environment.cache.clear()
+            _worker_versions[(template_dir, auto_reload)] = version
+        root = parse_root(environment.get_template(template_path).render(**context))
+    except Exception as e:
+        return None, f"{template_path}: {e}"
+    return (element_to_vnode(root) if root is not None else None), None
+
+
+class NextPyPrerenderer:
+    """
+    Renders the templates of sibling child components in parallel and parses them,
+    so the renderer only creates their widgets, on the GUI thread.
+    With processes, the render context of each child is pickled and the result comes back as a vnode.
+    Threads avoid the pickling but share the GIL, so they only run in parallel on free threaded Python builds.
+    Whether either beats the serial render depends on the cores and the templates, measure it on the target machine
+    with python prerender.py
+    """
+    def __init__(self, max_workers=None, use_processes=True, min_batch=8):
+        """
+        Constructor for NextPyPrerenderer
+        :param max_workers: the number of workers, defaults to the number of cores
+        :param use_processes: render in worker processes, or in threads if False
+        :param min_batch: the fewest siblings rendered in parallel, smaller batches are not worth the overhead
+        """
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self.use_processes = use_processes
+        self.min_batch = min_batch
+        self._executor = None
+        # Whether each template uses methods, which can't be sent to a worker, by (template_dir, template_path)
+        self._uses_methods = {}
+
+    @property
+    def executor(self):
+        if self._executor is None:
+            if self.use_processes:
+                # spawned, forking a process running Qt threads is unsafe
+                self._executor = ProcessPoolExecutor(self.max_workers, mp_context=multiprocessing.get_context('spawn'))
+            else:
+                self._executor = ThreadPoolExecutor(self.max_workers)
+        return self._executor
+
+    def shutdown(self):
+        """Stop the workers"""
+        if self._executor is not None:
+            self._executor.shutdown(cancel_futures=True)
+            self._executor = None
+
+    def can_prerender(self, component) -> bool:
+        """Check a component's template can be rendered by a worker"""
+        engine = component.template_engine
+        if not hasattr(engine, 'template_dir') or not component.template_path:
+            return False
+
+        key = (engine.template_dir, component.template_path)
+        if key not in self._uses_methods:
+            try:
+                source = engine.env.loader.get_source(engine.env, component.template_path)[0]
+                self._uses_methods[key] = 'methods' in meta.find_undeclared_variables(engine.env.parse(source))
+            except Exception:
+                self._uses_methods[key] = True
+        return not self._uses_methods[key]
+
+    def render(self, components: list) -> List[Optional[Tag]]:
+        """
+        Render the templates of components in parallel
+        :param components: the components, created but not rendered yet
+        :return: the root element of each component, None for the ones that could not be rendered by a worker
+        """
+        jobs = []
+        for component in components:
+            engine = component.template_engine
+            context = {
+                'state': component.state,
+                'computed': {name: func() for name, func in component.computed.items()},
+                'props': component.props,
+            }
+            if self.use_processes:
+                template_dir, auto_reload = os.path.abspath(engine.template_dir), engine.env.auto_reload
+                version = engine.registry.version(template_dir, auto_reload)
+                jobs.append((template_dir, auto_reload, version, component.template_path, context))
+            else:
+                jobs.append((engine, component.template_path, context))
+
+        if self.use_processes:
+            return self._render_in_processes(jobs)
+        return list(self.executor.map(self._render_in_thread, jobs))
+
+    def _render_in_processes(self, jobs) -> List[Optional[Tag]]:
+        # a few chunks per worker, sending every job on its own costs more than rendering it
+        chunksize = max(1, len(jobs) // (self.max_workers * 4))
+        try:
+            results = list(self.executor.map(_render_vnode, jobs, chunksize=chunksize))
+        except Exception as e:
+            # e.g. state that can't be pickled, the renderer renders these components itself
+            logging.warning(f"Could not prerender components, rendering them in place: {e}")
+            return [None] * len(jobs)
+
+        soup = BeautifulSoup('', 'html.parser')
+        roots = []
+        for vnode, error in results:
+            if error:
+                logging.warning(f"Could not prerender component, rendering it in place: {error}")
+            roots.append(vnode_to_element(vnode, soup) if vnode is not None else None)
+        return roots
+
+    @staticmethod
+    def _render_in_thread(job) -> Optional[Tag]:
+        engine, template_path, context = job
+        try:
+            return parse_root(engine.env.get_template(template_path).render(**context))
+        except Exception as e:
+            logging.warning(f"Could not prerender component, rendering it in place: {e}")
+            return None
+
+
+_prerenderer = None
+
+
+def prerenderer() -> Optional[NextPyPrerenderer]:
+    """Get the prerenderer used by every renderer, None while parallel prerendering is disabled"""
+    return _prerenderer
+
+
+def enable_prerender(max_workers=None, use_processes=True, min_batch=8) -> NextPyPrerenderer:
+    """
+    Render sibling child components in parallel from now on, see NextPyPrerenderer
+    :return: the prerenderer
+    """
+    global _prerenderer
+    disable_prerender()
+    _prerenderer = NextPyPrerenderer(max_workers=max_workers, use_processes=use_processes, min_batch=min_batch)
+    return _prerenderer
+
+
+def disable_prerender():
+    """Render child components one after the other, stopping the workers"""
+    global _prerenderer
+    if _prerenderer is not None:
+        _prerenderer.shutdown()
+        _prerenderer = None
+
+
+def _render_todo_app(todos: int) -> float:
+    """Time the first render of the todo app with todos items"""
+    import time
+    from main import root_component_factory
+
+    component = root_component_factory()
+    component.state = {**component.state, 'todos': [{'text': f"Todo {i}", 'completed': i % 2 == 0} for i in range(todos)]}
+    start = time.perf_counter()
+    component.render()
+    elapsed = time.perf_counter() - start
+    component.unmount()
+    return elapsed
+
+
+def _benchmark(runs=5, todos=300):
+    """Compare the serial render of the todo app with prerendering its items in processes and in threads"""
+    import statistics
+    from testing import ensure_application
+
+    ensure_application()
+    results = {}
+    for name, use_processes in (('serial', None), ('processes', True), ('threads', False)):
+        if use_processes is not None:
+            enable_prerender(use_processes=use_processes)
+        # compile the templates, and start the workers, before timing
+        _render_todo_app(todos)
+        results[name] = statistics.median(_render_todo_app(todos) for _ in range(runs))
+        disable_prerender()
+
+    print(f"First render of the todo app with {todos} items, median of {runs} renders, {os.cpu_count()} cores")
+    for name, seconds in results.items():
+        print(f"  {name:<10} {seconds * 1000:8.1f} ms")
+
+
+if __name__ == '__main__':
+    # python prerender.py [runs] [todos], run from the directory holding the templates.
+    # Imported again, the renderer reads the prerenderer of the prerender module, not of __main__
+    from prerender import _benchmark
+
+    _benchmark(*(int(arg) for arg in sys.argv[1:3]))
@@ -0,0 +1,232 @@
+import heapq
+import inspect
+import itertools
+import time
+
+from PyQt6.QtCore import QObject, QTimer
+
+
+class NextPyTimerQueue(QObject):
+    """
+    Runs delayed calls from a single shared timer.
+    Debounced and throttled handlers all schedule here instead of each owning a QTimer.
+    """
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self._heap = []
+        self._counter = itertools.count()
+
+        self._timer = QTimer(self)
+        self._timer.setSingleShot(True)
+        self._timer.timeout.connect(self._run_due)
+
+    def call_later(self, delay, callback):
+        """
+        Call callback after delay milliseconds
+        :param delay: milliseconds to wait
+        :param callback: the function to call
+        :return: a handle that can be passed to cancel
+        """
+        entry = [time.monotonic() + delay / 1000, next(self._counter), callback]
+        heapq.heappush(self._heap, entry)
+        if self._heap[0] is entry:
+            self._restart_timer()
+        return entry
+
+    @staticmethod
+    def cancel(handle):
+        """
+        Cancel a call scheduled with call_later
+        :param handle: the handle returned by call_later
+        :return: void
+        """
+        if handle is not None:
+            handle[2] = None
+
+    def _restart_timer(self):
+        while self._heap and self._heap[0][2] is None:
+            heapq.heappop(self._heap)
+
+        if not self._heap:
+            self._timer.stop()
+            return
+
+        delay = max(0, int((self._heap[0][0] - time.monotonic()) * 1000))
+        self._timer.start(delay)
+
+    def _run_due(self):
+        now = time.monotonic()
+        while self._heap and self._heap[0][0] <= now:
+            callback = heapq.heappop(self._heap)[2]
+            if callback is not None:
+                callback()
+        self._restart_timer()
+
+
+_timer_queue = None
+
+
+def timer_queue() -> NextPyTimerQueue:
+    """Get the timer queue shared by every rate limited handler, creating it on first use"""
+    global _timer_queue
+    if _timer_queue is None:
+        _timer_queue = NextPyTimerQueue()
+    return _timer_queue
+
+
+class NextPyDebounce:
+    """Wraps a function so it only runs once calls have stopped for `wait` milliseconds, with the last arguments"""
+    def __init__(self, func, wait):
+        """
+        Constructor for NextPyDebounce
+        :param func: the function to debounce
+        :param wait: milliseconds without calls before func runs
+        """
+        self.func = func
+        self.wait = wait
+        self._handle = None
+        self._args = None
+
+    @property
+    def pending(self) -> bool:
+        """True while a call is waiting to run"""
+        return self._args is not None
+
+    def __call__(self, *args, **kwargs):
+        self._args = (args, kwargs)
+        queue = timer_queue()
+        queue.cancel(self._handle)
+        self._handle = queue.call_later(self.wait, self.flush)
+
+    def flush(self):
+        """Run the waiting call now"""
+        if self._args is None:
+            return
+        timer_queue().cancel(self._handle)
+        (args, kwargs), self._args, self._handle = self._args, None, None
+        self.func(*args, **kwargs)
+
+    def cancel(self):
+        """Drop the waiting call"""
+        timer_queue().cancel(self._handle)
+        self._args = self._handle = None
+
+
+class NextPyThrottle:
+    """Wraps a function so it runs at most once every `wait` milliseconds, with the last arguments"""
+    def __init__(self, func, wait):
+        """
+        Constructor for NextPyThrottle
+        :param func: the function to throttle
+        :param wait: minimum milliseconds between two calls of func
+        """
+        self.func = func
+        self.wait = wait
+        self._last_call = None
+        self._handle = None
+        self._args = None
+
+    @property
+    def pending(self) -> bool:
+        """True while a trailing call is waiting to run"""
+        return self._args is not None
+
+    def __call__(self, *args, **kwargs):
+        self._args = (args, kwargs)
+        if self._handle is not None:
+            return
+
+        elapsed = None if self._last_call is None else (time.monotonic() - self._last_call) * 1000
+        if elapsed is None or elapsed >= self.wait:
+            self.flush()
+        else:
+            self._handle = timer_queue().call_later(self.wait - elapsed, self.flush)
+
+    def flush(self):
+        """Run the waiting call now"""
+        if self._args is None:
+            return
+        timer_queue().cancel(self._handle)
+        (args, kwargs), self._args, self._handle = self._args, None, None
+        self._last_call = time.monotonic()
+        self.func(*args, **kwargs)
+
+    def cancel(self):
+        """Drop the waiting call"""
+        timer_queue().cancel(self._handle)
+        self._args = self._handle = None
+
+
+def rate_limit(func, modifiers):
+    """
+    Wrap func according to modifiers parsed from a template attribute
+    e.g. ['debounce', '200'] or ['throttle', '100']. The wait defaults to 100 milliseconds
+    :param func: the function to wrap
+    :param modifiers: the attribute modifiers
+    :return: the wrapped function, or func if there is no rate limiting modifier
+    """
+    for index, modifier in enumerate(modifiers):
+        if modifier not in ('debounce', 'throttle'):
+            continue
+
+        wait = 100
+        if index + 1 < len(modifiers) and modifiers[index + 1].isdigit():
+            wait = int(modifiers[index + 1])
+
+        if modifier == 'debounce':
+            return NextPyDebounce(func, wait)
+        return NextPyThrottle(func, wait)
+
+    return func
+
+
+class _RateLimitedMethod:
+    """Descriptor giving every component instance its own rate limiter for a decorated method"""
+    def __init__(self, func, limiter_class, wait):
+        self.func = func
+        self.limiter_class = limiter_class
+        self.wait = wait
+        self.name = func.__name__
+        self.__doc__ = func.__doc__
+
+    def __set_name__(self, owner, name):
+        self.name = name
+
+    def __get__(self, instance, owner=None):
+        if instance is None:
+            return self
+
+        method = self.func.__get__(instance, owner)
+        # the limiter drops what method returns, so an async method has to run as a task of the component
+        if inspect.iscoroutinefunction(method) and hasattr(instance, 'wrap_async'):
+            method = instance.wrap_async(method)
+
+        # cached on the instance, which takes precedence over this descriptor from now on
+        limiter = self.limiter_class(method, self.wait)
+        instance.__dict__[self.name] = limiter
+        return limiter
+
+
+def debounce(wait=100):
+    """
+    Decorate a component method so it only runs once calls have stopped for `wait` milliseconds
+    e.g.
+        @debounce(200)
+        def search(self, text): ...
+    :param wait: milliseconds without calls before the method runs
+    :return: the decorator
+    """
+    def decorator(func):
+        return _RateLimitedMethod(func, NextPyDebounce, wait)
+    return decorator
+
+
+def throttle(wait=100):
+    """
+    Decorate a component method so it runs at most once every `wait` milliseconds
+    :param wait: minimum milliseconds between two calls
+    :return: the decorator
+    """
+    def decorator(func):
+        return _RateLimitedMethod(func, NextPyThrottle, wait)
+    return decorator
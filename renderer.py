@@ -1,17 +1,31 @@
+import logging
 from abc import ABC
+from collections import deque
+from contextlib import nullcontext
 
-from PyQt6.QtWidgets import QWidget, QVBoxLayout
-from bs4 import BeautifulSoup
+from PyQt6 import sip
+from PyQt6.QtWidgets import QWidget, QVBoxLayout, QLabel
 
-from elements import NextPyDivElement, NextPyButtonElement, NextPyLabelElement, NextPyInputElement, \
-    NextPyCheckboxElement
-from typing import Dict, List, Optional, get_type_hints
+from elements import NextPyDivElement, NextPySuspenseElement, element_registry
+from typing import Dict, List, Optional
 
-from utils import cast_value
+from lazy import NextPyLazyComponent
+from prerender import prerenderer
+from rate_limit import rate_limit
+from scheduler import Priority, scheduler
+from state import get_in, paths_overlap
+from template_analyzer import component_metadata
+from template_cache import parse_root
 
 from dataclasses import dataclass
 
 
+# Attribute prefix binding a widget property to a signal
+SIGNAL_PREFIX = 'signal:'
+# Attribute prefix binding a widget value to a state path, e.g. bind:value="state.new_todo"
+BIND_PREFIX = 'bind:'
+
+
 @dataclass
 class ElementState:
     """Represents the state of an element for comparison"""
@@ -28,6 +42,9 @@ class NextPyRenderer(object):
         self.template_path = template_path
         self.main_widget = main_widget
         self.element_instances = {}  # Store element instances by ID
+        self.widget_elements = {}  # Store element instances by widget
+        self.widget_components = {}  # Store child components by widget
+        self.widget_element_data = {}  # Store the parsed HTML each widget was last rendered from
         self.window = window
 
         self.methods = None
@@ -35,23 +52,64 @@ class NextPyRenderer(object):
         self.state = None
         self.computed = None
         self.components = None
+        self.signals = None
+        self.set_state_in = None
+        self.template_metadata = None
+        # The analysis of the template, taken at the start of each render, see template_analyzer
+        self.metadata = None
         self.refs = {}
         self.child_components = {}
+        # State paths changed by the last update, used to skip renders that can't change the output
+        self.changed_paths = []
+        # The computed values the template was last rendered with
+        self._rendered_computed = None
+
+        # Restored from a snapshot: the root element to render instead of the template,
+        # and the snapshots of child components by component id.
+        # The root element is also set on child components whose template was prerendered
+        self.restored_root_element = None
+        self.restored_children = {}
+
+        # Child components created and prerendered ahead of their widgets, by id of their <component> element
+        self._prerendered = {}
+
+        # Scheduler handle of a render_sliced still in progress, the update queued by state changes meanwhile,
+        # and the root element that update rendered, applied when the built tree is committed
+        self._sliced_render = None
+        self._sliced_update = None
+        self._sliced_root = None
+        # While a sliced render builds, the component_did_mount hooks of the child components it creates,
+        # called once the tree is attached
+        self._pending_mounts = None
 
         self.component_did_mount = None
 
-        # Element mapping
-        self.element_classes = {
-            'qpushbutton': NextPyButtonElement,
-            'qlabel': NextPyLabelElement,
-            'qlineedit': NextPyInputElement,
-            'qwidget': NextPyDivElement,
-            'qcheckbox': NextPyCheckboxElement,
-            "component": NextPyDivElement,
-        }
-
     def create_element(self, element_data) -> Optional[QWidget]:
         """Create an element instance based on element data"""
+        return self._run_steps(self._create_element_steps(element_data))
+
+    @staticmethod
+    def _run_steps(steps):
+        """Drive a steps generator to the end and get the value it returns"""
+        while True:
+            try:
+                next(steps)
+            except StopIteration as done:
+                return done.value
+
+    def _element_class(self, element_type: str):
+        """Get the element class of a normalized element type, None if it is unknown"""
+        if self.metadata is not None and element_type in self.metadata.element_types:
+            return self.metadata.element_types[element_type]
+        return element_registry.get(element_type)
+
+    def _create_element_steps(self, element_data):
+        """
+        Create an element instance based on element data, yielding after each element is created.
+        Driving it to the end gives the same widget tree as create_element; render_sliced spreads it over ticks.
+        Yields True after an element of this template, False after a step of a child component's render.
+        Returns the widget through StopIteration
+        """
         if not element_data or not hasattr(element_data, 'element_type'):
             return None
 
@@ -59,16 +117,21 @@ class NextPyRenderer(object):
 
         # Handle component elements
         if element_type == 'component':
-            return self._create_component_element(element_data)
-
-        element_class = self.element_classes.get(element_type)
+            widget = yield from self._create_component_steps(element_data)
+            yield True
+            return widget
 
+        element_class = self._element_class(element_type)
         if not element_class:
-            print(f"Warning: Unknown element type '{element_type}'")  # Debug
+            # types the analysis knows about were reported once, by the analysis
+            if self.metadata is None or element_type not in self.metadata.element_types:
+                logging.warning(f"Unknown element type '{element_type}'")
             return None
 
         # Create element instance
         element_instance = element_class(element_data)
+        element_instance.template_engine = self.template_engine
+        element_instance.template_metadata = self.metadata
 
         # Store reference if ID exists
         element_id = element_data.get('id', None)
@@ -77,36 +140,186 @@ class NextPyRenderer(object):
 
         # Create and return widget
         widget = element_instance.create_widget()
+        element_instance.attributes = element_data.attrs
+        element_instance.content = element_data.string if element_data.string else ''
+        self.widget_elements[widget] = element_instance
+        self.widget_element_data[widget] = element_data
 
         # Attach component methods as callbacks
         element_instance.attach_callback(self.methods())
 
+        # Bind signals straight to widget properties
+        self._bind_signals(element_instance, element_data)
+
+        # Two-way bind widget values to state
+        self._bind_values(element_instance, element_data)
+        yield True
+
         # Handle children for container elements
-        if isinstance(element_instance, NextPyDivElement):
-            for child in element_data.children:
-                if child.name:  # Skip text nodes
-                    child_widget = self.create_element(child)
+        if isinstance(element_instance, NextPySuspenseElement):
+            self._schedule_suspended_children(element_instance, element_data)
+        elif isinstance(element_instance, NextPyDivElement):
+            children = [child for child in element_data.children if child.name]  # Skip text nodes
+            self._prerender_components(children)
+            try:
+                for child in children:
+                    child_widget = yield from self._create_element_steps(child)
                     if child_widget:
                         element_instance.add_child(child_widget)
+            finally:
+                self._drop_prerendered(children)
 
         return widget
 
+    def _schedule_suspended_children(self, element_instance, element_data):
+        """
+        Create the children of a <suspense> element over later event loop ticks, attaching each one as it is ready
+
+        Args:
+            element_instance: The suspense element, showing its fallback meanwhile
+            element_data: The element's parsed HTML
+        """
+        def attach(child):
+            if element_instance.widget is None or sip.isdeleted(element_instance.widget):
+                return
+            child_widget = self.create_element(child)
+            if child_widget:
+                element_instance.add_child(child_widget)
+
+        for child in element_data.children:
+            if child.name:  # Skip text nodes
+                element_instance.pending.append(scheduler().schedule(lambda child=child: attach(child)))
+
+        element_instance.pending.append(scheduler().schedule(
+            lambda: element_instance.widget is None or sip.isdeleted(element_instance.widget) or element_instance.resolve()
+        ))
+
+    def _bind_signals(self, element_instance, element_data):
+        """
+        Bind signal attributes, e.g. <QLabel signal:text="count">, to their widget property
+
+        Args:
+            element_instance: The element whose widget is bound
+            element_data: The element's parsed HTML
+        """
+        if self.signals is None:
+            return
+
+        for attribute, signal_name in element_data.attrs.items():
+            if not attribute.startswith(SIGNAL_PREFIX):
+                continue
+
+            signal = self.signals().get(signal_name)
+            if signal is None:
+                logging.warning(f"Unknown signal '{signal_name}'")
+                continue
+
+            element_instance.bind_signal(attribute[len(SIGNAL_PREFIX):], signal)
+
+    def _bind_values(self, element_instance, element_data):
+        """
+        Two-way bind a widget value to a state path, e.g. <QLineEdit bind:value.debounce.200="state.new_todo">.
+        Writes can be rate limited with the debounce/throttle modifiers.
+
+        Args:
+            element_instance: The element whose widget is bound
+            element_data: The element's parsed HTML
+        """
+        for attribute, path in element_data.attrs.items():
+            if not attribute.startswith(BIND_PREFIX):
+                continue
+
+            name, *modifiers = attribute[len(BIND_PREFIX):].split('.')
+            state_path = self._parse_state_path(path)
+            if state_path is None:
+                logging.warning(f"Can only bind to state, got '{path}'")
+                continue
+
+            element_instance.bind_value(
+                name,
+                state_path,
+                get_in(self.state(), state_path),
+                lambda value, state_path=state_path: self.set_state_in(state_path, value),
+                modifiers,
+            )
+
+    @staticmethod
+    def _parse_state_path(path: str) -> Optional[list]:
+        """Convert 'state.todos.0.text' into ['todos', 0, 'text']"""
+        parts = path.strip().split('.')
+        if len(parts) < 2 or parts[0] != 'state':
+            return None
+        return [int(part) if part.isdigit() else part for part in parts[1:]]
+
     def _create_component_element(self, element_data) -> Optional[QWidget]:
         """Create a child component instance"""
-        component_name = element_data.get('name')
-        if component_name not in self.components():
-            return None
+        return self._run_steps(self._create_component_steps(element_data))
+
+    def _create_component_steps(self, element_data):
+        """
+        Create a child component instance, yielding False after each element its render creates.
+        Returns the component widget through StopIteration
+        """
+        prerendered = self._prerendered.pop(id(element_data), None)
+        if prerendered is not None and prerendered[0] is element_data:
+            component_instance = prerendered[1]
+        else:
+            component_name = element_data.get('name')
+            if component_name not in self.components():
+                return None
+
+            # Get component class and create instance
+            component_class = self.components()[component_name]
+            if isinstance(component_class, NextPyLazyComponent):
+                if not component_class.resolved:
+                    return self._create_lazy_placeholder(element_data, component_class)
+                component_class = component_class.resolve()
+            component_instance = self._instantiate_component(component_class, element_data)
+
+        # Store reference if specified
+        ref = element_data.get('ref')
+        if ref:
+            self.refs[ref] = component_instance
 
-        # Get component class and create instance
-        component_class = self.components()[component_name]
+        # Store child component
+        component_id = self.get_component_id(element_data)
+        self.child_components[component_id] = component_instance
+
+        # Restore the child's state and last render if this tree comes from a snapshot
+        snapshots = self.restored_children.get(component_id)
+        if snapshots:
+            component_instance.load_snapshot(snapshots.pop(0))
+
+        # Render the component, its mount hook waits for the tree to be attached while a sliced render builds it
+        component_instance.renderer._pending_mounts = self._pending_mounts
+        try:
+            steps = component_instance.render_steps()
+            while True:
+                try:
+                    next(steps)
+                except StopIteration as done:
+                    component_widget = done.value
+                    break
+                yield False
+        finally:
+            component_instance.renderer._pending_mounts = None
+        self.widget_components[component_widget] = component_instance
+        self.widget_element_data[component_widget] = element_data
+
+        return component_widget
+
+    def _instantiate_component(self, component_class, element_data):
+        """Create the instance of a child component from its <component> element, without rendering it"""
         props = self.cast_props_from_html(component_class, element_data)
 
         events = {}
-        for event_name in component_class.emits:
-            event_call = f"on_{event_name}"
-            get_call = element_data.get(event_call)
-            if get_call is not None:
-                events[event_name] = self.methods().get(get_call, None)
+        event_attributes = component_metadata(component_class).event_attributes
+        for attribute, get_call in element_data.attrs.items():
+            # e.g. on_remove="remove_todo" or on_remove.debounce.200="remove_todo"
+            event_name = event_attributes.get(attribute.split('.')[0])
+            if event_name is not None and event_name not in events:
+                method = self.methods().get(get_call, None)
+                events[event_name] = rate_limit(method, attribute.split('.')[1:]) if method else None
 
         # Create component instance
         component_instance = component_class(
@@ -115,20 +328,174 @@ class NextPyRenderer(object):
             props=props,
             events=events,
         )
+        component_instance.set_window(self.window)
+        return component_instance
 
-        # Store reference if specified
-        ref = element_data.get('ref')
-        if ref:
-            self.refs[ref] = component_instance
+    def _prerender_components(self, elements: list):
+        """
+        Create the child components of sibling <component> elements and render their templates in parallel,
+        so creating them only has to create their widgets. Does nothing unless prerendering is enabled,
+        see prerender.enable_prerender
 
-        # Store child component
-        component_id = element_data.get('id', component_name)
-        self.child_components[component_id] = component_instance
+        Args:
+            elements: The sibling elements, only <component> ones are prerendered
+        """
+        pool = prerenderer()
+        if pool is None:
+            return
 
-        # Render the component
-        component_widget = component_instance.render()
+        batch = []
+        for element_data in elements:
+            if element_data.name.lower() != 'component' or id(element_data) in self._prerendered:
+                continue
+            component_class = self.components().get(element_data.get('name'))
+            if isinstance(component_class, NextPyLazyComponent):
+                component_class = component_class.resolve() if component_class.resolved else None
+            # children restored from a snapshot already have their render
+            if component_class is None or self.restored_children.get(self.get_component_id(element_data)):
+                continue
+            batch.append((element_data, component_class))
 
-        return component_widget
+        if len(batch) < pool.min_batch:
+            return
+
+        instances = [(element_data, self._instantiate_component(component_class, element_data))
+                     for element_data, component_class in batch]
+        for element_data, component_instance in instances:
+            self._prerendered[id(element_data)] = (element_data, component_instance)
+
+        renderable = [component_instance for _, component_instance in instances if pool.can_prerender(component_instance)]
+        if len(renderable) < pool.min_batch:
+            return
+        for component_instance, root_element in zip(renderable, pool.render(renderable)):
+            if root_element is not None:
+                component_instance.renderer.restored_root_element = root_element
+
+    def _drop_prerendered(self, elements: list):
+        """Forget the prerendered components of elements that were not created after all"""
+        for element_data in elements:
+            self._prerendered.pop(id(element_data), None)
+
+    def _create_lazy_placeholder(self, element_data, lazy_component: NextPyLazyComponent) -> QWidget:
+        """Show a placeholder for a lazy component, and swap in the component once loaded on a later tick"""
+        placeholder = QWidget()
+        placeholder.setLayout(QVBoxLayout())
+        placeholder.layout().setContentsMargins(0, 0, 0, 0)
+        if lazy_component.fallback:
+            placeholder.layout().addWidget(QLabel(lazy_component.fallback))
+        self.widget_element_data[placeholder] = element_data
+
+        def load():
+            # the latest element data, the placeholder may have been updated or removed meanwhile
+            latest_element_data = self.widget_element_data.pop(placeholder, None)
+            if latest_element_data is None or sip.isdeleted(placeholder):
+                return
+
+            lazy_component.resolve()
+            component_widget = self._create_component_element(latest_element_data)
+            parent = placeholder.parentWidget()
+            if component_widget and parent is not None and parent.layout() is not None:
+                parent.layout().replaceWidget(placeholder, component_widget)
+            placeholder.deleteLater()
+
+        scheduler().schedule(load)
+        return placeholder
+
+    @staticmethod
+    def get_component_id(element_data) -> str:
+        """Get the id a child component is stored under, from its <component> element"""
+        return element_data.get('id', element_data.get('name'))
+
+    def mounted_child_components(self, widget: QWidget = None) -> list:
+        """
+        Get the child components currently in the widget tree, in document order
+
+        Args:
+            widget: Only look inside this widget. Defaults to the component's main widget
+
+        Returns:
+            list: (component id, component) tuples
+        """
+        children = []
+
+        def walk(widget):
+            component_instance = self.widget_components.get(widget)
+            if component_instance is not None:
+                children.append((self.get_component_id(self.widget_element_data[widget]), component_instance))
+                return
+
+            layout = widget.layout()
+            if layout is None:
+                return
+            for i in range(layout.count()):
+                child = layout.itemAt(i).widget()
+                if child is not None:
+                    walk(child)
+
+        if widget is not None:
+            walk(widget)
+        elif self.is_mounted():
+            walk(self.main_widget)
+        return children
+
+    def _remove_widget(self, widget: QWidget):
+        """Delete a widget that left the tree, unmounting the child components inside it"""
+        self._release_widget(widget)
+        widget.deleteLater()
+
+    def _release_widget(self, widget: QWidget):
+        """
+        Drop every registry entry of a widget and its descendants, unmounting child components
+        and destroying elements so nothing keeps them reachable once the widget is deleted
+
+        Args:
+            widget: The widget leaving the tree
+        """
+        if sip.isdeleted(widget):
+            return
+
+        for _, component_instance in self.mounted_child_components(widget):
+            component_instance.unmount()
+
+        for descendant in [widget] + widget.findChildren(QWidget):
+            element_data = self.widget_element_data.pop(descendant, None)
+
+            component_instance = self.widget_components.pop(descendant, None)
+            if component_instance is not None and element_data is not None:
+                component_id = self.get_component_id(element_data)
+                if self.child_components.get(component_id) is component_instance:
+                    del self.child_components[component_id]
+                ref = element_data.get('ref')
+                if ref and self.refs.get(ref) is component_instance:
+                    del self.refs[ref]
+
+            element_instance = self.widget_elements.pop(descendant, None)
+            if element_instance is not None:
+                element_id = element_instance.element.get('id')
+                if element_id and self.element_instances.get(element_id) is element_instance:
+                    del self.element_instances[element_id]
+                element_instance.destroy()
+
+    def unmount(self):
+        """Release the whole widget tree of this component and clear its registries"""
+        for handle in (self._sliced_render, self._sliced_update):
+            if handle is not None:
+                scheduler().cancel(handle)
+        self._sliced_render = self._sliced_update = self._sliced_root = None
+
+        if self.is_mounted():
+            self._release_widget(self.main_widget)
+        self.main_widget = None
+
+        self.element_instances.clear()
+        self.widget_elements.clear()
+        self.widget_components.clear()
+        self.widget_element_data.clear()
+        self.child_components.clear()
+        self.refs.clear()
+        self._prerendered.clear()
+        self.restored_root_element = None
+        self.restored_children = {}
 
     def cast_props_from_html(self, component_class, element_data):
         """
@@ -141,63 +508,209 @@ class NextPyRenderer(object):
         Returns:
             Dictionary of properly typed props according to schema
         """
-        if not hasattr(component_class, 'props_schema'):
-            return {}
+        # the casters of each props_schema field are resolved once per class
+        return component_metadata(component_class).cast_props(element_data)
 
-        schema = component_class.props_schema
-        type_hints = get_type_hints(schema)
+    def render(self) -> QWidget:
+        """Render the component and return its widget"""
+        with self._measure_render():
+            return self._render()
 
-        props = {}
-        for attr, target_type in type_hints.items():
-            if hasattr(element_data, attr):
-                raw_value = element_data.get(attr)
-                props[attr] = cast_value(raw_value, target_type)
+    def _load_metadata(self):
+        """Take the analysis of the template for this render, analyzing it on first use"""
+        self.metadata = self.template_metadata() if self.template_metadata else None
 
-        return props
+    def _measure_render(self):
+        """Time a render in the window's metrics, if there are any"""
+        metrics = getattr(self.window, 'metrics', None)
+        return metrics.measure_render() if metrics is not None else nullcontext()
 
-    def render(self) -> QWidget:
-        """Render the component and return its widget"""
+    def _render(self) -> QWidget:
         if not (self.template_engine and self.template_path):
             return QWidget()
 
+        self._load_metadata()
+
         # Create main widget if it doesn't exist
+        self._ensure_main_widget()
+
+        if self.restored_root_element is not None:
+            # Build the widgets from a snapshot or a prerender, without running the template
+            root_element, self.restored_root_element = self.restored_root_element, None
+            self._update_from_element(root_element)
+        else:
+            # Render template
+            html_content = self._render_html()
+
+            # Parse HTML and update widget tree
+            self._update_from_html(html_content)
+        self.restored_children = {}
+
+        # Call component_did_mount
+        self.component_did_mount()
+
+        return self.main_widget
+
+    def render_steps(self):
+        """
+        Render a component that is not mounted yet, yielding after each element is created, like
+        _create_element_steps. Driving it to the end gives the same widget tree as render.
+        Returns the widget through StopIteration
+        """
+        if not (self.template_engine and self.template_path):
+            return QWidget()
+
+        self._load_metadata()
+        root_element = self._take_root_element()
+        if root_element is not None:
+            self.main_widget = yield from self._create_element_steps(root_element)
+        else:
+            self._ensure_main_widget()
+        self.restored_children = {}
+
+        if self._pending_mounts is not None:
+            self._pending_mounts.append(self.component_did_mount)
+        else:
+            self.component_did_mount()
+        return self.main_widget
+
+    def _take_root_element(self):
+        """The root element to build: restored from a snapshot or a prerender, else rendered from the template"""
+        if self.restored_root_element is not None:
+            root_element, self.restored_root_element = self.restored_root_element, None
+            return root_element
+        return parse_root(self._render_html())
+
+    def _ensure_main_widget(self):
+        """Create an empty main widget if there is none yet"""
         if not self.main_widget:
             self.main_widget = QWidget()
             self.main_widget.setLayout(QVBoxLayout())
             self.main_widget.layout().setSpacing(0)
             self.main_widget.layout().setContentsMargins(0, 0, 0, 0)
 
-        # Render template
-        html_content = self.template_engine.render_template(
-            self.template_path,
-            state=self.state(),
-            computed={k: v() for k, v in self.computed().items()},
-            methods=self.methods(),
-            props=self.props(),
-        )
+    def render_sliced(self, priority=Priority.BACKGROUND, on_progress=None) -> QWidget:
+        """
+        Render the component over several event loop ticks, within the scheduler's time budget per tick,
+        so a very large tree does not block input. Child components are built element by element too.
+        The tree is built off screen and swapped in when complete, giving the same result as render;
+        mount hooks run once it is attached. A state change meanwhile is rendered at USER_BLOCKING priority,
+        before the next slice, and applied in place when the tree is committed; the build carries on.
 
-        # Parse HTML and update widget tree
-        self._update_from_html(html_content)
+        Args:
+            priority: The scheduler priority of the work
+            on_progress: Optional function called with (elements created, total elements) after each element
+                of this template. Children of <suspense> elements are created later, they are not counted
 
-        # Call component_did_mount
+        Returns:
+            QWidget: A placeholder, replaced in its parent layout by the rendered tree
+        """
+        if not (self.template_engine and self.template_path):
+            return QWidget()
+
+        self._ensure_main_widget()
+        self._load_metadata()
+        root_element = self._take_root_element()
+        if not root_element:
+            return self.main_widget
+
+        total = self._count_elements(root_element)
+        placeholder = self.main_widget
+        mounts = []
+
+        def job():
+            self._pending_mounts = mounts
+            try:
+                steps = self._create_element_steps(root_element)
+                created = 0
+                while True:
+                    try:
+                        own_element = next(steps)
+                    except StopIteration as done:
+                        widget = done.value
+                        break
+                    if own_element:
+                        created += 1
+                        if on_progress:
+                            on_progress(created, total)
+                    yield
+            finally:
+                self._pending_mounts = None
+            self._commit_sliced_render(placeholder, widget, mounts)
+
+        self._sliced_render = scheduler().schedule(job(), priority=priority)
+        return placeholder
+
+    def _commit_sliced_render(self, placeholder: QWidget, widget: Optional[QWidget], mounts: list):
+        """Swap the tree built by render_sliced in for its placeholder, then run the mount hooks"""
+        self._sliced_render = None
+        self.restored_children = {}
+        self.main_widget = widget
+
+        # Bring the tree up to date with the state changes made while it was built
+        if self._sliced_update is not None:
+            scheduler().cancel(self._sliced_update)
+            self._sliced_update = None
+            self._update_sliced_root()
+        root_element, self._sliced_root = self._sliced_root, None
+        if root_element is not None and widget is not None:
+            self._pending_mounts = mounts
+            try:
+                self._update_from_element(root_element)
+            finally:
+                self._pending_mounts = None
+
+        parent = None if sip.isdeleted(placeholder) else placeholder.parentWidget()
+        if self.main_widget and parent is not None and parent.layout() is not None:
+            parent.layout().replaceWidget(placeholder, self.main_widget)
+            placeholder.deleteLater()
+
+        for component_did_mount in mounts:
+            component_did_mount()
         self.component_did_mount()
 
-        return self.main_widget
+    def _queue_sliced_update(self):
+        """Render a state change made during a sliced render before its next slice, without stopping the build"""
+        if self._sliced_update is None:
+            self._sliced_update = scheduler().schedule(self._run_sliced_update, priority=Priority.USER_BLOCKING)
 
-    def _update_from_html(self, html_content: str):
-        """Update widget tree from HTML content"""
-        soup = BeautifulSoup(html_content, 'html.parser')
+    def _run_sliced_update(self):
+        self._sliced_update = None
+        self._update_sliced_root()
 
-        # Get the first real element (skip document node)
-        root_element = next(
-            (element for element in soup.children
-             if element.name is not None),
-            None
-        )
+    def _update_sliced_root(self):
+        """Render the template with the current state, for the tree being built to be updated to when committed"""
+        self._load_metadata()
+        self._sliced_root = parse_root(self._render_html(), store=False)
+
+    def _count_elements(self, element_data) -> int:
+        """
+        Count the elements _create_element_steps creates for element_data and yields True for:
+        child components count as one element, children of <suspense> are created later and are not counted
+        """
+        element_type = element_data.name.lower()
+        if element_type == 'component':
+            return 1
+
+        element_class = self._element_class(element_type)
+        if element_class is None:
+            return 0
+        if issubclass(element_class, NextPyDivElement) and not issubclass(element_class, NextPySuspenseElement):
+            return 1 + sum(self._count_elements(child) for child in element_data.children if child.name)
+        return 1
+
+    def _update_from_html(self, html_content: str, store=True):
+        """Update widget tree from HTML content, store is passed to parse_root"""
+        # Get the first real element (skip document node), from the template cache when enabled
+        root_element = parse_root(html_content, store=store)
 
         if not root_element:
             return
 
+        self._update_from_element(root_element)
+
+    def _update_from_element(self, root_element):
+        """Update widget tree from a parsed root element"""
         # Get current and new element states
         current_state = self._get_element_state(self.main_widget) if self.main_widget else None
         new_state = self._get_element_state_from_soup(root_element)
@@ -210,30 +723,7 @@ class NextPyRenderer(object):
         if not widget:
             return None
 
-        element_instance = next(
-            (inst for inst in self.element_instances.values()
-             if inst.widget == widget),
-            None
-        )
-
-        if not element_instance:
-            return None
-
-        children = [
-            child for child in element_instance.children
-            if child.name is not None
-        ]
-
-        return ElementState(
-            element_type=type(element_instance).__name__,
-            attributes=element_instance.attrs,
-            content=element_instance.string if element_instance.string else '',
-            element=element_instance,
-            children=[
-                self._get_element_state_from_soup(child)
-                for child in children
-            ]
-        )
+        return self._get_element_state_from_soup(self.widget_element_data.get(widget))
 
     def _get_element_state_from_soup(self, element) -> Optional[ElementState]:
         """Get element state from BeautifulSoup element"""
@@ -259,31 +749,58 @@ class NextPyRenderer(object):
 
     def _update_element_tree(self, widget: QWidget, current_state: ElementState, new_state: ElementState):
         """Update widget tree based on element states"""
-        if not current_state or current_state.element_type != new_state.element_type:
+        if (not current_state or current_state.element_type != new_state.element_type
+                or current_state.attributes.get('name') != new_state.attributes.get('name')):
             # Replace entire widget
             new_widget = self.create_element(new_state.element)
-            if widget and widget.parent():
+            if widget and widget.parent() and new_widget:
                 layout = widget.parent().layout()
                 layout.replaceWidget(widget, new_widget)
-                widget.deleteLater()
+                self._remove_widget(widget)
             return new_widget
 
+        self.widget_element_data[widget] = new_state.element
+
+        # Child components update themselves from their new props
+        if widget in self.widget_components:
+            return self._update_component_element(widget, new_state.element)
+
         # Update attributes and content
-        element_instance = next(
-            (inst for inst in self.element_instances.values()
-             if inst.widget == widget),
-            None
-        )
+        element_instance = self.widget_elements.get(widget)
         if element_instance:
+            element_instance.element = new_state.element
             self._update_element_attributes(element_instance, new_state.attributes)
             self._update_element_content(element_instance, new_state.content)
+            if element_instance.bound_path is not None:
+                element_instance.set_bound_value(get_in(self.state(), element_instance.bound_path))
 
         # Update children
+        if isinstance(element_instance, NextPySuspenseElement):
+            # children still waiting to be attached are created by the update instead
+            element_instance.cancel_pending()
         if isinstance(element_instance, NextPyDivElement):
-            self._update_children(widget, current_state.children, new_state.children)
+            self._update_children(widget, new_state.children)
 
         return widget
 
+    def _update_component_element(self, widget: QWidget, element_data) -> QWidget:
+        """Pass new props to a child component, which re-renders only if they changed"""
+        component_instance = self.widget_components[widget]
+        props = self.cast_props_from_html(type(component_instance), element_data)
+        if props == component_instance.props:
+            return widget
+
+        component_instance.props = props
+        component_instance.renderer.rerender_component()
+
+        new_widget = component_instance.renderer.main_widget
+        if new_widget is not widget:
+            del self.widget_components[widget]
+            self.widget_element_data.pop(widget, None)
+            self.widget_components[new_widget] = component_instance
+            self.widget_element_data[new_widget] = element_data
+        return new_widget
+
     def _update_element_attributes(self, element_instance, new_attributes: dict):
         """
         Update the attributes of a widget element
@@ -299,38 +816,7 @@ class NextPyRenderer(object):
         if current_attributes == new_attributes:
             return
 
-        # Update style attributes
-        if 'style' in new_attributes:
-            stylesheet = self._build_stylesheet(new_attributes['style'])
-            element_instance.widget.setStyleSheet(stylesheet)
-
-        # Update enabled state
-        if 'disabled' in new_attributes:
-            element_instance.widget.setEnabled(not new_attributes['disabled'])
-
-        # Update visibility
-        if 'hidden' in new_attributes:
-            element_instance.widget.setVisible(not new_attributes['hidden'])
-
-        # Update specific widget type attributes
-        widget_type = type(element_instance).__name__
-
-        if widget_type == 'NextPyButtonElement':
-            if 'text' in new_attributes:
-                element_instance.widget.setText(new_attributes['text'])
-
-        elif widget_type == 'NextPyInputElement':
-            if 'placeholder' in new_attributes:
-                element_instance.widget.setPlaceholderText(new_attributes['placeholder'])
-            if 'value' in new_attributes:
-                element_instance.widget.setText(new_attributes['value'])
-
-        elif widget_type == 'NextPyCheckboxElement':
-            if 'checked' in new_attributes:
-                element_instance.widget.setChecked(new_attributes['checked'])
-
-        # Store new attributes
-        element_instance.attributes = new_attributes
+        element_instance.update_attributes(new_attributes, self.methods())
 
     def _update_element_content(self, element_instance, new_content: str):
         """
@@ -340,81 +826,70 @@ class NextPyRenderer(object):
             element_instance: The widget element instance to update
             new_content: New content string to set
         """
-        # Skip if content hasn't changed
-        current_content = getattr(element_instance, 'content', '')
-        if current_content == new_content:
-            return
+        element_instance.update_content(new_content)
 
-        # Update based on widget type
-        widget_type = type(element_instance).__name__
-
-        if widget_type in ['NextPyButtonElement', 'NextPyLabelElement']:
-            element_instance.widget.setText(new_content)
-        elif widget_type == 'NextPyInputElement':
-            # Only update if the input doesn't have focus to avoid disrupting user typing
-            if not element_instance.widget.hasFocus():
-                element_instance.widget.setText(new_content)
-
-        # Store new content
-        element_instance.content = new_content
-
-    def _update_children(self, parent_widget: "QWidget", current_children: list[ElementState], new_children: list[ElementState]):
+    def _update_children(self, parent_widget: "QWidget", new_children: list[ElementState]):
         """
-        Update child widgets within a container widget
+        Update child widgets within a container widget.
+        Widgets are matched to the new children by key, in order, so matching widgets are updated in place
+        instead of being rebuilt. Children without a key or id match the widget of the same type at the same
+        position among its siblings.
 
         Args:
             parent_widget: The parent QWidget containing children
-            current_children: List of current child ElementStates
             new_children: List of new child ElementStates
         """
         layout = parent_widget.layout()
-        if not layout:
+        if layout is None:
             return
 
-        # Create maps for current and new children using their IDs or content as keys
-        current_map = {
-            self._get_element_key(child): child
-            for child in current_children if child
-        }
-        new_map = {
-            self._get_element_key(child): child
-            for child in new_children if child
-        }
-
-        # Track processed widgets to handle removals
-        processed_widgets = set()
-
-        # Process new children
-        for i, new_child in enumerate(new_children):
-            if not new_child:
-                continue
-
-            key = self._get_element_key(new_child)
-            current_child = current_map.get(key)
-
+        # Map the widgets currently in the layout by key, keeping their order for duplicate keys
+        current_map = {}
+        for i in range(layout.count()):
+            widget = layout.itemAt(i).widget()
+            current_child = self._get_element_state(widget)
             if current_child:
-                # Update existing child
-                widget = layout.itemAt(i).widget() if i < layout.count() else None
+                current_map.setdefault(self._get_element_key(current_child), deque()).append((widget, current_child))
+
+        # Pair each new child with the next unused widget of the same key
+        pairs = []
+        for new_child in new_children:
+            if new_child:
+                matches = current_map.get(self._get_element_key(new_child))
+                pairs.append((new_child, matches.popleft() if matches else None))
+
+        # New children without a widget to update are created, prerender the components among them
+        created = [new_child.element for new_child, match in pairs if match is None]
+        self._prerender_components(created)
+
+        # Update or create the widget for each new child
+        new_widgets = []
+        try:
+            for new_child, match in pairs:
+                if match:
+                    widget, current_child = match
+                    widget = self._update_element_tree(widget, current_child, new_child)
+                else:
+                    widget = self.create_element(new_child.element)
+
                 if widget:
-                    updated_widget = self._update_element_tree(widget, current_child, new_child)
-                    processed_widgets.add(widget)
-                    if updated_widget != widget:
-                        layout.replaceWidget(widget, updated_widget)
-            else:
-                # Insert new child
-                new_widget = self.create_element(new_child.element)
-                if new_widget:
-                    layout.insertWidget(i, new_widget)
-
-        # Remove unprocessed widgets (ones that don't exist in new children)
-        i = 0
-        while i < layout.count():
+                    new_widgets.append(widget)
+        finally:
+            self._drop_prerendered(created)
+
+        # Remove widgets that don't exist in new children
+        kept_widgets = set(new_widgets)
+        for i in reversed(range(layout.count())):
             widget = layout.itemAt(i).widget()
-            if widget and widget not in processed_widgets:
+            if widget and widget not in kept_widgets:
                 layout.removeWidget(widget)
-                widget.deleteLater()
-            else:
-                i += 1
+                self._remove_widget(widget)
+
+        # Move widgets into their new order
+        for index, widget in enumerate(new_widgets):
+            if layout.indexOf(widget) != index:
+                layout.removeWidget(widget)
+                layout.insertWidget(index, widget)
 
     @staticmethod
     def _get_element_key(element_state: "ElementState") -> str:
@@ -430,41 +905,91 @@ class NextPyRenderer(object):
         if not element_state:
             return None
 
+        # Prefer an explicit key, e.g. <component key="{{ todo.id }}">
+        key = element_state.attributes.get('key')
+        if key:
+            return f"key:{key}"
+
         # Try to get ID from attributes
         element_id = element_state.attributes.get('id')
         if element_id:
             return f"id:{element_id}"
 
-        # Fall back to element type + content as key
-        return f"{element_state.element_type}:{element_state.content}"
+        # Fall back to the element type, and the component name for child components. Unkeyed siblings
+        # sharing it are matched by position, so a changed text updates the widget instead of replacing it
+        return f"{element_state.element_type}:{element_state.attributes.get('name', '')}"
 
-    @staticmethod
-    def _build_stylesheet(style_dict: dict) -> str:
-        """Convert a style dictionary to a Qt stylesheet string."""
-        if not style_dict:
-            return ""
-        # Convert camelCase keys to kebab-case and build stylesheet parts
-        stylesheet_parts = [
-            f"{''.join(f'-{c.lower()}' if c.isupper() else c for c in key).lstrip('-')}: {value};"
-            for key, value in style_dict.items()
-        ]
-        return ' '.join(stylesheet_parts)
-
-    def rerender_component(self, changed_keys: Optional[set] = None):
-        """Rerender component, optionally based on changed state keys"""
-        if not self.main_widget:
-            return
-
-        # If this is the root component, tell the window to rerender
-        if self.window is not None:
-            return self.window.rerender()
-
-        # Get new content and update widget tree
-        html_content = self.template_engine.render_template(
+    def _render_html(self, computed: Optional[dict] = None) -> str:
+        """Render the template with the current state, remembering the computed values it was rendered with"""
+        self._rendered_computed = computed if computed is not None else {k: v() for k, v in self.computed().items()}
+        return self.template_engine.render_template(
             self.template_path,
             state=self.state(),
-            computed={k: v() for k, v in self.computed().items()},
+            computed=self._rendered_computed,
             methods=self.methods(),
             props=self.props(),
         )
-        self._update_from_html(html_content)
\ No newline at end of file
+
+    def _output_unaffected(self, changed_paths: list, computed: dict) -> bool:
+        """
+        Check a state change can't change the rendered template: the template reads none of the changed paths,
+        see NextPyTemplateMetadata.state_paths, and every computed value is the same as in the last render
+        """
+        read_paths = self.metadata.state_paths if self.metadata is not None else None
+        if not changed_paths or read_paths is None or self._rendered_computed is None:
+            return False
+        if any(paths_overlap(changed, read) for changed in changed_paths for read in read_paths):
+            return False
+        try:
+            return bool(computed == self._rendered_computed)
+        except Exception:
+            # e.g. arrays, which don't compare to a single bool
+            return False
+
+    def _update_bound_values(self, changed_paths: list):
+        """Push changed state values into the widgets bound to them, without rendering"""
+        for element_instance in list(self.widget_elements.values()):
+            bound_path = element_instance.bound_path
+            if bound_path is not None and any(paths_overlap(bound_path, changed) for changed in changed_paths):
+                element_instance.set_bound_value(get_in(self.state(), bound_path))
+
+    def is_mounted(self) -> bool:
+        """Check the component has rendered and its widget has not been deleted"""
+        return self.main_widget is not None and not sip.isdeleted(self.main_widget)
+
+    def rerender_component(self, changed_keys: Optional[set] = None, changed_paths: Optional[list] = None):
+        """
+        Rerender component. Given the changed state keys or nested state paths, the render is skipped
+        when the template reads none of them and no computed value changed
+
+        Args:
+            changed_keys: The top level state keys that changed
+            changed_paths: The nested state paths that changed, as tuples of keys/indexes
+        """
+        if changed_paths is None and changed_keys:
+            changed_paths = [(key,) for key in changed_keys]
+
+        # The tree of a sliced render in progress is not attached yet, it is updated when committed
+        if self._sliced_render is not None:
+            self._queue_sliced_update()
+            return
+
+        with self._measure_render():
+            self._rerender_component(changed_paths)
+
+    def _rerender_component(self, changed_paths: Optional[list] = None):
+        if not self.main_widget:
+            return
+
+        self.changed_paths = changed_paths or []
+        self._load_metadata()
+
+        computed = {k: v() for k, v in self.computed().items()}
+        if self._output_unaffected(self.changed_paths, computed):
+            # e.g. typing into a bound input, the input already shows the new value
+            self._update_bound_values(self.changed_paths)
+            return
+
+        # Get new content and update widget tree, a re-render's output is not worth caching
+        html_content = self._render_html(computed)
+        self._update_from_html(html_content, store=False)
\ No newline at end of file
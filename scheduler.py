@@ -0,0 +1,119 @@
+import inspect
+import logging
+import time
+from collections import deque
+from enum import IntEnum
+
+from PyQt6.QtCore import QObject, QTimer
+
+
+class Priority(IntEnum):
+    """Scheduler priorities, lower runs first"""
+    USER_BLOCKING = 0  # updates caused by input, e.g. typing
+    NORMAL = 1  # suspense children, lazy components
+    BACKGROUND = 2  # large renders nobody is waiting on
+
+
+class NextPyScheduler(QObject):
+    """
+    Runs queued render work over event loop ticks.
+    Each tick runs jobs until its time budget is spent, then yields back to Qt so input and painting stay responsive.
+    Jobs run by priority. A job can be a generator, which is resumed step by step across ticks,
+    so higher priority work queued meanwhile runs before its next step.
+    """
+    def __init__(self, budget=8, parent=None):
+        """
+        Constructor for NextPyScheduler
+        :param budget: milliseconds of work per event loop tick
+        :param parent: the parent QObject
+        """
+        super().__init__(parent)
+        self.budget = budget
+        self._queues = {priority: deque() for priority in Priority}
+
+        self._timer = QTimer(self)
+        self._timer.setSingleShot(True)
+        self._timer.setInterval(0)
+        self._timer.timeout.connect(self.run_tick)
+
+    def schedule(self, job, priority=Priority.NORMAL):
+        """
+        Queue a job to run on a later tick
+        :param job: function taking no arguments, or a generator resumed until it is exhausted
+        :param priority: the priority of the job
+        :return: a handle that can be passed to cancel
+        """
+        handle = [job]
+        self._queues[priority].append(handle)
+        if not self._timer.isActive():
+            self._timer.start()
+        return handle
+
+    @staticmethod
+    def cancel(handle):
+        """
+        Cancel a job that has not finished yet
+        :param handle: the handle returned by schedule
+        :return: void
+        """
+        job, handle[0] = handle[0], None
+        if inspect.isgenerator(job):
+            job.close()
+
+    @property
+    def pending(self) -> bool:
+        """True while jobs are waiting to run"""
+        return any(handle[0] is not None for queue in self._queues.values() for handle in queue)
+
+    def _run_step(self) -> bool:
+        """Run the next step of the highest priority job, returns False if there is nothing to run"""
+        for queue in self._queues.values():
+            while queue:
+                handle = queue.popleft()
+                job = handle[0]
+                if job is None:
+                    continue
+
+                try:
+                    if not inspect.isgenerator(job):
+                        job()
+                        return True
+                    next(job)
+                except StopIteration:
+                    return True
+                except Exception as e:
+                    # a failing job is dropped, the jobs queued after it still run
+                    logging.error(f"Scheduled job failed: {e}", exc_info=True)
+                    return True
+                # not done, resume it before other jobs of the same priority
+                if handle[0] is not None:
+                    queue.appendleft(handle)
+                return True
+        return False
+
+    def run_tick(self):
+        """Run jobs until the time budget of this tick is spent"""
+        deadline = time.perf_counter() + self.budget / 1000
+        while time.perf_counter() < deadline:
+            if not self._run_step():
+                return
+
+        if self.pending:
+            self._timer.start()
+
+    def run_all(self):
+        """Run every queued job now, ignoring the time budget. Meant for tests and scripts"""
+        while self._run_step():
+            pass
+        self._timer.stop()
+
+
+_scheduler = None
+
+
+def scheduler() -> NextPyScheduler:
+    """Get the scheduler shared by every renderer, creating it on first use"""
+    global _scheduler
+    if _scheduler is None:
+        _scheduler = NextPyScheduler()
+    return _scheduler
@@ -0,0 +1,137 @@
+from typing import Any, Callable, List
+
+# Stack of computed signals currently evaluating, used to track their dependencies
+_observers: List["NextPyComputedSignal"] = []
+
+
+def _same_value(old, new) -> bool:
+    """Check if a signal value is unchanged, without comparing values of different types"""
+    return old is new or (type(old) is type(new) and old == new)
+
+
+class NextPySignal:
+    """
+    A reactive value.
+    Subscribers, such as widget properties bound in a template, are called directly when the value changes,
+    without rendering the template or diffing the widget tree.
+    """
+    def __init__(self, value: Any = None, name: str = None):
+        """
+        Constructor for NextPySignal
+        :param value: the initial value
+        :param name: the name templates use to bind to this signal
+        """
+        self.name = name
+        self._value = value
+        self._subscribers = []
+
+    def get(self) -> Any:
+        """
+        Get the current value, registering this signal as a dependency of the computed signal being evaluated
+        :return: the current value
+        """
+        if _observers:
+            _observers[-1]._depend_on(self)
+        return self._value
+
+    def set(self, value: Any):
+        """
+        Set the value and notify subscribers if it changed
+        :param value: the new value
+        :return: void
+        """
+        if _same_value(self._value, value):
+            return
+        self._value = value
+        self._notify()
+
+    def update(self, func: Callable[[Any], Any]):
+        """
+        Set the value from the current one
+        e.g. counter.update(lambda count: count + 1)
+        :param func: function receiving the current value and returning the new one
+        :return: void
+        """
+        self.set(func(self._value))
+
+    value = property(get, set)
+
+    def subscribe(self, callback: Callable[[Any], None], immediate=True) -> Callable[[], None]:
+        """
+        Call callback with the new value every time the value changes
+        :param callback: the callback to call
+        :param immediate: if immediate is True, callback is called with the current value right away
+        :return: a function that unsubscribes the callback
+        """
+        self._subscribers.append(callback)
+        if immediate:
+            callback(self.get())
+
+        def unsubscribe():
+            if callback in self._subscribers:
+                self._subscribers.remove(callback)
+
+        return unsubscribe
+
+    def _notify(self):
+        for callback in list(self._subscribers):
+            callback(self._value)
+
+    def __repr__(self):
+        return f"{self.__class__.__name__}({self.name!r}, {self._value!r})"
+
+
+class NextPyComputedSignal(NextPySignal):
+    """
+    A value derived from other signals.
+    Dependencies are tracked automatically each time the value is computed,
+    and the value is only recomputed when one of them changes.
+    """
+    def __init__(self, func: Callable[[], Any], name: str = None):
+        """
+        Constructor for NextPyComputedSignal
+        :param func: function computing the value from other signals
+        :param name: the name templates use to bind to this signal
+        """
+        super().__init__(name=name)
+        self._func = func
+        self._dirty = True
+        self._dependencies = {}
+
+    def get(self) -> Any:
+        if self._dirty:
+            self._compute()
+        return super().get()
+
+    def set(self, value: Any):
+        raise AttributeError(f"Computed signal '{self.name}' is read only")
+
+    value = property(get, set)
+
+    def _depend_on(self, signal: NextPySignal):
+        if signal not in self._dependencies:
+            self._dependencies[signal] = signal.subscribe(self._on_dependency_changed, immediate=False)
+
+    def _compute(self):
+        # Drop the old dependencies, the computation registers the ones it still uses
+        for unsubscribe in self._dependencies.values():
+            unsubscribe()
+        self._dependencies = {}
+
+        _observers.append(self)
+        try:
+            self._value = self._func()
+        finally:
+            _observers.pop()
+        self._dirty = False
+
+    def _on_dependency_changed(self, _value):
+        if not self._subscribers:
+            # nobody is watching, compute on next read
+            self._dirty = True
+            return
+
+        old_value = self._value
+        self._compute()
+        if not _same_value(old_value, self._value):
+            self._notify()
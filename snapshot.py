@@ -0,0 +1,147 @@
+import importlib
+import json
+import zlib
+from typing import Any, Dict
+
+from bs4 import BeautifulSoup, NavigableString, Tag
+
+# Bump when the snapshot layout changes, older snapshots are rejected
+SNAPSHOT_VERSION = 1
+
+
+def element_to_vnode(element: Tag) -> Dict[str, Any]:
+    """
+    Convert a parsed element into a JSON friendly vnode
+    :param element: the BeautifulSoup element
+    :return: dict with the tag name, attributes and children. Text children are kept as strings
+    """
+    children = []
+    for child in element.children:
+        if isinstance(child, Tag):
+            children.append(element_to_vnode(child))
+        elif isinstance(child, NavigableString) and type(child) is NavigableString:
+            children.append(str(child))
+
+    return {'tag': element.name, 'attrs': dict(element.attrs), 'children': children}
+
+
+def vnode_to_element(vnode: Dict[str, Any], soup: BeautifulSoup = None) -> Tag:
+    """
+    Rebuild a parsed element from a vnode, without parsing any HTML
+    :param vnode: the vnode created by element_to_vnode
+    :param soup: the document the element is created in
+    :return: the BeautifulSoup element
+    """
+    soup = soup or BeautifulSoup('', 'html.parser')
+    element, last = _build_element(vnode, soup, None)
+    last.next_element = None
+    return element
+
+
+def _build_element(vnode: Dict[str, Any], soup: BeautifulSoup, previous):
+    """
+    Create an element and its children, linking them as the parser does, which is much cheaper than append
+    :param previous: the node before the element in document order
+    :return: (element, its last descendant)
+    """
+    element = soup.new_tag(vnode['tag'], attrs=vnode['attrs'])
+    element.previous_element = previous
+    last = element
+    sibling = None
+    for child in vnode['children']:
+        if isinstance(child, str):
+            node = node_last = NavigableString(child)
+            node.previous_element = last
+        else:
+            node, node_last = _build_element(child, soup, last)
+        last.next_element = node
+        node.parent = element
+        node.previous_sibling = sibling
+        if sibling is not None:
+            sibling.next_sibling = node
+        element.contents.append(node)
+        sibling = node
+        last = node_last
+    return element, last
+
+
+def dumps(snapshot: Dict[str, Any], compress=False):
+    """
+    Serialize a snapshot. Raises ValueError naming the first value that is not JSON, e.g. snapshot.state.rows
+    :param snapshot: the snapshot created by NextPyComponent.snapshot
+    :param compress: if compress is True, returns zlib compressed bytes instead of a JSON string
+    :return: JSON string or compressed bytes
+    """
+    try:
+        data = json.dumps(snapshot, separators=(',', ':'))
+    except (TypeError, ValueError) as e:
+        path, value = _find_non_json(snapshot, 'snapshot')
+        raise ValueError(
+            f"Can't snapshot {type(value).__name__} at {path}: state, props and signals must hold JSON values"
+        ) from e
+    if compress:
+        return zlib.compress(data.encode('utf-8'))
+    return data
+
+
+def _find_non_json(value, path):
+    """Find the first value json can't serialize, as (path, value)"""
+    if isinstance(value, dict):
+        for key, item in value.items():
+            if not isinstance(key, str):
+                return f"{path}[{key!r}]", key
+            found = _find_non_json(item, f"{path}.{key}")
+            if found[0] is not None:
+                return found
+    elif isinstance(value, list):
+        for index, item in enumerate(value):
+            found = _find_non_json(item, f"{path}[{index}]")
+            if found[0] is not None:
+                return found
+    elif not isinstance(value, (str, int, float, bool, type(None))):
+        return path, value
+    return None, None
+
+
+def loads(data) -> Dict[str, Any]:
+    """
+    Deserialize a snapshot created with dumps, compressed or not
+    :param data: JSON string or compressed bytes
+    :return: the snapshot
+    """
+    if isinstance(data, bytes):
+        data = zlib.decompress(data).decode('utf-8')
+
+    snapshot = json.loads(data)
+    if snapshot.get('version') != SNAPSHOT_VERSION:
+        raise ValueError(f"Unsupported snapshot version {snapshot.get('version')}, expected {SNAPSHOT_VERSION}")
+    return snapshot
+
+
+def component_class_path(component_class) -> str:
+    """Get the import path stored in snapshots for a component class"""
+    return f"{component_class.__module__}:{component_class.__qualname__}"
+
+
+def import_component_class(path: str):
+    """Import a component class from the path stored in a snapshot"""
+    module_name, qualname = path.split(':')
+    value = importlib.import_module(module_name)
+    for name in qualname.split('.'):
+        value = getattr(value, name)
+    return value
+
+
+def restore_component(snapshot: Dict[str, Any], template_engine=None, **kwargs):
+    """
+    Create a component from a snapshot. Rendering it rebuilds the whole tree from the stored vnodes,
+    without running any template, and restores the state of every child component.
+    :param snapshot: the snapshot created by NextPyComponent.snapshot
+    :param template_engine: the template engine used by later re-renders
+    :param kwargs: passed to the component constructor
+    :return: the component, ready to be rendered
+    """
+    component_class = import_component_class(snapshot['component'])
+    component = component_class(template_engine=template_engine, props=snapshot['props'], **kwargs)
+    component.load_snapshot(snapshot)
+    return component
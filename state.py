@@ -0,0 +1,291 @@
+from collections.abc import Mapping, Sequence
+from typing import Any, Iterable, List, Tuple
+
+
+class _Missing:
+    """Marker for a key that does not exist on one side of a diff"""
+    def __repr__(self):
+        return "<missing>"
+
+
+MISSING = _Missing()
+
+# Values cheap enough to compare by value instead of identity
+_SCALAR_TYPES = (str, int, float, bool, bytes, type(None))
+
+
+def _unchanged(old, new) -> bool:
+    """Check if a value is unchanged: containers by identity, scalars by value"""
+    if old is new:
+        return True
+    return type(old) is type(new) and isinstance(new, _SCALAR_TYPES) and old == new
+
+
+class NextPyState(Mapping):
+    """
+    Immutable mapping used as component state.
+    Every change returns a new NextPyState that shares all untouched values with the old one,
+    so a changed value can be found with an identity check instead of a deep comparison.
+    """
+    __slots__ = ('_data',)
+
+    def __init__(self, data=None):
+        """
+        Constructor for NextPyState
+        :param data: a mapping of values. Nested dicts and lists are frozen as well
+        """
+        self._data = {key: freeze(value) for key, value in (data or {}).items()}
+
+    @classmethod
+    def _wrap(cls, data: dict) -> "NextPyState":
+        """Build a state around an already frozen dict without copying it"""
+        state = cls.__new__(cls)
+        state._data = data
+        return state
+
+    def __getitem__(self, key):
+        return self._data[key]
+
+    def __iter__(self):
+        return iter(self._data)
+
+    def __len__(self):
+        return len(self._data)
+
+    def __repr__(self):
+        return f"{self.__class__.__name__}({self._data!r})"
+
+    def set(self, key, value) -> "NextPyState":
+        """
+        Set a value
+        :param key: the key to set
+        :param value: the new value
+        :return: a new state, or this state if the value is unchanged
+        """
+        value = freeze(value)
+        if _unchanged(self._data.get(key, MISSING), value):
+            return self
+
+        data = self._data.copy()
+        data[key] = value
+        return self._wrap(data)
+
+    def merge(self, values: Mapping) -> "NextPyState":
+        """
+        Set several values at once
+        :param values: mapping of keys to new values
+        :return: a new state, or this state if no value changed
+        """
+        data = None
+        for key, value in values.items():
+            value = freeze(value)
+            if _unchanged(self._data.get(key, MISSING), value):
+                continue
+            if data is None:
+                data = self._data.copy()
+            data[key] = value
+
+        return self if data is None else self._wrap(data)
+
+    def delete(self, key) -> "NextPyState":
+        """
+        Remove a key
+        :param key: the key to remove
+        :return: a new state without the key
+        """
+        if key not in self._data:
+            return self
+
+        data = self._data.copy()
+        del data[key]
+        return self._wrap(data)
+
+    def set_in(self, path: Iterable, value) -> "NextPyState":
+        return set_in(self, path, value)
+
+    def get_in(self, path: Iterable, default=None):
+        return get_in(self, path, default)
+
+
+class NextPyStateList(Sequence):
+    """
+    Immutable list used inside component state.
+    Supports the list operations templates and components use, returning new lists that share their items.
+    """
+    __slots__ = ('_items',)
+
+    def __init__(self, items=()):
+        """
+        Constructor for NextPyStateList
+        :param items: an iterable of items. Nested dicts and lists are frozen as well
+        """
+        self._items = tuple(freeze(item) for item in items)
+
+    @classmethod
+    def _wrap(cls, items: tuple) -> "NextPyStateList":
+        """Build a list around an already frozen tuple without copying it"""
+        state_list = cls.__new__(cls)
+        state_list._items = items
+        return state_list
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return self._wrap(self._items[index])
+        return self._items[index]
+
+    def __len__(self):
+        return len(self._items)
+
+    def __iter__(self):
+        return iter(self._items)
+
+    def __add__(self, other):
+        other = other._items if isinstance(other, NextPyStateList) else tuple(freeze(item) for item in other)
+        return self._wrap(self._items + other)
+
+    def __eq__(self, other):
+        if isinstance(other, NextPyStateList):
+            return self._items == other._items
+        if isinstance(other, (list, tuple)):
+            return list(self._items) == list(other)
+        return NotImplemented
+
+    def __repr__(self):
+        return f"{self.__class__.__name__}({list(self._items)!r})"
+
+    def set(self, index: int, value) -> "NextPyStateList":
+        """
+        Replace the item at index
+        :param index: the index to replace
+        :param value: the new item
+        :return: a new list, or this list if the item is unchanged
+        """
+        value = freeze(value)
+        if _unchanged(self._items[index], value):
+            return self
+
+        items = list(self._items)
+        items[index] = value
+        return self._wrap(tuple(items))
+
+    def append(self, value) -> "NextPyStateList":
+        return self._wrap(self._items + (freeze(value),))
+
+    def insert(self, index: int, value) -> "NextPyStateList":
+        items = list(self._items)
+        items.insert(index, freeze(value))
+        return self._wrap(tuple(items))
+
+    def delete(self, index: int) -> "NextPyStateList":
+        items = list(self._items)
+        del items[index]
+        return self._wrap(tuple(items))
+
+    def set_in(self, path: Iterable, value) -> "NextPyStateList":
+        return set_in(self, path, value)
+
+    def get_in(self, path: Iterable, default=None):
+        return get_in(self, path, default)
+
+
+def freeze(value: Any) -> Any:
+    """
+    Convert dicts and lists into their immutable state containers.
+    Already frozen values are returned as is, so shared sub trees are never copied.
+    :param value: value to freeze
+    :return: the frozen value
+    """
+    if isinstance(value, (NextPyState, NextPyStateList)):
+        return value
+    if isinstance(value, dict):
+        return NextPyState(value)
+    if isinstance(value, (list, tuple)):
+        return NextPyStateList(value)
+    return value
+
+
+def thaw(value: Any) -> Any:
+    """
+    Convert immutable state containers back into plain dicts and lists
+    :param value: value to thaw
+    :return: the plain python value
+    """
+    if isinstance(value, NextPyState):
+        return {key: thaw(item) for key, item in value.items()}
+    if isinstance(value, NextPyStateList):
+        return [thaw(item) for item in value]
+    return value
+
+
+def get_in(container: Any, path: Iterable, default=None) -> Any:
+    """
+    Read a nested value
+    :param container: the dict, list or state container to read from
+    :param path: the keys/indexes leading to the value
+    :param default: returned if the path does not exist
+    :return: the nested value
+    """
+    value = container
+    for key in path:
+        try:
+            value = value[key]
+        except (KeyError, IndexError, TypeError):
+            return default
+    return value
+
+
+def set_in(container: Any, path: Iterable, value: Any) -> Any:
+    """
+    Set a nested value by copying only the containers along the path.
+    Works on state containers as well as plain dicts and lists, which are shallow copied instead of mutated.
+    :param container: the dict, list or state container to update
+    :param path: the keys/indexes leading to the value
+    :param value: the new value
+    :return: the updated container
+    """
+    path = list(path)
+    if not path:
+        return value
+
+    key, rest = path[0], path[1:]
+    child = set_in(container[key], rest, value) if rest else value
+
+    if isinstance(container, (NextPyState, NextPyStateList)):
+        return container.set(key, child)
+
+    copied = container.copy()
+    copied[key] = child
+    return copied
+
+
+def diff_paths(old: Any, new: Any, path: Tuple = ()) -> List[Tuple]:
+    """
+    Find the paths of every value that changed between two states.
+    Unchanged sub trees are skipped with an identity check, so the cost follows the size of the change.
+    :param old: the old state
+    :param new: the new state
+    :param path: the path of old/new inside the root state
+    :return: list of changed paths, as tuples of keys/indexes
+    """
+    if _unchanged(old, new):
+        return []
+
+    if isinstance(old, NextPyState) and isinstance(new, NextPyState):
+        paths = []
+        for key in old.keys() | new.keys():
+            paths.extend(diff_paths(old.get(key, MISSING), new.get(key, MISSING), path + (key,)))
+        return paths
+
+    if isinstance(old, NextPyStateList) and isinstance(new, NextPyStateList) and len(old) == len(new):
+        paths = []
+        for index, (old_item, new_item) in enumerate(zip(old, new)):
+            paths.extend(diff_paths(old_item, new_item, path + (index,)))
+        return paths
+
+    return [path]
+
+
+def paths_overlap(path: Tuple, other: Tuple) -> bool:
+    """Check if changing the value at one path can change the value at the other, i.e. one is a prefix of the other"""
+    length = min(len(path), len(other))
+    return tuple(path[:length]) == tuple(other[:length])
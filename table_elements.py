@@ -0,0 +1,618 @@
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from collections.abc import Mapping, Sequence
+from typing import Any, List, Optional, Tuple
+
+from PyQt6.QtCore import QAbstractItemModel, QAbstractTableModel, QModelIndex, QSize, Qt
+from PyQt6.QtGui import QTextDocument
+from PyQt6.QtWidgets import QAbstractItemView, QApplication, QListView, QStyle, QStyledItemDelegate, \
+    QStyleOptionViewItem, QTableView, QTreeView
+
+from data_source import CHANGED, INSERTED, NextPyDataSource
+from elements import NextPyElement
+from state import NextPyState, NextPyStateList, freeze, set_in, thaw
+from utils import is_value_true
+
+
+def same_row(old, new) -> bool:
+    """Check if a row is unchanged, by identity first so unchanged immutable rows are never compared deeply"""
+    return old is new or old == new
+
+
+def diff_rows(old_rows, new_rows) -> Tuple[int, int, int]:
+    """
+    Find the rows that changed between two row lists, skipping their common prefix and suffix
+    :param old_rows: the rows shown until now
+    :param new_rows: the rows to show
+    :return: (start, old_end, new_end), old_rows[start:old_end] is replaced by new_rows[start:new_end]
+    """
+    old_end, new_end = len(old_rows), len(new_rows)
+    start = 0
+    while start < old_end and start < new_end and same_row(old_rows[start], new_rows[start]):
+        start += 1
+    while old_end > start and new_end > start and same_row(old_rows[old_end - 1], new_rows[new_end - 1]):
+        old_end -= 1
+        new_end -= 1
+    return start, old_end, new_end
+
+
+def changed_ranges(old_rows, new_rows, start, end) -> List[Tuple[int, int]]:
+    """Group the rows differing between start and end into (first, last) ranges"""
+    ranges = []
+    for index in range(start, end):
+        if same_row(old_rows[index], new_rows[index]):
+            continue
+        if ranges and ranges[-1][1] == index - 1:
+            ranges[-1] = (ranges[-1][0], index)
+        else:
+            ranges.append((index, index))
+    return ranges
+
+
+def cell_value(row, column) -> Any:
+    """Read a column of a row: a key of mappings, an index of sequences, an attribute otherwise"""
+    if isinstance(row, Mapping):
+        return row.get(column)
+    if isinstance(row, Sequence) and not isinstance(row, str):
+        try:
+            return row[int(column)]
+        except (ValueError, IndexError):
+            return None
+    return getattr(row, column, None)
+
+
+def _cell_key(row, column):
+    """The path element writing a column of a row, see cell_value"""
+    if isinstance(row, Sequence) and not isinstance(row, (str, Mapping)):
+        return int(column)
+    return column
+
+
+class _ItemModelMixin:
+    """Cell access shared by the table and tree models"""
+    def _init_columns(self, columns: List[str], headers: Optional[List[str]] = None):
+        self.columns = columns
+        self.headers = headers or columns
+        self.editable = False
+        # Called with (path, value) when a cell is edited, path being the cell path in the bound rows
+        self.write_cell = None
+
+    def columnCount(self, parent=QModelIndex()):
+        return len(self.columns)
+
+    def headerData(self, section, orientation, role=Qt.ItemDataRole.DisplayRole):
+        if orientation == Qt.Orientation.Horizontal and role == Qt.ItemDataRole.DisplayRole and section < len(self.headers):
+            return self.headers[section]
+        return None
+
+    def data(self, index, role=Qt.ItemDataRole.DisplayRole):
+        if not index.isValid():
+            return None
+
+        value = cell_value(self.row_data(index), self.columns[index.column()])
+        if isinstance(value, bool):
+            if role == Qt.ItemDataRole.CheckStateRole:
+                return Qt.CheckState.Checked if value else Qt.CheckState.Unchecked
+            return None
+        if role == Qt.ItemDataRole.DisplayRole:
+            return '' if value is None else str(value)
+        if role == Qt.ItemDataRole.EditRole:
+            return value
+        return None
+
+    def flags(self, index):
+        flags = super().flags(index)
+        if not self.editable or not index.isValid():
+            return flags
+
+        if isinstance(cell_value(self.row_data(index), self.columns[index.column()]), bool):
+            return flags | Qt.ItemFlag.ItemIsUserCheckable
+        return flags | Qt.ItemFlag.ItemIsEditable
+
+    def setData(self, index, value, role=Qt.ItemDataRole.EditRole):
+        if not self.editable or self.write_cell is None or not index.isValid():
+            return False
+
+        if role == Qt.ItemDataRole.CheckStateRole:
+            value = Qt.CheckState(value) == Qt.CheckState.Checked
+        elif role != Qt.ItemDataRole.EditRole:
+            return False
+
+        column = self.columns[index.column()]
+        # The state change re-renders the component, which notifies the view through set_rows
+        self.write_cell(self.row_path(index) + [_cell_key(self.row_data(index), column)], value)
+        return True
+
+    def release(self):
+        """Stop following the shown rows, called when the view is destroyed"""
+        pass
+
+    def _emit_rows_changed(self, first, last, parent=QModelIndex()):
+        self.dataChanged.emit(self.index(first, 0, parent), self.index(last, len(self.columns) - 1, parent))
+
+
+class NextPyTableModel(_ItemModelMixin, QAbstractTableModel):
+    """
+    Table model over a list of rows from component state, or a NextPyDataSource.
+    set_rows diffs the new rows against the shown ones and only notifies the view of the rows that changed,
+    so updates cost O(changed rows) in widget work whatever the number of rows.
+    Data sources are not diffed, the model follows the row ranges they notify instead.
+    """
+    def __init__(self, columns: List[str], headers: Optional[List[str]] = None, parent=None):
+        """
+        Constructor for NextPyTableModel
+        :param columns: the row keys shown as columns
+        :param headers: the column titles, defaults to the column keys
+        :param parent: the parent QObject
+        """
+        super().__init__(parent)
+        self._init_columns(columns, headers)
+        self._rows = NextPyStateList()
+        # Rows the view knows about. A data source is already longer when it notifies inserted rows
+        self._row_count = 0
+        self._unsubscribe_source = None
+
+    @property
+    def rows(self):
+        """The rows shown"""
+        return self._rows
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else self._row_count
+
+    def _show_rows(self, rows):
+        self._rows = rows
+        self._row_count = len(rows)
+
+    def row_data(self, index):
+        return self._rows[index.row()]
+
+    def row_path(self, index):
+        return [index.row()]
+
+    def set_rows(self, rows):
+        """
+        Show new rows, notifying the view of inserted, removed and changed rows only.
+        Rows are frozen: immutable state is used as is, plain lists are copied so in place changes can be detected
+        :param rows: the new rows
+        :return: void
+        """
+        if isinstance(rows, NextPyDataSource) or isinstance(self._rows, NextPyDataSource):
+            if rows is not self._rows:
+                self._reset_rows(rows)
+            return
+
+        rows = freeze(rows if rows is not None else [])
+        old_rows = self._rows
+        start, old_end, new_end = diff_rows(old_rows, rows)
+        common = min(old_end, new_end)
+
+        if old_end > new_end:
+            self.beginRemoveRows(QModelIndex(), common, old_end - 1)
+            self._show_rows(rows)
+            self.endRemoveRows()
+        elif new_end > old_end:
+            self.beginInsertRows(QModelIndex(), common, new_end - 1)
+            self._show_rows(rows)
+            self.endInsertRows()
+        else:
+            self._show_rows(rows)
+
+        for first, last in changed_ranges(old_rows, rows, start, common):
+            self._emit_rows_changed(first, last)
+
+    def _reset_rows(self, rows):
+        """Show rows unrelated to the shown ones, following them if they are a data source"""
+        self.release()
+        self.beginResetModel()
+        if isinstance(rows, NextPyDataSource):
+            self._show_rows(rows)
+            self._unsubscribe_source = rows.subscribe(self._on_source_changed)
+        else:
+            self._show_rows(freeze(rows if rows is not None else []))
+        self.endResetModel()
+
+    def _on_source_changed(self, kind, start, stop):
+        if kind == CHANGED:
+            self._emit_rows_changed(start, stop - 1)
+        elif kind == INSERTED:
+            self.beginInsertRows(QModelIndex(), start, stop - 1)
+            self._row_count = len(self._rows)
+            self.endInsertRows()
+        else:
+            self.beginResetModel()
+            self._row_count = len(self._rows)
+            self.endResetModel()
+
+    def release(self):
+        if self._unsubscribe_source is not None:
+            self._unsubscribe_source()
+            self._unsubscribe_source = None
+
+
+class _TreeNode:
+    """A row of the tree model. Children are created the first time the view asks for them"""
+    __slots__ = ('parent', 'row', 'position', 'children')
+
+    def __init__(self, parent, row, position):
+        self.parent = parent
+        self.row = row
+        self.position = position
+        self.children = None
+
+
+class NextPyTreeModel(_ItemModelMixin, QAbstractItemModel):
+    """
+    Tree model over nested rows from component state, each row listing its child rows under children_key.
+    Like NextPyTableModel, set_rows only notifies the view of the rows that changed, at every level
+    the view has loaded.
+    """
+    def __init__(self, columns: List[str], headers: Optional[List[str]] = None, children_key='children', parent=None):
+        """
+        Constructor for NextPyTreeModel
+        :param columns: the row keys shown as columns
+        :param headers: the column titles, defaults to the column keys
+        :param children_key: the row key holding the child rows
+        :param parent: the parent QObject
+        """
+        super().__init__(parent)
+        self._init_columns(columns, headers)
+        self.children_key = children_key
+        self._root = _TreeNode(None, NextPyState({children_key: NextPyStateList()}), 0)
+
+    @property
+    def rows(self):
+        """The top level rows shown"""
+        return self._child_rows(self._root.row)
+
+    def _child_rows(self, row):
+        children = cell_value(row, self.children_key) if row is not None else None
+        return children if children is not None else NextPyStateList()
+
+    def _children(self, node) -> list:
+        if node.children is None:
+            node.children = [_TreeNode(node, row, position) for position, row in enumerate(self._child_rows(node.row))]
+        return node.children
+
+    def _node(self, index) -> _TreeNode:
+        return index.internalPointer() if index.isValid() else self._root
+
+    def index(self, row, column, parent=QModelIndex()):
+        children = self._children(self._node(parent))
+        if not 0 <= row < len(children) or not 0 <= column < len(self.columns):
+            return QModelIndex()
+        return self.createIndex(row, column, children[row])
+
+    def parent(self, index=QModelIndex()):
+        if not index.isValid():
+            return QModelIndex()
+        node = index.internalPointer().parent
+        if node is self._root:
+            return QModelIndex()
+        return self.createIndex(node.position, 0, node)
+
+    def rowCount(self, parent=QModelIndex()):
+        if parent.isValid() and parent.column() != 0:
+            return 0
+        return len(self._children(self._node(parent)))
+
+    def hasChildren(self, parent=QModelIndex()):
+        node = self._node(parent)
+        if node.children is not None:
+            return bool(node.children)
+        # answer without creating the child nodes of rows that were never expanded
+        return len(self._child_rows(node.row)) > 0
+
+    def row_data(self, index):
+        return index.internalPointer().row
+
+    def row_path(self, index):
+        path = []
+        node = index.internalPointer()
+        while node.parent is not None:
+            path[:0] = [self.children_key, node.position] if node.parent is not self._root else [node.position]
+            node = node.parent
+        return path
+
+    def set_rows(self, rows):
+        """
+        Show new rows, notifying the view of inserted, removed and changed rows only.
+        Rows are frozen: immutable state is used as is, plain lists are copied so in place changes can be detected
+        :param rows: the new top level rows
+        :return: void
+        """
+        root_row = NextPyState({self.children_key: freeze(rows if rows is not None else [])})
+        self._sync(self._root, QModelIndex(), root_row)
+
+    def _sync(self, node, parent_index, row):
+        node.row = row
+        nodes = node.children
+        if nodes is None:
+            # never loaded by the view, nothing to notify
+            return
+
+        rows = self._child_rows(row)
+        start, old_end, new_end = diff_rows([child.row for child in nodes], rows)
+        common = min(old_end, new_end)
+
+        for position in range(start, common):
+            child = nodes[position]
+            if not same_row(child.row, rows[position]):
+                self._sync(child, self.index(position, 0, parent_index), rows[position])
+                self._emit_rows_changed(position, position, parent_index)
+
+        if old_end > new_end:
+            self.beginRemoveRows(parent_index, common, old_end - 1)
+            del nodes[common:old_end]
+            self._renumber(nodes, common)
+            self.endRemoveRows()
+        elif new_end > old_end:
+            self.beginInsertRows(parent_index, common, new_end - 1)
+            nodes[common:common] = [_TreeNode(node, rows[position], position) for position in range(common, new_end)]
+            self._renumber(nodes, new_end)
+            self.endInsertRows()
+
+    @staticmethod
+    def _renumber(nodes, start):
+        for position in range(start, len(nodes)):
+            nodes[position].position = position
+
+
+class NextPyTemplateDelegate(QStyledItemDelegate):
+    """
+    Paints cells from a template, rendered with the cell's row, column and value as rich text.
+    e.g. <QTable bind:rows="state.todos" columns="text" cell_template="todo_cell.html"/>
+    The document of each cell is cached until the model reports the cell changed, so painting and
+    measuring a cell renders its template once per row version.
+    """
+    def __init__(self, template_engine, template_path, cache_size=256, parent=None):
+        """
+        Constructor for NextPyTemplateDelegate
+        :param template_engine: the engine rendering the cell template
+        :param template_path: the cell template
+        :param cache_size: the number of cells whose documents are kept
+        :param parent: the parent QObject
+        """
+        super().__init__(parent)
+        self.template_engine = template_engine
+        self.template_path = template_path
+        self.cache_size = cache_size
+        # Laid out documents by width, by cell
+        self._documents = OrderedDict()
+        self._model = None
+
+    @staticmethod
+    def _cell(index) -> tuple:
+        # the internal id tells apart tree rows at the same position under different parents
+        return index.row(), index.column(), index.internalId()
+
+    def _document(self, index, width) -> QTextDocument:
+        self._watch(index.model())
+        cell = self._cell(index)
+        documents = self._documents.get(cell)
+        if documents is None:
+            documents = self._documents[cell] = {}
+            if len(self._documents) > self.cache_size:
+                self._documents.popitem(last=False)
+        else:
+            self._documents.move_to_end(cell)
+
+        document = documents.get(width)
+        if document is None:
+            model = index.model()
+            column = model.columns[index.column()]
+            row = model.row_data(index)
+            document = QTextDocument()
+            document.setHtml(self.template_engine.render_template(
+                self.template_path, row=row, column=column, value=cell_value(row, column),
+            ))
+            if width > 0:
+                document.setTextWidth(width)
+            documents[width] = document
+        return document
+
+    def _watch(self, model):
+        """Drop cached documents when the model changes cells, and all of them when rows move"""
+        if model is self._model:
+            return
+        if self._model is not None:
+            self._model.dataChanged.disconnect(self._on_data_changed)
+            for signal in self._structure_signals(self._model):
+                signal.disconnect(self.clear)
+        self._model = model
+        self._documents.clear()
+        model.dataChanged.connect(self._on_data_changed)
+        for signal in self._structure_signals(model):
+            signal.connect(self.clear)
+
+    @staticmethod
+    def _structure_signals(model) -> list:
+        return [model.rowsInserted, model.rowsRemoved, model.rowsMoved, model.modelReset, model.layoutChanged]
+
+    def _on_data_changed(self, top_left, bottom_right, _roles=()):
+        model, parent = top_left.model(), top_left.parent()
+        for row in range(top_left.row(), bottom_right.row() + 1):
+            for column in range(top_left.column(), bottom_right.column() + 1):
+                self._documents.pop(self._cell(model.index(row, column, parent)), None)
+
+    def clear(self, *_args):
+        """Drop every cached document"""
+        self._documents.clear()
+
+    def paint(self, painter, option, index):
+        option = QStyleOptionViewItem(option)
+        self.initStyleOption(option, index)
+        document = self._document(index, option.rect.width())
+
+        # let the style draw the background and selection, then the document on top
+        option.text = ''
+        style = option.widget.style() if option.widget else QApplication.style()
+        style.drawControl(QStyle.ControlElement.CE_ItemViewItem, option, painter, option.widget)
+
+        painter.save()
+        painter.translate(option.rect.topLeft())
+        painter.setClipRect(option.rect.translated(-option.rect.topLeft()))
+        document.drawContents(painter)
+        painter.restore()
+
+    def sizeHint(self, option, index):
+        document = self._document(index, -1)
+        size = document.size()
+        return QSize(int(size.width()), int(size.height()))
+
+
+class NextPyItemViewElement(NextPyElement, ABC):
+    """
+    Base of the model backed elements: one view widget whatever the number of rows.
+    Rows come from a state path bound with bind:rows, e.g. bind:rows="state.todos", holding a list
+    or a NextPyDataSource. Every re-render passes them to the model, which notifies the view of the changed rows only.
+    """
+    ATTRIBUTE_SETTERS = {
+        'columns': '_update_columns',
+        'headers': '_update_columns',
+        'editable': '_update_editable',
+        'cell_template': '_update_cell_template',
+        'on_select': '_update_on_select',
+    }
+
+    @abstractmethod
+    def create_model(self, columns, headers):
+        """
+        Create the model of the view
+        :param columns: the row keys shown as columns
+        :param headers: the column titles, None to show the column keys
+        :return: the model, e.g. a NextPyTableModel
+        """
+
+    @abstractmethod
+    def create_view(self):
+        """
+        Create the view widget showing the model
+        :return: the view, e.g. a QTableView
+        """
+
+    def create_widget(self):
+        self.widget = self.create_view()
+        self.model = self.create_model(self._columns(), self._headers())
+        self.model.setParent(self.widget)
+        self._update_editable(self.element.get('editable'), None)
+        self.widget.setModel(self.model)
+        self._update_cell_template(self.element.get('cell_template'), None)
+
+        self.callback_name, self.callback_modifiers = self.get_event_attribute('on_select')
+        self.connect(self.widget.selectionModel().currentRowChanged, self._on_current_changed)
+
+        return super().create_widget()
+
+    def _columns(self):
+        return [column.strip() for column in (self.element.get('columns') or '').split(',') if column.strip()]
+
+    def _headers(self):
+        headers = self.element.get('headers')
+        return [header.strip() for header in headers.split(',')] if headers else None
+
+    def bind_value(self, name, path, value, write, modifiers=()):
+        if name != 'rows':
+            return super().bind_value(name, path, value, write, modifiers)
+
+        self.bound_path = path
+        self._write_state = write
+        self._frozen_state = isinstance(value, NextPyStateList)
+        self.model.write_cell = self._write_cell
+        self.set_bound_value(value)
+
+    def set_bound_value(self, value):
+        self._frozen_state = isinstance(value, NextPyStateList)
+        self.model.set_rows(value)
+
+    def _write_cell(self, path, value):
+        if isinstance(self.model.rows, NextPyDataSource):
+            # written in place, the source notifies the changed row
+            row, column = path
+            self.model.rows.set(row, column, value)
+            return
+
+        rows = set_in(self.model.rows, path, value)
+        # components with mutable state keep getting plain lists
+        self._write_state(rows if self._frozen_state else thaw(rows))
+
+    def _on_current_changed(self, current, _previous):
+        if not current.isValid():
+            return
+        path = self.model.row_path(current)
+        for listener in self.listeners:
+            listener(path[0] if len(path) == 1 else path)
+
+    def _update_columns(self, _value, methods):
+        self.model.beginResetModel()
+        self.model.columns = self._columns()
+        self.model.headers = self._headers() or self.model.columns
+        self.model.endResetModel()
+
+    def _update_editable(self, editable, methods):
+        self.model.editable = editable is not None and is_value_true(editable)
+        if self.model.editable:
+            self.widget.setEditTriggers(QAbstractItemView.EditTrigger.DoubleClicked | QAbstractItemView.EditTrigger.EditKeyPressed)
+        else:
+            self.widget.setEditTriggers(QAbstractItemView.EditTrigger.NoEditTriggers)
+
+    def _update_cell_template(self, template_path, methods):
+        delegate = NextPyTemplateDelegate(self.template_engine, template_path, parent=self.widget) \
+            if template_path and self.template_engine is not None else QStyledItemDelegate(self.widget)
+        self.widget.setItemDelegate(delegate)
+
+    def _update_on_select(self, _value, methods):
+        self.callback_name, self.callback_modifiers = self.get_event_attribute('on_select')
+        self._reattach_callback(methods)
+
+    def destroy(self):
+        if self.widget is not None:
+            self.model.write_cell = None
+            self.model.release()
+        super().destroy()
+
+
+class NextPyTableElement(NextPyItemViewElement):
+    """
+    Table over rows of state
+    e.g. <QTable bind:rows="state.todos" columns="text,completed" headers="Task,Done" on_select="select_todo"/>
+    on_select is called with the row index
+    """
+    def create_model(self, columns, headers):
+        return NextPyTableModel(columns, headers)
+
+    def create_view(self):
+        view = QTableView()
+        view.setSelectionBehavior(QAbstractItemView.SelectionBehavior.SelectRows)
+        return view
+
+
+class NextPyTreeElement(NextPyItemViewElement):
+    """
+    Tree over nested rows of state, each row listing its child rows under children_key
+    e.g. <QTree bind:rows="state.folders" columns="name,size" children_key="children" on_select="open"/>
+    on_select is called with the row index of top level rows, the path of nested rows e.g. [0, 'children', 2]
+    """
+    def create_model(self, columns, headers):
+        return NextPyTreeModel(columns, headers, children_key=self.element.get('children_key') or 'children')
+
+    def create_view(self):
+        view = QTreeView()
+        view.setUniformRowHeights(True)
+        return view
+
+
+class NextPyListElement(NextPyItemViewElement):
+    """
+    List showing the first of the columns of rows of state
+    e.g. <QList bind:rows="state.records" columns="name" on_select="open_record"/>
+    on_select is called with the row index
+    """
+    def create_model(self, columns, headers):
+        return NextPyTableModel(columns, headers)
+
+    def create_view(self):
+        view = QListView()
+        # rows all have the same height, so the view never measures them one by one
+        view.setUniformItemSizes(True)
+        return view
@@ -0,0 +1,387 @@
+import logging
+from dataclasses import dataclass, field
+from functools import partial
+from typing import Callable, Dict, Iterable, List, Optional, Set, Tuple, get_type_hints
+
+from bs4 import BeautifulSoup
+from jinja2 import meta, nodes
+
+from elements import element_registry
+from lazy import NextPyLazyComponent
+from state import NextPyState, NextPyStateList
+from utils import cast_value, parse_method_call
+
+# Stands for the output of a {{ }} expression in the static markup of a template
+DYNAMIC = '\ufffd'
+# Attributes of <component> tags used by the renderer, not passed as props
+COMPONENT_ATTRIBUTES = {'name', 'ref', 'id', 'key'}
+
+
+@dataclass
+class NextPyTemplateIssue:
+    """A problem found in a template, that would otherwise only show up when rendering it"""
+    template_path: str
+    line: Optional[int]
+    message: str
+
+    def __str__(self):
+        return f"{self.template_path}:{self.line or '?'}: {self.message}"
+
+
+@dataclass
+class NextPyComponentMetadata:
+    """What a <component> tag needs from a child component class, resolved once per class"""
+    component_class: type
+    # Prop name -> function casting the attribute value to the props_schema type
+    prop_casters: Dict[str, Callable] = field(default_factory=dict)
+    # Props without a default in props_schema
+    required_props: Set[str] = field(default_factory=set)
+    # Event attribute -> the event it maps, e.g. on_remove -> remove
+    event_attributes: Dict[str, str] = field(default_factory=dict)
+
+    def cast_props(self, element_data) -> dict:
+        """Cast the attributes of a <component> tag into props, props missing from the tag are None"""
+        return {name: caster(element_data.get(name)) for name, caster in self.prop_casters.items()}
+
+
+_component_metadata = {}
+
+
+def component_metadata(component_class) -> NextPyComponentMetadata:
+    """Get the prop casters and event attributes of a component class, resolving its props_schema once"""
+    metadata = _component_metadata.get(component_class)
+    if metadata is None:
+        metadata = NextPyComponentMetadata(component_class)
+        schema = getattr(component_class, 'props_schema', None)
+        if schema is not None:
+            for name, target_type in get_type_hints(schema).items():
+                metadata.prop_casters[name] = partial(cast_value, target_type=target_type)
+            fields = getattr(schema, 'model_fields', {})
+            metadata.required_props = {name for name, info in fields.items() if info.is_required()}
+        metadata.event_attributes = {f"on_{event}": event for event in component_class.emits}
+        _component_metadata[component_class] = metadata
+    return metadata
+
+
+@dataclass
+class NextPyTemplateMetadata:
+    """
+    What the renderer would otherwise resolve on every render of a template, computed once by the analyzer:
+    the element class of every tag, the parsed handler calls and the child components with their props and events
+    """
+    template_path: str
+    # The template and the ones it includes, extends or imports
+    templates: Set[str] = field(default_factory=set)
+    # Lower case tag -> element class, None for unknown tags
+    element_types: Dict[str, Optional[type]] = field(default_factory=dict)
+    # Handler attribute value -> (method name, params), as parse_method_call gives them
+    handlers: Dict[str, Tuple] = field(default_factory=dict)
+    # Component name -> the child component, None for unknown or not yet loaded lazy components
+    components: Dict[str, Optional[NextPyComponentMetadata]] = field(default_factory=dict)
+    # The events the component of the template emits
+    emits: List[str] = field(default_factory=list)
+    # The state paths the template reads, e.g. ('todos',) for state.todos. None if it can read any of the state
+    state_paths: Optional[Set[Tuple]] = field(default_factory=set)
+    issues: List[NextPyTemplateIssue] = field(default_factory=list)
+
+
+def static_markup(env, template_path: str) -> str:
+    """
+    Get the markup of a template without its Jinja tags: blocks and comments are dropped and expressions
+    replaced by DYNAMIC, so every branch and loop body is kept once. Lines are kept where they were
+    :param env: the jinja environment loading the template
+    :param template_path: the template path, relative to the template directory
+    :return: the markup
+    """
+    source = env.loader.get_source(env, template_path)[0]
+    parts = []
+    line = 1
+    for lineno, token_type, value in env.lex(source, template_path):
+        if lineno > line:
+            parts.append('\n' * (lineno - line))
+            line = lineno
+        if token_type == 'data':
+            parts.append(value)
+            line += value.count('\n')
+        elif token_type == 'variable_begin':
+            parts.append(DYNAMIC)
+    return ''.join(parts)
+
+
+# Methods of the state containers. Jinja looks attributes up before keys, so state.items is the method,
+# not a key, and calling it reads the whole container it is called on
+_CONTAINER_METHODS = {
+    name for container in (dict, list, NextPyState, NextPyStateList) for name in dir(container)
+    if not name.startswith('_')
+}
+
+
+def _state_path(node) -> Optional[Tuple]:
+    """
+    Get the keys of a state.a.b or state['a'][0] expression, None if it does not start at state.
+    A method of a container, e.g. state.todos.items, gives the path of the container
+    """
+    if isinstance(node, nodes.Name):
+        return () if node.name == 'state' else None
+    if isinstance(node, nodes.Getattr):
+        path = _state_path(node.node)
+        if path is None or node.attr in _CONTAINER_METHODS:
+            return path
+        return path + (node.attr,)
+    if isinstance(node, nodes.Getitem) and isinstance(node.arg, nodes.Const):
+        path = _state_path(node.node)
+        return None if path is None else path + (node.arg.value,)
+    return None
+
+
+def state_reads(node, paths: Set[Tuple]):
+    """
+    Collect the state paths a parsed template reads. () is added when it can read any of the state:
+    the whole state is used, e.g. passed to a filter, or methods are, which can read anything
+    :param node: the jinja node, e.g. env.parse(source)
+    :param paths: the set the paths are added to
+    :return: void
+    """
+    # state.get('count') only reads the key it is given
+    if (isinstance(node, nodes.Call) and isinstance(node.node, nodes.Getattr) and node.node.attr == 'get'
+            and node.args and isinstance(node.args[0], nodes.Const)):
+        path = _state_path(node.node)
+        if path is not None:
+            paths.add(path + (node.args[0].value,))
+            for child in node.args[1:] + node.kwargs:
+                state_reads(child, paths)
+            return
+
+    path = _state_path(node)
+    if path is not None:
+        paths.add(path)
+        return
+    if isinstance(node, nodes.Name) and node.name == 'methods':
+        paths.add(())
+        return
+    for child in node.iter_child_nodes():
+        state_reads(child, paths)
+
+
+class NextPyTemplateAnalyzer:
+    """
+    Checks templates against the components rendering them, without rendering anything:
+    unknown element types, missing or unknown handlers, unknown components,
+    and <component> tags not matching the props_schema or emits of the child component.
+    Values built by expressions are only checked where the template has them literally
+    e.g.
+        analyzer = NextPyTemplateAnalyzer(template_engine)
+        for metadata in analyzer.analyze_classes([TodoApp]):
+            print(*metadata.issues, sep='\n')
+    """
+    def __init__(self, template_engine):
+        """
+        Constructor for NextPyTemplateAnalyzer
+        :param template_engine: the NextPyTemplate loading the templates
+        """
+        self.template_engine = template_engine
+        self.env = template_engine.env
+
+    def analyze_classes(self, component_classes: Iterable[type]) -> List[NextPyTemplateMetadata]:
+        """
+        Analyze the templates of component classes and of every child component they use.
+        Each class is created once without props, as methods and components are set by the constructor
+        :param component_classes: the root component classes, e.g. the route components
+        :return: the metadata of each template, with its issues
+        """
+        results = []
+        pending = list(component_classes)
+        seen = set()
+        while pending:
+            component_class = pending.pop(0)
+            if component_class in seen:
+                continue
+            seen.add(component_class)
+
+            path = getattr(component_class, 'template_path', None) or component_class.__name__
+            try:
+                component = component_class(template_engine=self.template_engine)
+            except Exception as e:
+                issue = NextPyTemplateIssue(path, None, f"Could not create {component_class.__name__} to analyze it: {e}")
+                results.append(NextPyTemplateMetadata(path, issues=[issue]))
+                continue
+
+            if component.template_path:
+                try:
+                    results.append(self.analyze(component))
+                except Exception as e:
+                    issue = NextPyTemplateIssue(path, None, f"Could not analyze the template: {e!r}")
+                    results.append(NextPyTemplateMetadata(path, issues=[issue]))
+            for child in component.components.values():
+                if isinstance(child, NextPyLazyComponent):
+                    child = child.resolve()
+                pending.append(child)
+        return results
+
+    def analyze(self, component) -> NextPyTemplateMetadata:
+        """
+        Analyze the template of a component
+        :param component: the component, its methods and components are checked against the template
+        :return: the metadata of its template, with its issues
+        """
+        metadata = NextPyTemplateMetadata(component.template_path, emits=list(component.emits))
+        for template_path in self._templates(component.template_path):
+            metadata.templates.add(template_path)
+            state_reads(self.env.parse(self.env.loader.get_source(self.env, template_path)[0]), metadata.state_paths)
+            soup = BeautifulSoup(static_markup(self.env, template_path), 'html.parser')
+            for element in soup.find_all(True):
+                report = partial(self._report, metadata, template_path, element)
+                if element.name == 'component':
+                    self._check_component(element, component, metadata, report)
+                else:
+                    self._check_element(element, component, metadata, report)
+
+        if () in metadata.state_paths:
+            metadata.state_paths = None
+        return metadata
+
+    @staticmethod
+    def _report(metadata: NextPyTemplateMetadata, template_path: str, element, message: str):
+        metadata.issues.append(NextPyTemplateIssue(template_path, element.sourceline, message))
+
+    def _templates(self, template_path: str) -> List[str]:
+        """The template and the ones it pulls in, recursively"""
+        templates = [template_path]
+        for name in templates:
+            source = self.env.loader.get_source(self.env, name)[0]
+            for reference in meta.find_referenced_templates(self.env.parse(source)):
+                if reference is not None and reference not in templates:
+                    templates.append(reference)
+        return templates
+
+    def _check_element(self, element, component, metadata: NextPyTemplateMetadata, report):
+        if element.name not in metadata.element_types:
+            element_class = element_registry.get(element.name)
+            metadata.element_types[element.name] = element_class
+            if element_class is None:
+                report(f"Unknown element type '{element.name}'")
+        element_class = metadata.element_types[element.name]
+        if element_class is None:
+            return
+
+        present = {attribute.split('.')[0] for attribute in element.attrs}
+        for required in element_class.REQUIRED_ATTRIBUTES:
+            if required not in present:
+                report(f"<{element.name}> is missing its '{required}' attribute")
+
+        for attribute, value in element.attrs.items():
+            if not isinstance(value, str) or DYNAMIC in attribute or DYNAMIC in value:
+                continue
+            if attribute.split('.')[0].startswith('on_'):
+                handler = parse_method_call(value)
+                metadata.handlers[value] = handler
+                method_name = handler[0] or value.strip()
+                if method_name not in component.methods:
+                    report(f"Unknown handler '{method_name}' for {attribute} of <{element.name}>")
+
+    def _check_component(self, element, component, metadata: NextPyTemplateMetadata, report):
+        name = element.get('name')
+        if not name or DYNAMIC in name:
+            return
+
+        child_class = component.components.get(name)
+        if child_class is None:
+            report(f"Unknown component '{name}'")
+            metadata.components[name] = None
+            return
+        if isinstance(child_class, NextPyLazyComponent):
+            if not child_class.resolved:
+                # checked once loaded, by the analysis of the class
+                metadata.components[name] = None
+                return
+            child_class = child_class.resolve()
+
+        child = metadata.components[name] = component_metadata(child_class)
+        for prop in sorted(child.required_props - set(element.attrs)):
+            report(f"<component name=\"{name}\"> is missing the required prop '{prop}'")
+
+        for attribute, value in element.attrs.items():
+            base = attribute.split('.')[0]
+            if DYNAMIC in attribute:
+                continue
+            if attribute in child.prop_casters:
+                if isinstance(value, str) and DYNAMIC not in value:
+                    try:
+                        child.prop_casters[attribute](value)
+                    except (TypeError, ValueError) as e:
+                        report(f"Prop '{attribute}' of <component name=\"{name}\"> can not be cast from '{value}': {e}")
+            elif base in child.event_attributes:
+                if DYNAMIC not in value and value not in component.methods:
+                    report(f"Unknown handler '{value}' for {attribute} of <component name=\"{name}\">")
+            elif base.startswith('on_'):
+                report(f"{child_class.__name__} does not emit '{base[3:]}', see its emits")
+            elif base not in COMPONENT_ATTRIBUTES:
+                report(f"{child_class.__name__} has no prop '{attribute}' in its props_schema")
+
+
+_metadata = {}
+
+
+def template_metadata(component) -> Optional[NextPyTemplateMetadata]:
+    """
+    Get the metadata of a component's template, analyzing it the first time a component of its class renders it.
+    The issues found are logged then, once, instead of on every render
+    :param component: the component
+    :return: the metadata, None if the template can't be analyzed, e.g. with an engine not using Jinja
+    """
+    engine = component.template_engine
+    env = getattr(engine, 'env', None)
+    if env is None or not component.template_path:
+        return None
+
+    key = (type(component), env, component.template_path)
+    if key not in _metadata:
+        try:
+            metadata = NextPyTemplateAnalyzer(engine).analyze(component)
+        except Exception as e:
+            logging.warning(f"Could not analyze template '{component.template_path}': {e}")
+            metadata = None
+        else:
+            for issue in metadata.issues:
+                logging.warning(str(issue))
+        _metadata[key] = metadata
+    return _metadata[key]
+
+
+def forget_template_metadata(template_path: str):
+    """
+    Drop the metadata of every template using a template, e.g. after it was edited
+    :param template_path: the template path, relative to the template directory
+    :return: void
+    """
+    for key, metadata in list(_metadata.items()):
+        if key[2] == template_path or (metadata is not None and template_path in metadata.templates):
+            _metadata.pop(key, None)
+
+
+if __name__ == '__main__':
+    # python template_analyzer.py app:TodoApp components.hello_world:HelloWorldApp [--templates templates]
+    import argparse
+    import sys
+
+    from snapshot import import_component_class
+    from template_engine import NextPyTemplate
+
+    parser = argparse.ArgumentParser(description="Check templates against the components rendering them")
+    parser.add_argument('components', nargs='+', help="component classes as module:ClassName")
+    parser.add_argument('--templates', default='templates', help="the template directory")
+    args = parser.parse_args()
+
+    analyzer = NextPyTemplateAnalyzer(NextPyTemplate(args.templates, auto_reload=False))
+    results = analyzer.analyze_classes(import_component_class(path) for path in args.components)
+
+    issues = [issue for metadata in results for issue in metadata.issues]
+    for metadata in results:
+        print(
+            f"{metadata.template_path}: {len(metadata.element_types)} element types, {len(metadata.handlers)} handlers, "
+            f"{len(metadata.components)} components, emits {metadata.emits}"
+        )
+    for issue in issues:
+        print(issue)
+    print(f"{len(issues)} issues in {len(results)} templates")
+    sys.exit(1 if issues else 0)
@@ -0,0 +1,288 @@
+import hashlib
+import json
+import logging
+import os
+import sys
+import tempfile
+import threading
+import zlib
+from collections import OrderedDict
+from typing import Optional
+
+import bs4
+import jinja2
+from bs4 import BeautifulSoup, Tag
+from jinja2 import FileSystemBytecodeCache
+
+from snapshot import SNAPSHOT_VERSION, element_to_vnode, vnode_to_element
+
+# Bump with every release that changes how templates are compiled or parsed, caches of other versions are ignored
+FRAMEWORK_VERSION = '0.1.0'
+
+
+def cache_version() -> str:
+    """The version stamped on cached files: the framework, the libraries producing them, and the vnode layout"""
+    return f"{FRAMEWORK_VERSION}|jinja2-{jinja2.__version__}|bs4-{bs4.__version__}|vnode-{SNAPSHOT_VERSION}"
+
+
+def default_cache_dir() -> str:
+    """The per user cache directory, e.g. ~/.cache/nextpy"""
+    base = os.environ.get('XDG_CACHE_HOME') or os.path.join(os.path.expanduser('~'), '.cache')
+    return os.path.join(base, 'nextpy')
+
+
+def parse_root(html_content: str, store=True) -> Optional[Tag]:
+    """
+    Parse rendered HTML and get its first real element, from the template cache when it is enabled
+    :param html_content: the rendered template
+    :param store: cache the parsed output if it is not cached yet. Pass False for re-renders, whose output
+        mostly comes from transient state, e.g. text being typed, and would only push launch output out of the cache
+    :return: the element, None if the HTML has no element
+    """
+    if _template_cache is not None:
+        return _template_cache.parse_root(html_content, store=store)
+    return _parse_root(html_content)
+
+
+def _parse_root(html_content: str) -> Optional[Tag]:
+    return next(
+        (element for element in BeautifulSoup(html_content, 'html.parser').children if element.name is not None),
+        None
+    )
+
+
+class NextPyBytecodeCache(FileSystemBytecodeCache):
+    """
+    Jinja bytecode cache whose files are named after the template and the cache version.
+    Jinja stores the checksum of the template source in each file and recompiles when it differs,
+    and the python version in its header, so an edited template or another interpreter never runs stale code
+    """
+    def get_cache_key(self, name, filename=None) -> str:
+        key = hashlib.sha1(f"{cache_version()}|{name}|{filename}".encode('utf-8'))
+        return key.hexdigest()
+
+
+class NextPyTemplateCache:
+    """
+    On disk cache of compiled templates and of the parsed structure of their rendered output, so a warm launch
+    runs neither the Jinja compiler nor the HTML parser for output it has seen before.
+    Compiled templates are Jinja bytecode, checked against the template source on every load.
+    Parsed output is stored as vnodes keyed by the hash of the rendered HTML, so it can never be stale;
+    it is kept in memory and written back by save, the least recently used entries beyond max_entries are dropped.
+    Only first renders are stored, re-renders read the cache without adding to it, see parse_root.
+    A cache written by another framework or library version is ignored, a corrupt one is discarded.
+    """
+    def __init__(self, directory: Optional[str] = None, max_entries=512):
+        """
+        Constructor for NextPyTemplateCache
+        :param directory: where the cache is stored, defaults to default_cache_dir()
+        :param max_entries: the number of parsed outputs kept
+        """
+        self.directory = os.path.abspath(directory or default_cache_dir())
+        self.max_entries = max_entries
+        self.bytecode_cache = NextPyBytecodeCache(self._ensure_dir('bytecode'))
+        self.vnode_path = os.path.join(self._ensure_dir(), 'vnodes.bin')
+
+        self._vnodes = None
+        self._dirty = False
+        self._lock = threading.Lock()
+        # the document cached elements are created in, creating one per element costs more than the element
+        self._soup = BeautifulSoup('', 'html.parser')
+        self.hits = 0
+        self.misses = 0
+
+    def _ensure_dir(self, *parts) -> str:
+        path = os.path.join(self.directory, *parts)
+        os.makedirs(path, exist_ok=True)
+        return path
+
+    @staticmethod
+    def _key(html_content: str) -> str:
+        return hashlib.blake2b(html_content.encode('utf-8'), digest_size=16).hexdigest()
+
+    def _entries(self) -> OrderedDict:
+        if self._vnodes is None:
+            self._vnodes = self._load()
+        return self._vnodes
+
+    def _load(self) -> OrderedDict:
+        try:
+            with open(self.vnode_path, 'rb') as f:
+                data = json.loads(zlib.decompress(f.read()).decode('utf-8'))
+        except FileNotFoundError:
+            return OrderedDict()
+        except (OSError, ValueError, zlib.error) as e:
+            logging.warning(f"Discarding unreadable template cache {self.vnode_path}: {e}")
+            return OrderedDict()
+
+        if data.get('version') != cache_version():
+            return OrderedDict()
+        return OrderedDict(data['entries'])
+
+    def parse_root(self, html_content: str, store=True) -> Optional[Tag]:
+        """
+        Get the root element of rendered HTML, rebuilt from its cached vnode or parsed and cached
+        :param html_content: the rendered template
+        :param store: cache the parsed output on a miss, else only parse it
+        :return: a new element, never shared with earlier calls, None if the HTML has no element
+        """
+        key = self._key(html_content)
+        with self._lock:
+            entries = self._entries()
+            vnode = entries.get(key)
+            if vnode is not None:
+                entries.move_to_end(key)
+                self.hits += 1
+
+        if vnode is not None:
+            return vnode_to_element(vnode, self._soup)
+
+        root = _parse_root(html_content)
+        with self._lock:
+            self.misses += 1
+        if root is None or not store:
+            return root
+
+        with self._lock:
+            entries[key] = element_to_vnode(root)
+            while len(entries) > self.max_entries:
+                entries.popitem(last=False)
+            self._dirty = True
+        return root
+
+    def save(self):
+        """
+        Write the parsed outputs to disk if they changed, replacing the file atomically so a concurrent
+        launch reads either the old cache or the new one
+        :return: void
+        """
+        with self._lock:
+            if not self._dirty:
+                return
+            data = json.dumps({'version': cache_version(), 'entries': list(self._vnodes.items())}, separators=(',', ':'))
+            self._dirty = False
+
+        f = tempfile.NamedTemporaryFile(
+            mode='wb', dir=os.path.dirname(self.vnode_path), prefix='vnodes', suffix='.tmp', delete=False
+        )
+        try:
+            with f:
+                f.write(zlib.compress(data.encode('utf-8')))
+            os.replace(f.name, self.vnode_path)
+        except OSError as e:
+            logging.warning(f"Could not write template cache {self.vnode_path}: {e}")
+            try:
+                os.remove(f.name)
+            except OSError:
+                pass
+
+    def clear(self):
+        """Drop every cached template, in memory and on disk"""
+        self.bytecode_cache.clear()
+        with self._lock:
+            self._vnodes = OrderedDict()
+            self._dirty = False
+        try:
+            os.remove(self.vnode_path)
+        except OSError:
+            pass
+
+
+_template_cache = None
+
+
+def template_cache() -> Optional[NextPyTemplateCache]:
+    """Get the template cache used by every renderer, None while it is disabled"""
+    return _template_cache
+
+
+def enable_template_cache(directory: Optional[str] = None, max_entries=512) -> NextPyTemplateCache:
+    """
+    Cache compiled templates and parsed output on disk from now on, see NextPyTemplateCache.
+    Call it before rendering, the parsed output is saved when the process exits
+    :return: the template cache
+    """
+    import atexit
+    from template_engine import template_registry
+
+    global _template_cache
+    disable_template_cache()
+    _template_cache = NextPyTemplateCache(directory, max_entries=max_entries)
+    template_registry.set_bytecode_cache(_template_cache.bytecode_cache)
+    atexit.register(_template_cache.save)
+    return _template_cache
+
+
+def disable_template_cache():
+    """Stop caching templates on disk, saving what was cached so far"""
+    import atexit
+    from template_engine import template_registry
+
+    global _template_cache
+    if _template_cache is not None:
+        _template_cache.save()
+        atexit.unregister(_template_cache.save)
+        template_registry.set_bytecode_cache(None)
+        _template_cache = None
+
+
+def _startup(cache_dir: Optional[str], todos: int) -> float:
+    """Time a launch up to the first render of the todo app with todos items, imports included, in a fresh process"""
+    import time
+    start = time.perf_counter()
+
+    if cache_dir:
+        enable_template_cache(cache_dir)
+
+    from testing import ensure_application
+    from main import root_component_factory
+
+    ensure_application()
+    component = root_component_factory()
+    component.state = {**component.state, 'todos': [{'text': f"Todo {i}", 'completed': i % 2 == 0} for i in range(todos)]}
+    component.render()
+    elapsed = time.perf_counter() - start
+
+    if cache_dir:
+        disable_template_cache()
+    return elapsed
+
+
+def _benchmark(runs=5, todos=200):
+    """Compare uncached, cold and warm launches, each one in a fresh process"""
+    import shutil
+    import statistics
+    import subprocess
+
+    def launch(cache_dir=''):
+        output = subprocess.run(
+            [sys.executable, os.path.abspath(__file__), '--startup', cache_dir, str(todos)],
+            capture_output=True, text=True, check=True, env={**os.environ, 'QT_QPA_PLATFORM': 'offscreen'},
+        ).stdout
+        return float(output.split()[-1])
+
+    cache_dir = tempfile.mkdtemp(prefix='nextpy-cache-')
+    try:
+        uncached, cold, warm = [], [], []
+        for _ in range(runs):
+            uncached.append(launch())
+            shutil.rmtree(cache_dir)
+            cold.append(launch(cache_dir))
+            warm.append(launch(cache_dir))
+    finally:
+        shutil.rmtree(cache_dir, ignore_errors=True)
+
+    print(f"Launch to first render of the todo app with {todos} items, median of {runs} launches")
+    for name, times in (('no cache', uncached), ('cold cache', cold), ('warm cache', warm)):
+        print(f"  {name:<10} {statistics.median(times) * 1000:8.1f} ms")
+
+
+if __name__ == '__main__':
+    # python template_cache.py [runs] [todos], run from the directory holding the templates.
+    # Imported again, the renderer reads the cache of the template_cache module, not of __main__
+    from template_cache import _benchmark, _startup
+
+    if len(sys.argv) > 1 and sys.argv[1] == '--startup':
+        print(_startup(sys.argv[2] or None, int(sys.argv[3])))
+    else:
+        _benchmark(*(int(arg) for arg in sys.argv[1:3]))
@@ -1,25 +1,261 @@
+import os
+import threading
+import weakref
 from abc import ABC
 
-from jinja2 import Environment, FileSystemLoader
+from jinja2 import Environment, FileSystemLoader, meta
 
 from component import NextPyComponent
+from template_analyzer import forget_template_metadata
 
 class BaseTemplateEngine(ABC):
     def render_template(self, template_path, component: NextPyComponent):
         return NotImplemented
 
+    def track_component(self, component: NextPyComponent):
+        """Remember a mounted component so template changes can re-render it"""
+        pass
+
+    def untrack_component(self, component: NextPyComponent):
+        """Forget a component that is no longer mounted"""
+        pass
+
+
+class NextPyTemplateLoader(FileSystemLoader):
+    """
+    FileSystemLoader counting the template sources it reads, per thread.
+    Jinja only reads a source when its cache has no up to date compiled template, so a read is a cache miss
+    """
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._local = threading.local()
+
+    @property
+    def loads(self) -> int:
+        """The number of sources read by the current thread"""
+        return getattr(self._local, 'loads', 0)
+
+    def get_source(self, environment, template):
+        self._local.loads = self.loads + 1
+        return super().get_source(environment, template)
+
+
+class NextPyTemplateRegistry:
+    """
+    Process-wide registry of Jinja environments.
+    Every template engine pointing at the same directory shares one environment, and with it one compiled-template cache.
+    """
+    def __init__(self, cache_size=400):
+        """
+        Constructor for NextPyTemplateRegistry
+        :param cache_size: the number of compiled templates each environment keeps. -1 keeps every template.
+        """
+        self.cache_size = cache_size
+        self.bytecode_cache = None
+        self._environments = {}
+        # Bumped whenever a template of an environment is invalidated, by environment key
+        self._versions = {}
+        self._lock = threading.Lock()
+
+    def get_environment(self, template_dir=".", auto_reload=True) -> Environment:
+        """
+        Get the shared environment for a template directory, creating it on first use
+        :param template_dir: the directory templates are loaded from
+        :param auto_reload: if auto_reload is False, jinja will not check the template files for changes on every lookup
+        :return: the shared jinja environment
+        """
+        key = (os.path.abspath(template_dir), auto_reload)
+        environment = self._environments.get(key)
+        if environment is not None:
+            return environment
+
+        with self._lock:
+            environment = self._environments.get(key)
+            if environment is None:
+                environment = Environment(
+                    loader=NextPyTemplateLoader(template_dir),
+                    auto_reload=auto_reload,
+                    cache_size=self.cache_size,
+                    bytecode_cache=self.bytecode_cache,
+                )
+                self._environments[key] = environment
+
+        return environment
+
+    def version(self, template_dir=".", auto_reload=True) -> int:
+        """
+        Get the version of an environment's templates, bumped every time one of them is invalidated or reloaded.
+        Renderers outside this process, e.g. prerender workers, compare it to drop templates they compiled before
+        :return: the version, 0 until a template is invalidated
+        """
+        return self._versions.get((os.path.abspath(template_dir), auto_reload), 0)
+
+    def bump_version(self, template_dir=".", auto_reload=True):
+        """Mark the templates of an environment as changed, see version"""
+        key = (os.path.abspath(template_dir), auto_reload)
+        with self._lock:
+            self._versions[key] = self._versions.get(key, 0) + 1
+
+    def set_bytecode_cache(self, bytecode_cache):
+        """
+        Store compiled templates in a Jinja bytecode cache, e.g. on disk so later launches skip compiling them.
+        Applies to the environments already created too, templates already compiled stay in memory as they are
+        :param bytecode_cache: the jinja BytecodeCache, None to stop using one
+        :return: void
+        """
+        with self._lock:
+            self.bytecode_cache = bytecode_cache
+            for environment in self._environments.values():
+                environment.bytecode_cache = bytecode_cache
+
+    def clear(self):
+        """
+        Drop every shared environment and its compiled templates
+        :return: void
+        """
+        with self._lock:
+            for key in self._environments:
+                self._versions[key] = self._versions.get(key, 0) + 1
+            self._environments.clear()
+
+
+# The registry shared by every NextPyTemplate in this process
+template_registry = NextPyTemplateRegistry()
+
+
 class NextPyTemplate(BaseTemplateEngine):
     """
     A wrapper component for rendering templates with Jinja2 templates
     """
-    def __init__(self, template_dir="."):
-        self.env = Environment(loader=FileSystemLoader(template_dir))  # Load templates from the current directory
+    def __init__(self, template_dir=".", auto_reload=True, registry=None):
+        """
+        Constructor for NextPyTemplate
+        :param template_dir: the directory templates are loaded from
+        :param auto_reload: set to False in production to skip the file modification checks on every render
+        :param registry: the registry to take the environment from. Defaults to the process-wide registry
+        """
+        self.template_dir = template_dir
+        self.registry = registry or template_registry
+        self.env = self.registry.get_environment(template_dir, auto_reload=auto_reload)
+
+        # Mounted components by template path, used to re-render after a template change
+        self._components = {}
+        # Templates referenced through include/extends/import, by template path
+        self._references = {}
+
+        # Lookups that found the template already compiled, and lookups that had to load it
+        self.cache_hits = 0
+        self.cache_misses = 0
 
     def render_template(self, template_path, **context):
         try:
+            loads = self.env.loader.loads
             template = self.env.get_template(template_path)
+            if self.env.loader.loads == loads:
+                self.cache_hits += 1
+            else:
+                self.cache_misses += 1
             return template.render(
                 **context
             )
         except Exception as e:
-            raise e
\ No newline at end of file
+            raise e
+
+    def track_component(self, component: NextPyComponent):
+        """
+        Remember a mounted component so template changes can re-render it
+        :param component: the component that rendered with this engine
+        :return: void
+        """
+        if component.template_path:
+            self._components.setdefault(component.template_path, weakref.WeakSet()).add(component)
+
+    def untrack_component(self, component: NextPyComponent):
+        """
+        Forget a component that is no longer mounted
+        :param component: the component to forget
+        :return: void
+        """
+        components = self._components.get(component.template_path)
+        if components is not None:
+            components.discard(component)
+
+    def invalidate(self, template_path):
+        """
+        Drop a single compiled template from the shared cache, leaving every other template compiled
+        :param template_path: the template path, relative to the template directory
+        :return: void
+        """
+        self._references.pop(template_path, None)
+        forget_template_metadata(template_path)
+        self.registry.bump_version(self.template_dir, self.env.auto_reload)
+
+        cache = self.env.cache
+        if cache is None:
+            return
+
+        for key in [key for key in cache.keys() if key[1] == template_path]:
+            try:
+                del cache[key]
+            except KeyError:
+                pass
+
+    def dependent_templates(self, template_path):
+        """
+        Get the mounted templates that render the given template, directly or through include/extends/import
+        :param template_path: the template path, relative to the template directory
+        :return: set of template paths, including template_path itself
+        """
+        affected = {template_path}
+        changed = True
+        while changed:
+            changed = False
+            for name in list(self._components):
+                if name not in affected and affected & self._referenced_templates(name):
+                    affected.add(name)
+                    changed = True
+
+        return affected
+
+    def reload_template(self, template_path):
+        """
+        Recompile a changed template and re-render only the mounted components that use it.
+        Components keep their state, as they are updated through the incremental re-render.
+        :param template_path: the template path, relative to the template directory
+        :return: the components that were re-rendered
+        """
+        # Jinja only looks for changes when a template is looked up, nothing re-renders the mounted components.
+        # With auto_reload that lookup already recompiles the file from its mtime, so only what this engine derived
+        # from the source is dropped. Without auto_reload, the compiled template would be used forever
+        if self.env.auto_reload:
+            self._references.pop(template_path, None)
+            forget_template_metadata(template_path)
+            self.registry.bump_version(self.template_dir, self.env.auto_reload)
+        else:
+            self.invalidate(template_path)
+
+        rerendered = []
+        for name in self.dependent_templates(template_path):
+            for component in list(self._components.get(name, ())):
+                if not component.renderer.is_mounted():
+                    continue
+                component.renderer.rerender_component()
+                rerendered.append(component)
+
+        return rerendered
+
+    def _referenced_templates(self, template_path):
+        """Get the templates a template pulls in, parsing its source once"""
+        references = self._references.get(template_path)
+        if references is None:
+            try:
+                source = self.env.loader.get_source(self.env, template_path)[0]
+                references = {
+                    name for name in meta.find_referenced_templates(self.env.parse(source))
+                    if name is not None
+                }
+            except Exception:
+                references = set()
+            self._references[template_path] = references
+
+        return references
@@ -0,0 +1,351 @@
+import os
+import sys
+from collections import Counter
+from typing import Dict, List, Optional
+
+from PyQt6.QtWidgets import QApplication, QPushButton, QWidget, QLineEdit
+
+from component import NextPyComponent
+from elements import NextPyElement
+from leak_check import flush_deleted_widgets
+from template_engine import BaseTemplateEngine
+
+
+_application = None
+
+
+def ensure_application() -> QApplication:
+    """Get the running QApplication, creating an offscreen one so tests run without a display"""
+    global _application
+    app = QApplication.instance()
+    if app is None:
+        os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+        # kept referenced, the application is destroyed with its last python reference
+        app = _application = QApplication(sys.argv[:1])
+    return app
+
+
+class NextPyRenderCounter:
+    """
+    Counts the render work done while it is active: template renders by template path,
+    Qt widgets constructed, widgets of elements updated in place and removed from the tree,
+    and components created and unmounted.
+    Counts every component, so a child re-rendered or rebuilt by its parent shows up too
+    e.g.
+        with NextPyRenderCounter() as counter:
+            component.set_state({'new_todo': 'a'})
+        assert counter.template_renders['todo_app.html'] == 1
+    """
+    def __init__(self):
+        self._patches = []
+        self.reset()
+
+    def reset(self):
+        """Set every count back to 0"""
+        self.template_renders = Counter()
+        self.widgets_created = 0
+        self._updated = set()
+        self._deleted = set()
+        self.components_created = 0
+        self._unmounted = set()
+
+    @property
+    def render_count(self) -> int:
+        """The number of templates rendered"""
+        return sum(self.template_renders.values())
+
+    @property
+    def widgets_updated(self) -> int:
+        """The number of element widgets updated in place, because their attributes or content changed"""
+        return len(self._updated)
+
+    @property
+    def widgets_deleted(self) -> int:
+        """The number of element widgets that left the tree"""
+        return len(self._deleted)
+
+    @property
+    def components_unmounted(self) -> int:
+        return len(self._unmounted)
+
+    def counts(self) -> Dict[str, int]:
+        """Every count, e.g. to compare in a single assertion"""
+        return {
+            'renders': self.render_count,
+            'widgets_created': self.widgets_created,
+            'widgets_updated': self.widgets_updated,
+            'widgets_deleted': self.widgets_deleted,
+            'components_created': self.components_created,
+            'components_unmounted': self.components_unmounted,
+        }
+
+    def _patch(self, owner, name, make_wrapper):
+        # None when the attribute is inherited, e.g. QWidget.__init__ comes from sip, and is deleted again by stop
+        original = owner.__dict__.get(name)
+        setattr(owner, name, make_wrapper(getattr(owner, name)))
+        self._patches.append((owner, name, original))
+
+    def start(self):
+        """Start counting"""
+        if self._patches:
+            return
+        counter = self
+
+        def count_init(original):
+            def __init__(widget, *args, **kwargs):
+                counter.widgets_created += 1
+                original(widget, *args, **kwargs)
+            return __init__
+
+        def count_update(original, attribute):
+            def update(element, value, *args):
+                before = getattr(element, attribute)
+                original(element, value, *args)
+                if getattr(element, attribute) != before:
+                    counter._updated.add(id(element))
+            return update
+
+        def count_destroy(original):
+            def destroy(element):
+                counter._deleted.add(id(element))
+                original(element)
+            return destroy
+
+        def count_component_init(original):
+            def __init__(component, *args, **kwargs):
+                counter.components_created += 1
+                original(component, *args, **kwargs)
+            return __init__
+
+        def count_unmount(original):
+            def unmount(component):
+                if not component._unmounted:
+                    counter._unmounted.add(id(component))
+                original(component)
+            return unmount
+
+        # every widget class, PyQt's and python subclasses, is constructed through QWidget.__init__
+        self._patch(QWidget, '__init__', count_init)
+        self._patch(NextPyElement, 'update_attributes', lambda original: count_update(original, 'attributes'))
+        self._patch(NextPyElement, 'update_content', lambda original: count_update(original, 'content'))
+        self._patch(NextPyElement, 'destroy', count_destroy)
+        self._patch(NextPyComponent, '__init__', count_component_init)
+        self._patch(NextPyComponent, 'unmount', count_unmount)
+
+        # every engine class defining render_template, the base one included
+        for engine_class in [BaseTemplateEngine] + _subclasses(BaseTemplateEngine):
+            if 'render_template' in engine_class.__dict__:
+                self._patch(engine_class, 'render_template', self._count_render)
+
+    def _count_render(self, original):
+        counter = self
+
+        def render_template(engine, template_path, **context):
+            counter.template_renders[template_path] += 1
+            return original(engine, template_path, **context)
+        return render_template
+
+    def stop(self):
+        """Stop counting, the counts are kept"""
+        for owner, name, original in reversed(self._patches):
+            if original is None:
+                delattr(owner, name)
+            else:
+                setattr(owner, name, original)
+        self._patches = []
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+
+def _subclasses(cls) -> list:
+    subclasses = []
+    for subclass in cls.__subclasses__():
+        subclasses.append(subclass)
+        subclasses.extend(_subclasses(subclass))
+    return subclasses
+
+
+class NextPyTestHarness:
+    """
+    Mounts a component without a window and asserts how much render work its methods cause
+    e.g.
+        with mount(TodoApp(template_engine=engine)) as harness:
+            harness.call('add_todo')
+            harness.assert_renders(1)
+            harness.assert_widgets(created=2, deleted=0)
+    Counts start at 0 after mounting, reset_counts starts them over
+    """
+    def __init__(self, component: NextPyComponent):
+        """
+        Constructor for NextPyTestHarness
+        :param component: the component to mount
+        """
+        self.component = component
+        self.counter = NextPyRenderCounter()
+        self.widget = None
+
+    def mount(self) -> QWidget:
+        """
+        Render the component
+        :return: the component widget
+        """
+        ensure_application()
+        self.counter.start()
+        self.widget = self.component.render()
+        self.process_events()
+        self.counter.reset()
+        return self.widget
+
+    def unmount(self):
+        """Unmount the component, delete its widgets and stop counting"""
+        self.component.unmount()
+        if self.widget is not None:
+            self.widget.deleteLater()
+            self.widget = None
+        self.process_events()
+        self.counter.stop()
+
+    def __enter__(self):
+        if self.widget is None:
+            self.mount()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.unmount()
+
+    @staticmethod
+    def process_events():
+        """Run pending events and deferred deletes, so the widget tree is settled"""
+        ensure_application().processEvents()
+        flush_deleted_widgets()
+
+    def reset_counts(self):
+        self.counter.reset()
+
+    # Driving the component
+
+    def call(self, method: str, *args, **kwargs):
+        """
+        Call a component method, as a template event would
+        :param method: the method name in component.methods
+        :return: the method result
+        """
+        result = self.component.methods[method](*args, **kwargs)
+        self.process_events()
+        return result
+
+    def set_state(self, new_state: dict):
+        self.component.set_state(new_state)
+        self.process_events()
+
+    def components(self) -> List[NextPyComponent]:
+        """The mounted components, the root one first"""
+        components = []
+        pending = [self.component]
+        while pending:
+            component = pending.pop(0)
+            components.append(component)
+            pending.extend(child for _, child in component.renderer.mounted_child_components())
+        return components
+
+    def elements(self) -> List[NextPyElement]:
+        """The elements of every mounted component"""
+        return [element for component in self.components() for element in component.renderer.widget_elements.values()]
+
+    def find(self, widget_type=QWidget, text: Optional[str] = None) -> List[QWidget]:
+        """
+        Find widgets of the mounted tree
+        :param widget_type: the widget class to look for
+        :param text: only widgets showing this text
+        :return: the matching widgets, in tree order
+        """
+        widgets = [self.widget] + self.widget.findChildren(QWidget)
+        return [
+            widget for widget in widgets
+            if isinstance(widget, widget_type) and (text is None or getattr(widget, 'text', lambda: None)() == text)
+        ]
+
+    def click(self, text: str):
+        """Click the button showing text"""
+        buttons = self.find(QPushButton, text)
+        if not buttons:
+            raise AssertionError(f"No button '{text}'")
+        buttons[0].click()
+        self.process_events()
+
+    def type_text(self, text: str, index=0):
+        """Type text into a line edit, replacing its content"""
+        inputs = self.find(QLineEdit)
+        if index >= len(inputs):
+            raise AssertionError(f"No input {index}, found {len(inputs)}")
+        inputs[index].setText(text)
+        # as if the user left the input, which writes debounced bindings right away
+        inputs[index].editingFinished.emit()
+        self.process_events()
+
+    # Measuring
+
+    def widget_count(self) -> int:
+        """The number of widgets in the mounted tree"""
+        return len(self.find())
+
+    def connection_count(self) -> int:
+        """The number of Qt signal connections made by the elements of the mounted tree"""
+        return sum(len(element.connections) for element in self.elements())
+
+    def binding_count(self) -> int:
+        """The number of signal bindings to widget properties in the mounted tree"""
+        return sum(len(element.signal_bindings) for element in self.elements())
+
+    # Asserting
+
+    def assert_renders(self, expected: int, template_path: Optional[str] = None):
+        """
+        Assert the number of template renders since mounting or the last reset
+        :param expected: the expected number of renders
+        :param template_path: only count this template
+        :return: void
+        """
+        actual = self.counter.template_renders[template_path] if template_path else self.counter.render_count
+        if actual != expected:
+            raise AssertionError(
+                f"Expected {expected} renders of {template_path or 'any template'}, got {actual}: "
+                f"{dict(self.counter.template_renders)}"
+            )
+
+    def assert_widgets(self, created: Optional[int] = None, updated: Optional[int] = None, deleted: Optional[int] = None):
+        """
+        Assert the number of widgets created, updated and deleted since mounting or the last reset.
+        Counts left to None are not checked
+        :return: void
+        """
+        expected = {'widgets_created': created, 'widgets_updated': updated, 'widgets_deleted': deleted}
+        counts = self.counter.counts()
+        wrong = {name: counts[name] for name, value in expected.items() if value is not None and counts[name] != value}
+        if wrong:
+            raise AssertionError(
+                f"Expected {', '.join(f'{name}={value}' for name, value in expected.items() if value is not None)}, "
+                f"got {', '.join(f'{name}={value}' for name, value in wrong.items())}"
+            )
+
+    def assert_connections(self, expected: int):
+        """Assert the number of Qt signal connections in the mounted tree, e.g. to catch connections piling up"""
+        actual = self.connection_count()
+        if actual != expected:
+            raise AssertionError(f"Expected {expected} signal connections, got {actual}")
+
+
+def mount(component: NextPyComponent) -> NextPyTestHarness:
+    """
+    Mount a component headlessly
+    :param component: the component to mount
+    :return: the harness driving it, usable as a context manager unmounting it at the end
+    """
+    harness = NextPyTestHarness(component)
+    harness.mount()
+    return harness
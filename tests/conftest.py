@@ -0,0 +1,23 @@
+import os
+import sys
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# The framework modules live at the repository root and templates are looked up relative to it
+sys.path.insert(0, ROOT)
+os.chdir(ROOT)
+os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+
+
+@pytest.fixture(scope='session', autouse=True)
+def application():
+    from testing import ensure_application
+    return ensure_application()
+
+
+@pytest.fixture
+def template_engine():
+    from template_engine import NextPyTemplate
+    return NextPyTemplate('templates')
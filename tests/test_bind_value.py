@@ -0,0 +1,98 @@
+import pytest
+from PyQt6.QtTest import QTest
+from PyQt6.QtWidgets import QLabel, QLineEdit
+
+from component import NextPyComponent
+from template_engine import NextPyTemplate
+from testing import mount
+
+
+class Form(NextPyComponent):
+    template_path = 'form.html'
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.state = {'text': '', 'rows': ['a', 'b', 'c']}
+
+
+@pytest.fixture
+def harness(tmp_path):
+    (tmp_path / 'form.html').write_text(
+        '<QWidget>\n'
+        '<QLineEdit bind:value.debounce.50="state.text"></QLineEdit>\n'
+        '<QLabel id="echo">{{ state.text }}</QLabel>\n'
+        '<QWidget id="rows">{% for row in state.rows %}<QLabel key="{{ row }}">{{ row }}</QLabel>{% endfor %}</QWidget>\n'
+        '</QWidget>'
+    )
+    with mount(Form(template_engine=NextPyTemplate(str(tmp_path)))) as harness:
+        yield harness
+
+
+def row_labels(harness):
+    """The row labels in layout order, as (text, label)"""
+    layout = harness.find(QLabel, 'a')[0].parentWidget().layout()
+    labels = [layout.itemAt(index).widget() for index in range(layout.count())]
+    return [(label.text(), label) for label in labels]
+
+
+def test_keyed_children_are_moved_instead_of_rebuilt(harness):
+    before = dict(row_labels(harness))
+
+    harness.set_state({'rows': ['c', 'a', 'b']})
+
+    after = row_labels(harness)
+    assert [text for text, _ in after] == ['c', 'a', 'b']
+    assert all(label is before[text] for text, label in after)
+    harness.assert_widgets(created=0, deleted=0)
+
+
+def test_keyed_children_keep_their_widgets_when_one_is_removed(harness):
+    before = dict(row_labels(harness))
+
+    harness.set_state({'rows': ['a', 'c']})
+
+    after = row_labels(harness)
+    assert [text for text, _ in after] == ['a', 'c']
+    assert all(label is before[text] for text, label in after)
+    harness.assert_widgets(created=0, deleted=1)
+
+
+def test_bound_write_is_not_echoed_into_the_input(harness):
+    line_edit = harness.find(QLineEdit)[0]
+    changes = []
+    line_edit.textChanged.connect(changes.append)
+
+    line_edit.setText('hello')
+    line_edit.setCursorPosition(2)
+    line_edit.editingFinished.emit()
+    harness.process_events()
+
+    assert harness.component.state['text'] == 'hello'
+    assert harness.find(QLabel, 'hello')
+    assert changes == ['hello']
+    assert line_edit.cursorPosition() == 2
+
+
+def test_bound_write_waits_for_typing_to_stop(harness):
+    line_edit = harness.find(QLineEdit)[0]
+
+    line_edit.setText('h')
+    line_edit.setText('he')
+    assert harness.component.state['text'] == ''
+    harness.assert_renders(0)
+
+    QTest.qWait(120)
+
+    assert harness.component.state['text'] == 'he'
+    harness.assert_renders(1)
+
+
+def test_state_change_elsewhere_wins_over_pending_text(harness):
+    line_edit = harness.find(QLineEdit)[0]
+
+    line_edit.setText('draft')
+    harness.set_state({'text': 'reset'})
+    QTest.qWait(120)
+
+    assert line_edit.text() == 'reset'
+    assert harness.component.state['text'] == 'reset'
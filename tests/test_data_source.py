@@ -0,0 +1,104 @@
+import numpy
+import pytest
+from PyQt6.QtCore import Qt
+from PyQt6.QtWidgets import QTableView
+
+from component import NextPyComponent
+from data_source import NextPyDataSource
+from table_elements import NextPyTableModel
+from template_engine import NextPyTemplate
+from testing import mount
+
+
+@pytest.fixture
+def source():
+    return NextPyDataSource({'name': numpy.array(['a', 'b', 'c']), 'price': numpy.arange(3, dtype=numpy.float64)})
+
+
+@pytest.fixture
+def model(source):
+    model = NextPyTableModel(['name', 'price'])
+    model.set_rows(source)
+    model.events = []
+    model.dataChanged.connect(lambda first, last: model.events.append(('changed', first.row(), last.row())))
+    model.rowsInserted.connect(lambda parent, first, last: model.events.append(('inserted', first, last)))
+    model.modelReset.connect(lambda: model.events.append(('reset',)))
+    return model
+
+
+def cell(model, row, column):
+    return model.data(model.index(row, column), Qt.ItemDataRole.DisplayRole)
+
+
+def test_rows_are_views_over_the_columns(source):
+    row = source[1]
+    source.column('price')[1] = 9.5
+
+    assert dict(row) == {'name': 'b', 'price': 9.5}
+    assert type(row['price']) is float
+    assert [view['name'] for view in source[-2:]] == ['b', 'c']
+
+
+def test_writes_notify_only_the_changed_rows(model, source):
+    source.set(1, 'price', 4.0)
+    source.set_range(0, 'name', ['x', 'y'])
+
+    assert model.events == [('changed', 1, 1), ('changed', 0, 1)]
+    assert cell(model, 1, 1) == '4.0'
+    assert cell(model, 0, 0) == 'x'
+
+
+def test_appended_rows_are_inserted_and_replaced_columns_reset(model, source):
+    source.extend({'name': ['d'], 'price': [3.0]})
+    assert model.rowCount() == 4
+
+    source.replace({'name': numpy.array(['z']), 'price': numpy.zeros(1)})
+
+    assert model.events == [('inserted', 3, 3), ('reset',)]
+    assert model.rowCount() == 1
+    assert cell(model, 0, 0) == 'z'
+
+
+def test_released_models_stop_following_the_source(model, source):
+    model.release()
+    source.set(0, 'price', 1.0)
+
+    assert model.events == []
+    assert source._subscribers == []
+
+
+def test_columns_of_different_lengths_are_rejected():
+    with pytest.raises(ValueError):
+        NextPyDataSource({'a': [1, 2], 'b': [1]})
+
+
+def test_npy_directories_are_memory_mapped(tmp_path):
+    numpy.save(tmp_path / 'price.npy', numpy.arange(4, dtype=numpy.float64))
+    numpy.save(tmp_path / 'count.npy', numpy.arange(4))
+
+    source = NextPyDataSource.from_npy(str(tmp_path))
+
+    assert source.column_names == ['count', 'price']
+    assert isinstance(source.column('price'), numpy.memmap)
+    assert source[3]['count'] == 3
+
+
+class Prices(NextPyComponent):
+    template_path = 'prices.html'
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.state = {'rows': NextPyDataSource({'name': ['a', 'b'], 'price': [1.0, 2.0]})}
+
+
+def test_bound_table_follows_the_source_without_rendering(tmp_path):
+    (tmp_path / 'prices.html').write_text('<QWidget><QTable bind:rows="state.rows" columns="name,price"/></QWidget>')
+
+    with mount(Prices(template_engine=NextPyTemplate(str(tmp_path)))) as harness:
+        model = harness.find(QTableView)[0].model()
+        harness.component.state['rows'].set(1, 'price', 5.0)
+        harness.component.state['rows'].extend({'name': ['c'], 'price': [3.0]})
+
+        assert cell(model, 1, 1) == '5.0'
+        assert model.rowCount() == 3
+        harness.assert_renders(0)
@@ -0,0 +1,83 @@
+import pytest
+from PyQt6.QtWidgets import QLabel
+
+from component import NextPyComponent
+from elements import (
+    NextPyElement, NextPyElementRegistry, NextPyLabelElement, element_registry, register_element
+)
+from template_engine import NextPyTemplate
+from testing import mount
+
+
+class NextPyBadgeElement(NextPyLabelElement):
+    ATTRIBUTE_SETTERS = {
+        'color': '_update_color',
+        'style': '_update_badge_style',
+    }
+
+    def _update_color(self, color, methods):
+        self.widget.setProperty('color', color)
+
+    def _update_badge_style(self, style, methods):
+        self.widget.setProperty('badge_style', style)
+
+
+class NextPyOutlinedBadgeElement(NextPyBadgeElement):
+    def _update_color(self, color, methods):
+        self.widget.setProperty('outline', color)
+
+
+def test_lookup_is_case_insensitive_and_imports_paths_once():
+    registry = NextPyElementRegistry()
+    registry.register('QBadge', NextPyBadgeElement)
+    registry.register('qtext', 'elements:NextPyLabelElement')
+
+    assert registry.get('qbadge') is NextPyBadgeElement
+    assert registry.get('QText') is NextPyLabelElement
+    assert registry._classes['qtext'] is NextPyLabelElement
+    assert 'QTEXT' in registry
+    assert registry.get('qblink') is None
+
+
+def test_only_element_classes_can_be_registered():
+    with pytest.raises(TypeError):
+        NextPyElementRegistry().register('qlabel', QLabel)
+
+
+def test_attribute_setters_merge_with_the_base_classes():
+    dispatch = NextPyOutlinedBadgeElement.attribute_dispatch
+
+    # inherited from NextPyElement and NextPyLabelElement
+    assert dispatch['disabled'] is NextPyElement._update_disabled
+    assert set(NextPyLabelElement.attribute_dispatch) <= set(dispatch)
+    # overridden by name in a subclass, and by method in a sub subclass
+    assert dispatch['style'] is NextPyBadgeElement._update_badge_style
+    assert dispatch['color'] is NextPyOutlinedBadgeElement._update_color
+    assert 'color' not in NextPyLabelElement.attribute_dispatch
+
+
+class Badges(NextPyComponent):
+    template_path = 'badges.html'
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.state = {'color': 'red'}
+
+
+@pytest.fixture
+def badge_tag():
+    register_element('qbadge')(NextPyBadgeElement)
+    yield
+    element_registry._classes.pop('qbadge')
+
+
+def test_registered_elements_render_and_update_through_their_setters(badge_tag, tmp_path):
+    (tmp_path / 'badges.html').write_text('<QWidget><QBadge color="{{ state.color }}">new</QBadge></QWidget>')
+
+    with mount(Badges(template_engine=NextPyTemplate(str(tmp_path)))) as harness:
+        badge = harness.find(QLabel, 'new')[0]
+        harness.set_state({'color': 'blue'})
+
+        assert harness.find(QLabel, 'new') == [badge]
+        assert badge.property('color') == 'blue'
+        harness.assert_widgets(created=0, updated=1)
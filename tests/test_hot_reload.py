@@ -0,0 +1,75 @@
+import os
+import time
+
+import pytest
+from PyQt6.QtWidgets import QLabel
+
+from component import NextPyComponent
+from hot_reload import NextPyTemplateWatcher
+from template_engine import NextPyTemplate, NextPyTemplateRegistry
+from testing import ensure_application, mount
+
+
+class Counter(NextPyComponent):
+    template_path = 'counter.html'
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.state = {'count': 0}
+        self.methods['increment'] = self.increment
+
+    def increment(self):
+        self.set_state({'count': self.state['count'] + 1})
+
+
+def write_template(path, source):
+    with open(path, 'w') as file:
+        file.write(source)
+    # a new modification time, even on file systems with coarse timestamps
+    mtime = time.time() + 10
+    os.utime(path, (mtime, mtime))
+
+
+def wait_until(condition, timeout=3.0):
+    deadline = time.monotonic() + timeout
+    while not condition() and time.monotonic() < deadline:
+        ensure_application().processEvents()
+        time.sleep(0.01)
+    return condition()
+
+
+@pytest.fixture
+def template_dir(tmp_path):
+    write_template(tmp_path / 'counter.html', '<QWidget><QLabel>Count {{ state.count }}</QLabel></QWidget>')
+    return tmp_path
+
+
+def label_texts(harness):
+    return [label.text() for label in harness.find(QLabel)]
+
+
+@pytest.mark.parametrize('auto_reload', [True, False])
+def test_editing_a_watched_template_rerenders_the_mounted_component(template_dir, auto_reload):
+    engine = NextPyTemplate(str(template_dir), auto_reload=auto_reload, registry=NextPyTemplateRegistry())
+    watcher = NextPyTemplateWatcher(engine, delay=0)
+
+    with mount(Counter(template_engine=engine)) as harness:
+        harness.call('increment')
+        assert label_texts(harness) == ['Count 1']
+
+        write_template(template_dir / 'counter.html', '<QWidget><QLabel>Total {{ state.count }}</QLabel></QWidget>')
+
+        assert wait_until(lambda: label_texts(harness) == ['Total 1'])
+        assert harness.component.state['count'] == 1
+
+    watcher.deleteLater()
+
+
+@pytest.mark.parametrize('auto_reload', [True, False])
+def test_reloading_a_template_bumps_its_version_once(template_dir, auto_reload):
+    registry = NextPyTemplateRegistry()
+    engine = NextPyTemplate(str(template_dir), auto_reload=auto_reload, registry=registry)
+
+    engine.reload_template('counter.html')
+
+    assert registry.version(str(template_dir), auto_reload) == 1
@@ -0,0 +1,111 @@
+import logging
+import time
+
+import pytest
+from PyQt6.QtGui import QColor, QImage
+from PyQt6.QtWidgets import QLabel
+
+from component import NextPyComponent
+from image_elements import NextPyPixmapCache, pixmap_cache
+from template_engine import NextPyTemplate
+from testing import ensure_application, mount
+
+
+def wait_until(condition, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not condition() and time.monotonic() < deadline:
+        ensure_application().processEvents()
+        time.sleep(0.005)
+    return condition()
+
+
+def save_image(path, width, height):
+    image = QImage(width, height, QImage.Format.Format_RGB32)
+    image.fill(QColor('red'))
+    assert image.save(str(path))
+    return str(path)
+
+
+@pytest.fixture
+def cache():
+    cache = NextPyPixmapCache()
+    yield cache
+    cache.deleteLater()
+
+
+def test_images_decode_once_at_the_requested_size(cache, tmp_path):
+    path = save_image(tmp_path / 'wide.png', 100, 50)
+    loaded = []
+
+    cache.load(path, (20, 0), loaded.append)
+    cache.load(path, (20, 0), loaded.append)
+
+    assert wait_until(lambda: len(loaded) == 2)
+    assert loaded[0] is loaded[1]
+    assert (loaded[0].width(), loaded[0].height()) == (20, 10)
+    assert cache.get(path, (20, 0)) is loaded[0]
+    assert cache.get(path, (0, 0)) is None
+    assert (cache.hits, cache.misses) == (1, 1)
+
+
+def test_least_recently_used_pixmaps_are_dropped_first(cache, tmp_path):
+    paths = [save_image(tmp_path / f'{index}.png', 10, 10) for index in range(3)]
+    cache.max_bytes = 2 * 10 * 10 * 4
+    loaded = []
+
+    for path in paths[:2]:
+        cache.load(path, (0, 0), loaded.append)
+    assert wait_until(lambda: len(loaded) == 2)
+    cache.get(paths[0])
+    cache.load(paths[2], (0, 0), loaded.append)
+    assert wait_until(lambda: len(loaded) == 3)
+
+    assert cache.get(paths[0]) is not None
+    assert cache.get(paths[1]) is None
+    assert cache.get(paths[2]) is not None
+
+
+def test_cancelled_callbacks_are_not_called(cache, tmp_path):
+    path = save_image(tmp_path / 'image.png', 10, 10)
+    loaded = []
+
+    cache.cancel(cache.load(path, (0, 0), loaded.append))
+
+    assert wait_until(lambda: cache.get(path) is not None)
+    assert loaded == []
+
+
+def test_images_that_fail_to_decode_give_none(cache, tmp_path, caplog):
+    path = tmp_path / 'broken.png'
+    path.write_bytes(b'not an image')
+    loaded = []
+
+    with caplog.at_level(logging.ERROR):
+        cache.load(str(path), (0, 0), loaded.append)
+        assert wait_until(lambda: loaded == [None])
+
+    assert 'Could not decode image' in caplog.text
+
+
+class Avatar(NextPyComponent):
+    template_path = 'avatar.html'
+
+
+def test_image_element_shows_the_decoded_image(tmp_path):
+    path = save_image(tmp_path / 'avatar.png', 64, 64)
+    (tmp_path / 'avatar.html').write_text(
+        f'<QWidget><QImage src="{path}" width="32" height="32" placeholder="..."/></QWidget>'
+    )
+    engine = NextPyTemplate(str(tmp_path))
+
+    with mount(Avatar(template_engine=engine)) as harness:
+        label = harness.find(QLabel)[0]
+        assert wait_until(lambda: label.pixmap() is not None and not label.pixmap().isNull())
+        assert label.pixmap().size().width() == 32
+
+    # decoded images are shown right away by the next element using them
+    hits = pixmap_cache().hits
+    with mount(Avatar(template_engine=engine)) as harness:
+        label = harness.find(QLabel)[0]
+        assert not label.pixmap().isNull()
+        assert pixmap_cache().hits == hits + 1
@@ -0,0 +1,23 @@
+from app import TodoApp
+from components.hello_world import HelloWorldApp
+from leak_check import check_for_leaks
+
+
+def add_and_remove_todos(component):
+    for text in ('first', 'second', 'third'):
+        component.set_state({'new_todo': text})
+        component.add_todo()
+    component.update_todo_status(1, True)
+    component.remove_todo(0)
+
+
+def test_todo_app_leaks_nothing_when_unmounted(template_engine):
+    leaks = check_for_leaks(
+        lambda: TodoApp(template_engine=template_engine), cycles=100, exercise=add_and_remove_todos
+    )
+    assert leaks == {'NextPyComponent': 0, 'NextPyElement': 0, 'QWidget': 0}
+
+
+def test_hello_world_leaks_nothing_when_unmounted(template_engine):
+    leaks = check_for_leaks(lambda: HelloWorldApp(template_engine=template_engine), cycles=100)
+    assert leaks == {'NextPyComponent': 0, 'NextPyElement': 0, 'QWidget': 0}
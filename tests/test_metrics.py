@@ -0,0 +1,111 @@
+import socket
+import threading
+import time
+import urllib.request
+
+import pytest
+
+from app import TodoApp
+from components.hello_world import HelloWorldApp
+from metrics import NextPyMetrics, NextPyMetricsServer
+from router import NextPyRouter
+from template_engine import NextPyTemplate
+from testing import ensure_application, mount
+from window import NextPyWindow
+
+
+def test_routes_and_template_caches_of_every_engine_are_reported():
+    todo_engine, hello_engine = NextPyTemplate('templates'), NextPyTemplate('templates')
+    router = NextPyRouter()
+    router.register_route('todo_app', lambda: TodoApp(template_engine=todo_engine))
+    router.register_route('hello_world', lambda: HelloWorldApp(template_engine=hello_engine))
+
+    window = NextPyWindow(router.navigate('todo_app'), router, route='todo_app')
+    window.navigate_to('hello_world')
+    window.navigate_to('todo_app')
+
+    snapshot = window.metrics.snapshot()
+    assert set(snapshot['routes']) == {'todo_app', 'hello_world'}
+
+    templates = snapshot['caches']['templates']
+    assert templates['hits'] == todo_engine.cache_hits + hello_engine.cache_hits
+    assert templates['misses'] == todo_engine.cache_misses + hello_engine.cache_misses
+    assert hello_engine.cache_hits + hello_engine.cache_misses > 0
+    assert {'styles', 'templates', 'parsed_templates', 'pixmaps'} <= set(snapshot['caches'])
+    window.root_component.unmount()
+
+
+def test_template_lookups_count_compilations(tmp_path):
+    (tmp_path / 'page.html').write_text('<QWidget></QWidget>')
+    engine = NextPyTemplate(str(tmp_path))
+
+    engine.render_template('page.html')
+    engine.render_template('page.html')
+    engine.invalidate('page.html')
+    engine.render_template('page.html')
+
+    assert (engine.cache_hits, engine.cache_misses) == (1, 2)
+
+
+def scrape(read):
+    """Read from a metrics server on another thread, while this one runs the Qt event loop serving it"""
+    result = []
+    thread = threading.Thread(target=lambda: result.append(read()))
+    thread.start()
+    while thread.is_alive():
+        ensure_application().processEvents()
+        time.sleep(0.005)
+    return result[0]
+
+
+def read_http(url):
+    with urllib.request.urlopen(url, timeout=5) as response:
+        return response.status, response.headers['Content-Type'], response.read().decode('utf-8')
+
+
+def read_unix_socket(path):
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as connection:
+        connection.settimeout(5)
+        connection.connect(path)
+        chunks = []
+        while chunk := connection.recv(4096):
+            chunks.append(chunk)
+    return b''.join(chunks).decode('utf-8')
+
+
+@pytest.fixture
+def metrics(template_engine):
+    metrics = NextPyMetrics()
+    metrics.register_cache('templates', lambda: (3, 1))
+    with mount(TodoApp(template_engine=template_engine)) as harness:
+        metrics.set_route('todo "app"', harness.component)
+        with metrics.measure_render():
+            harness.type_text('milk')
+            harness.click('Add')
+        yield metrics
+
+
+def test_metrics_are_exposed_in_the_prometheus_text_format(metrics):
+    lines = metrics.to_prometheus().splitlines()
+
+    assert '# TYPE nextpy_renders_total counter' in lines
+    assert 'nextpy_renders_total{route="todo \\"app\\""} 1' in lines
+    assert 'nextpy_live_components{route="todo \\"app\\""} 2' in lines
+    assert 'nextpy_cache_hit_ratio{cache="templates"} 0.75' in lines
+    samples = [line for line in lines if not line.startswith('#')]
+    assert all(len(line.rsplit(' ', 1)) == 2 and float(line.rsplit(' ', 1)[1]) >= 0 for line in samples)
+
+
+def test_metrics_are_served_over_http_and_a_local_socket(metrics, tmp_path):
+    socket_path = str(tmp_path / 'metrics.sock')
+    server = NextPyMetricsServer(metrics, port=0, unix_socket=socket_path)
+    try:
+        url = f'http://127.0.0.1:{server.http_port}/metrics'
+        status, content_type, body = scrape(lambda: read_http(url))
+        assert status == 200
+        assert content_type.startswith('text/plain; version=0.0.4')
+        assert body == metrics.to_prometheus()
+
+        assert scrape(lambda: read_unix_socket(socket_path)) == metrics.to_prometheus()
+    finally:
+        server.close()
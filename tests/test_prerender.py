@@ -0,0 +1,22 @@
+from prerender import _render_vnode
+from template_engine import NextPyTemplate, NextPyTemplateRegistry
+
+
+def test_workers_drop_templates_invalidated_in_the_gui_process(tmp_path):
+    (tmp_path / 'item.html').write_text('<QLabel>{{ props.text }}</QLabel>')
+    engine = NextPyTemplate(str(tmp_path), auto_reload=False, registry=NextPyTemplateRegistry())
+    template_dir = str(tmp_path)
+
+    def job():
+        version = engine.registry.version(template_dir, auto_reload=False)
+        vnode, error = _render_vnode((template_dir, False, version, 'item.html', {'props': {'text': 'a'}}))
+        assert error is None
+        return vnode
+
+    before = job()
+    (tmp_path / 'item.html').write_text('<QPushButton>{{ props.text }}</QPushButton>')
+    # the worker keeps its compiled template until the GUI process invalidates it
+    assert job() == before
+
+    engine.invalidate('item.html')
+    assert job() != before
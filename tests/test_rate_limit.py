@@ -0,0 +1,154 @@
+import asyncio
+
+from PyQt6.QtTest import QTest
+from PyQt6.QtWidgets import QLineEdit
+
+from app import TodoApp
+from async_loop import async_loop
+from component import NextPyComponent
+from components.todo_item import TodoItem
+from rate_limit import debounce, rate_limit, throttle, timer_queue
+from template_engine import NextPyTemplate
+from testing import mount
+
+
+class SearchApp(TodoApp):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.searches = []
+        self.methods['search'] = self.search
+        self.methods['load'] = self.load
+        self.methods['load_later'] = rate_limit(self.load, ['debounce', '10'])
+
+    @debounce(10)
+    async def search(self, text):
+        await asyncio.sleep(0)
+        self.searches.append(text)
+
+    @throttle(10)
+    async def load(self, text):
+        await asyncio.sleep(0)
+        self.searches.append(text)
+
+
+def settle(milliseconds=50):
+    """Let the rate limiters fire, then run the tasks they started"""
+    QTest.qWait(milliseconds)
+    async_loop().run_until_idle()
+
+
+def test_debounced_async_method_runs_once_with_the_last_arguments(template_engine):
+    with mount(SearchApp(template_engine=template_engine)) as harness:
+        harness.call('search', 'a')
+        harness.call('search', 'ab')
+        assert harness.component.searches == []
+
+        settle()
+        assert harness.component.searches == ['ab']
+
+
+def test_throttled_async_method_runs_the_first_and_last_call(template_engine):
+    with mount(SearchApp(template_engine=template_engine)) as harness:
+        for text in ('a', 'b', 'c'):
+            harness.call('load', text)
+
+        settle()
+        assert harness.component.searches == ['a', 'c']
+
+
+def test_rate_limited_async_method_in_methods_runs(template_engine):
+    with mount(SearchApp(template_engine=template_engine)) as harness:
+        harness.call('load_later', 'a')
+
+        settle()
+        assert harness.component.searches == ['a']
+
+
+def test_debounce_flush_runs_the_waiting_call_now():
+    calls = []
+    debounced = rate_limit(calls.append, ['debounce', '1000'])
+
+    debounced('a')
+    debounced('b')
+    debounced.flush()
+    debounced.flush()
+
+    assert calls == ['b']
+    assert not debounced.pending
+
+
+def test_debounce_cancel_drops_the_waiting_call():
+    calls = []
+    debounced = rate_limit(calls.append, ['debounce', '10'])
+
+    debounced('a')
+    debounced.cancel()
+    settle()
+
+    assert calls == []
+
+
+def test_rate_limit_reads_the_wait_from_the_modifiers():
+    assert rate_limit(print, ['prevent']) is print
+    assert rate_limit(print, ['debounce']).wait == 100
+    assert rate_limit(print, ['throttle', '250']).wait == 250
+
+
+def test_timer_queue_runs_calls_in_due_order():
+    calls = []
+    queue = timer_queue()
+
+    queue.call_later(20, lambda: calls.append('late'))
+    cancelled = queue.call_later(5, lambda: calls.append('cancelled'))
+    queue.call_later(10, lambda: calls.append('early'))
+    queue.cancel(cancelled)
+    settle()
+
+    assert calls == ['early', 'late']
+
+
+def test_decorated_methods_have_a_limiter_per_instance(template_engine):
+    first, second = SearchApp(template_engine=template_engine), SearchApp(template_engine=template_engine)
+
+    first.search('a')
+    second.search('b')
+    settle()
+
+    assert first.search is not second.search
+    assert (first.searches, second.searches) == (['a'], ['b'])
+
+
+class Modifiers(NextPyComponent):
+    template_path = 'modifiers.html'
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.calls = []
+        self.components = {'todo-item': TodoItem}
+        self.methods['clicked'] = lambda: self.calls.append('clicked')
+        self.methods['changed'] = lambda text: self.calls.append(text)
+        self.methods['removed'] = lambda index: self.calls.append(f'removed {index}')
+
+
+def test_template_event_modifiers_coalesce_events(tmp_path):
+    (tmp_path / 'modifiers.html').write_text(
+        '<QWidget>\n'
+        '<QPushButton on_click.throttle.1000="clicked()">Go</QPushButton>\n'
+        '<QLineEdit on_change.debounce.10="changed"></QLineEdit>\n'
+        '<component name="todo-item" text="milk" id="0" on_remove.debounce.10="removed"></component>\n'
+        '</QWidget>'
+    )
+    (tmp_path / 'todo_item.html').write_text(
+        '<QWidget><QPushButton on_click="remove_todo()">Remove</QPushButton></QWidget>'
+    )
+
+    with mount(Modifiers(template_engine=NextPyTemplate(str(tmp_path)))) as harness:
+        for _ in range(3):
+            harness.click('Go')
+            harness.click('Remove')
+        line_edit = harness.find(QLineEdit)[0]
+        for text in ('m', 'mi', 'mil'):
+            line_edit.setText(text)
+        settle()
+
+        assert sorted(harness.component.calls) == ['clicked', 'mil', 'removed 0']
@@ -0,0 +1,78 @@
+import pytest
+from PyQt6.QtWidgets import QLabel, QWidget
+
+from app import TodoApp
+from testing import NextPyRenderCounter, mount
+
+
+@pytest.fixture
+def harness(template_engine):
+    with mount(TodoApp(template_engine=template_engine)) as harness:
+        yield harness
+
+
+def add_todo(harness, text):
+    harness.type_text(text)
+    harness.click('Add')
+
+
+def test_counter_counts_qt_widgets_constructed():
+    with NextPyRenderCounter() as counter:
+        widgets = [QWidget(), QLabel('label')]
+    assert counter.widgets_created == 2
+    assert '__init__' not in QWidget.__dict__
+    QWidget()
+    assert counter.widgets_created == 2
+    del widgets
+
+
+def test_typing_into_a_bound_input_renders_nothing(harness):
+    harness.type_text('milk')
+
+    harness.assert_renders(0)
+    harness.assert_widgets(created=0, updated=0, deleted=0)
+    assert harness.component.state['new_todo'] == 'milk'
+
+
+def test_adding_a_todo_only_creates_its_item(harness):
+    add_todo(harness, 'milk')
+
+    harness.assert_renders(1, 'todo_app.html')
+    harness.assert_renders(1, 'todo_item.html')
+    # the item's container, checkbox, label and button; the empty list label is removed,
+    # the count label is updated in place instead of the whole tree being rebuilt
+    harness.assert_widgets(created=4, updated=1, deleted=1)
+
+
+def test_adding_a_todo_leaves_the_other_items_alone(harness):
+    add_todo(harness, 'milk')
+    harness.reset_counts()
+
+    add_todo(harness, 'eggs')
+
+    harness.assert_renders(1, 'todo_item.html')
+    harness.assert_widgets(created=4, updated=1, deleted=0)
+    assert harness.counter.components_created == 1
+
+
+def test_changing_one_todo_rerenders_only_its_item(harness):
+    add_todo(harness, 'milk')
+    add_todo(harness, 'eggs')
+    harness.reset_counts()
+
+    harness.call('update_todo_status', 1, True)
+
+    harness.assert_renders(1, 'todo_app.html')
+    harness.assert_renders(1, 'todo_item.html')
+    harness.assert_widgets(created=0, updated=1, deleted=0)
+    assert harness.counter.components_created == 0
+
+
+def test_setting_unchanged_state_renders_nothing(harness):
+    add_todo(harness, 'milk')
+    harness.reset_counts()
+
+    harness.set_state({'todos': harness.component.state['todos']})
+
+    harness.assert_renders(0)
+    harness.assert_widgets(created=0, updated=0, deleted=0)
@@ -0,0 +1,116 @@
+import pytest
+from PyQt6.QtWidgets import QLabel, QVBoxLayout, QWidget
+from pydantic import BaseModel
+
+from component import NextPyComponent
+from scheduler import Priority, scheduler
+from template_engine import NextPyTemplate
+
+
+# (component, attached) for every component_did_mount call
+mounted = []
+
+
+class RowProps(BaseModel):
+    rows: int
+
+
+class Rows(NextPyComponent):
+    template_path = 'rows.html'
+    props_schema = RowProps
+
+    def component_did_mount(self):
+        mounted.append(('rows', self.renderer.main_widget.parentWidget() is not None))
+
+
+class Page(NextPyComponent):
+    template_path = 'page.html'
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.state = {'title': 'first'}
+        self.components = {'rows': Rows}
+
+    def component_did_mount(self):
+        mounted.append(('page', self.renderer.main_widget.parentWidget() is not None))
+
+
+@pytest.fixture
+def engine(tmp_path):
+    mounted.clear()
+    (tmp_path / 'page.html').write_text(
+        '<QWidget><QLabel>{{ state.title }}</QLabel><component name="rows" rows="20"></component>'
+        '<suspense fallback="..."><QLabel>later</QLabel></suspense></QWidget>'
+    )
+    (tmp_path / 'rows.html').write_text(
+        '<QWidget>{% for i in range(props.rows) %}<QLabel>row {{ i }}</QLabel>{% endfor %}</QWidget>'
+    )
+    return NextPyTemplate(str(tmp_path))
+
+
+def render_sliced(component, **kwargs):
+    """Render sliced into a parent widget, as the window does"""
+    parent = QWidget()
+    parent.setLayout(QVBoxLayout())
+    parent.layout().addWidget(component.render_sliced(**kwargs))
+    return parent
+
+
+def run_steps():
+    """Run the scheduler one step at a time, returning the number of steps"""
+    steps = 0
+    while scheduler()._run_step():
+        steps += 1
+    return steps
+
+
+def labels(widget):
+    return [label.text() for label in widget.findChildren(QLabel) if label.isVisibleTo(widget)]
+
+
+def test_child_components_are_built_one_element_per_step(engine):
+    page = Page(template_engine=engine)
+    parent = render_sliced(page)
+
+    # page, title, rows component, suspense, the 21 elements of rows, the commit,
+    # then the suspense child and its resolve
+    assert run_steps() > 21
+    assert 'row 19' in labels(parent)
+
+
+def test_progress_reaches_the_total(engine):
+    progress = []
+    parent = render_sliced(Page(template_engine=engine), on_progress=lambda created, total: progress.append((created, total)))
+    run_steps()
+
+    # the QWidget, QLabel, component and suspense, not the suspense children created later
+    assert progress[-1] == (4, 4)
+    assert labels(parent)[-1] == 'later'
+
+
+def test_mount_hooks_run_once_the_tree_is_attached(engine):
+    page = Page(template_engine=engine)
+    parent = render_sliced(page)
+    run_steps()
+
+    assert mounted == [('rows', True), ('page', True)]
+    assert page.renderer.main_widget.parentWidget() is parent
+
+
+def test_state_change_during_the_build_does_not_restart_it(engine):
+    page = Page(template_engine=engine)
+    parent = render_sliced(page)
+    for _ in range(5):
+        scheduler()._run_step()
+
+    page.set_state({'title': 'second'})
+    assert page.renderer._sliced_render is not None
+
+    order = []
+    scheduler().schedule(lambda: order.append('background'), Priority.BACKGROUND)
+    scheduler().schedule(lambda: order.append('urgent'), Priority.USER_BLOCKING)
+    run_steps()
+
+    assert order == ['urgent', 'background']
+    assert labels(parent)[0] == 'second'
+    assert mounted == [('rows', True), ('page', True)]
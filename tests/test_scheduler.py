@@ -0,0 +1,86 @@
+import logging
+import time
+
+from PyQt6.QtTest import QTest
+
+from scheduler import NextPyScheduler, Priority
+
+
+def steps(name, count, calls, duration=0.0):
+    for index in range(count):
+        if duration:
+            time.sleep(duration)
+        calls.append(f'{name}{index}')
+        yield
+
+
+def test_jobs_run_by_priority_then_in_order():
+    queue, calls = NextPyScheduler(), []
+
+    queue.schedule(lambda: calls.append('background'), Priority.BACKGROUND)
+    queue.schedule(lambda: calls.append('normal 1'))
+    queue.schedule(lambda: calls.append('blocking'), Priority.USER_BLOCKING)
+    queue.schedule(lambda: calls.append('normal 2'))
+    queue.run_all()
+
+    assert calls == ['blocking', 'normal 1', 'normal 2', 'background']
+
+
+def test_higher_priority_work_runs_between_the_steps_of_a_job():
+    queue, calls = NextPyScheduler(), []
+    queue.schedule(steps('b', 3, calls), Priority.BACKGROUND)
+
+    queue._run_step()
+    queue.schedule(lambda: calls.append('input'), Priority.USER_BLOCKING)
+    queue.run_all()
+
+    assert calls == ['b0', 'input', 'b1', 'b2']
+
+
+def test_a_tick_yields_once_its_budget_is_spent():
+    queue, calls = NextPyScheduler(budget=5), []
+    queue.schedule(steps('s', 20, calls, duration=0.002))
+
+    queue.run_tick()
+
+    assert 0 < len(calls) < 20
+    assert queue.pending
+
+    QTest.qWait(200)
+    assert len(calls) == 20
+    assert not queue.pending
+
+
+def test_cancelled_jobs_do_not_run():
+    queue, calls = NextPyScheduler(), []
+    job = steps('s', 3, calls)
+
+    handle = queue.schedule(job)
+    queue._run_step()
+    queue.cancel(handle)
+    queue.run_all()
+
+    assert calls == ['s0']
+    assert job.gi_frame is None
+
+
+def test_a_failing_job_does_not_stall_the_queue(caplog):
+    queue, calls = NextPyScheduler(), []
+
+    def fail():
+        raise RuntimeError('boom')
+
+    def failing_steps():
+        calls.append('started')
+        yield
+        raise RuntimeError('boom')
+
+    queue.schedule(fail)
+    queue.schedule(failing_steps())
+    queue.schedule(steps('s', 2, calls))
+    with caplog.at_level(logging.ERROR):
+        queue.run_tick()
+        QTest.qWait(50)
+
+    assert calls == ['started', 's0', 's1']
+    assert sum('boom' in record.getMessage() for record in caplog.records) == 2
@@ -0,0 +1,90 @@
+import logging
+
+import pytest
+from PyQt6.QtWidgets import QLabel
+
+from component import NextPyComponent
+from components.hello_world import HelloWorldApp
+from signals import NextPyComputedSignal, NextPySignal
+from template_engine import NextPyTemplate
+from testing import mount
+
+
+
+def test_subscribers_are_called_only_for_new_values():
+    signal = NextPySignal(1)
+    values = []
+    unsubscribe = signal.subscribe(values.append)
+
+    signal.set(1)
+    signal.set(2)
+    signal.update(lambda value: value + 1)
+    unsubscribe()
+    signal.set(4)
+
+    assert values == [1, 2, 3]
+
+
+def test_computed_signal_tracks_the_signals_it_reads():
+    use_first = NextPySignal(True)
+    first, second = NextPySignal('a'), NextPySignal('b')
+    computed = NextPyComputedSignal(lambda: first.get() if use_first.get() else second.get())
+    values = []
+    computed.subscribe(values.append)
+
+    second.set('B')
+    use_first.set(False)
+    first.set('A')
+    second.set('BB')
+
+    assert values == ['a', 'B', 'BB']
+
+
+def test_computed_signal_without_subscribers_computes_on_read():
+    count = NextPySignal(1)
+    computations = []
+    doubled = NextPyComputedSignal(lambda: computations.append(1) or count.get() * 2)
+
+    count.set(2)
+    count.set(3)
+
+    assert computations == []
+    assert doubled.get() == 6
+    assert doubled.get() == 6
+    assert computations == [1]
+    with pytest.raises(AttributeError):
+        doubled.set(1)
+
+
+def test_signal_binding_updates_the_label_without_rendering(template_engine):
+    with mount(HelloWorldApp(template_engine=template_engine)) as harness:
+        assert harness.find(QLabel, 'Clicked 0 times')
+
+        harness.click('Click me')
+        harness.click('Click me')
+
+        assert harness.find(QLabel, 'Clicked 2 times')
+        harness.assert_renders(0)
+        harness.assert_widgets(created=0, deleted=0)
+
+
+def test_unmounted_bindings_stop_listening(template_engine):
+    component = HelloWorldApp(template_engine=template_engine)
+    with mount(component):
+        pass
+
+    assert component.signals['clicks_label']._subscribers == []
+
+
+class UnknownSignal(NextPyComponent):
+    template_path = 'unknown_signal.html'
+
+
+def test_unknown_signal_is_logged(tmp_path, caplog):
+    (tmp_path / 'unknown_signal.html').write_text('<QWidget><QLabel signal:text="missing"></QLabel></QWidget>')
+
+    with caplog.at_level(logging.WARNING):
+        with mount(UnknownSignal(template_engine=NextPyTemplate(str(tmp_path)))):
+            pass
+
+    assert any("Unknown signal 'missing'" in record.getMessage() for record in caplog.records)
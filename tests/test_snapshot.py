@@ -0,0 +1,56 @@
+import pytest
+
+from app import TodoApp
+from data_source import NextPyDataSource
+from snapshot import dumps, loads, restore_component
+from testing import mount
+
+
+def widget_tree(widget):
+    """The widget tree in layout order, as (class, text, checked, children)"""
+    layout = widget.layout()
+    children = [layout.itemAt(index).widget() for index in range(layout.count())] if layout else []
+    return (
+        type(widget).__name__,
+        widget.text() if hasattr(widget, 'text') else None,
+        widget.isChecked() if hasattr(widget, 'isChecked') else None,
+        [widget_tree(child) for child in children if child is not None],
+    )
+
+
+def add_todo(harness, text):
+    harness.type_text(text)
+    harness.click('Add')
+
+
+def test_restored_snapshot_matches_a_fresh_render_without_rendering_templates(template_engine, monkeypatch):
+    with mount(TodoApp(template_engine=template_engine)) as harness:
+        add_todo(harness, 'milk')
+        add_todo(harness, 'eggs')
+        harness.call('update_todo_status', 1, True)
+        data = dumps(harness.component.snapshot(), compress=True)
+        expected = widget_tree(harness.widget)
+
+    restored = restore_component(loads(data), template_engine=template_engine)
+    renders = []
+    render_template = template_engine.render_template
+    monkeypatch.setattr(template_engine, 'render_template', lambda path, **context: (
+        renders.append(path) or render_template(path, **context)
+    ))
+
+    with mount(restored) as harness:
+        assert renders == []
+        assert widget_tree(harness.widget) == expected
+        assert restored.state['todos'][1]['completed'] is True
+
+        # later changes render as usual
+        add_todo(harness, 'bread')
+        assert renders
+        assert len(harness.components()) == 4
+
+def test_non_json_state_is_rejected_with_its_path(template_engine):
+    component = TodoApp(template_engine=template_engine)
+    component.set_state({'rows': NextPyDataSource({'text': ['milk']})}, rerender=False)
+
+    with pytest.raises(ValueError, match=r"NextPyDataSource at snapshot\.state\.rows"):
+        dumps(component.snapshot(include_vnodes=False))
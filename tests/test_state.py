@@ -0,0 +1,93 @@
+import pytest
+
+from component import NextPyComponent
+from state import NextPyState, NextPyStateList, diff_paths, freeze, paths_overlap, set_in, thaw
+
+
+class Store(NextPyComponent):
+    immutable_state = True
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.state = {'todos': [{'text': 'milk', 'completed': False}], 'filter': 'all'}
+        self.rerenders = []
+        self.renderer.rerender_component = lambda changed_keys, changed_paths=None: self.rerenders.append(
+            (changed_keys, changed_paths)
+        )
+
+
+class MutableStore(Store):
+    immutable_state = False
+
+
+def test_freeze_converts_nested_containers_once():
+    state = freeze({'todos': [{'text': 'milk'}], 'count': 1})
+
+    assert isinstance(state, NextPyState)
+    assert isinstance(state['todos'], NextPyStateList)
+    assert isinstance(state['todos'][0], NextPyState)
+    assert freeze(state) is state
+    assert thaw(state) == {'todos': [{'text': 'milk'}], 'count': 1}
+
+
+def test_set_in_shares_untouched_values():
+    state = freeze({'todos': [{'text': 'milk'}, {'text': 'eggs'}], 'filter': 'all'})
+
+    updated = set_in(state, ['todos', 1, 'text'], 'bread')
+
+    assert updated['todos'][1]['text'] == 'bread'
+    assert state['todos'][1]['text'] == 'eggs'
+    assert updated['todos'][0] is state['todos'][0]
+    assert set_in(state, ['filter'], 'all') is state
+
+
+def test_set_in_copies_plain_containers():
+    state = {'todos': [{'text': 'milk'}]}
+
+    updated = set_in(state, ['todos', 0, 'text'], 'bread')
+
+    assert updated == {'todos': [{'text': 'bread'}]}
+    assert state == {'todos': [{'text': 'milk'}]}
+
+
+def test_diff_paths_finds_only_changed_values():
+    state = freeze({'todos': [{'text': 'milk', 'completed': False}], 'filter': 'all'})
+
+    assert diff_paths(state, state) == []
+    assert diff_paths(state, set_in(state, ['todos', 0, 'completed'], True)) == [('todos', 0, 'completed')]
+    assert diff_paths(state, state.set('todos', state['todos'].append({'text': 'eggs'}))) == [('todos',)]
+    assert diff_paths(state, state.delete('filter')) == [('filter',)]
+
+
+def test_paths_overlap_when_one_is_a_prefix():
+    assert paths_overlap(('todos',), ('todos', 0, 'text'))
+    assert paths_overlap(('todos', 0), ('todos',))
+    assert paths_overlap((), ('filter',))
+    assert not paths_overlap(('todos', 0), ('todos', 1))
+    assert not paths_overlap(('filter',), ('todos',))
+
+
+def test_unchanged_state_does_not_rerender():
+    store = Store()
+
+    store.set_state({'filter': 'all', 'todos': store.state['todos']})
+
+    assert store.rerenders == []
+
+
+def test_nested_change_rerenders_with_its_path():
+    store = Store()
+
+    store.set_state_in(['todos', 0, 'completed'], True)
+
+    assert store.rerenders == [({'todos'}, [('todos', 0, 'completed')])]
+
+
+@pytest.mark.parametrize('component_class', [Store, MutableStore])
+def test_set_state_in_adds_a_missing_key(component_class):
+    store = component_class()
+
+    store.set_state_in(['new_field'], 'value')
+
+    assert store.state['new_field'] == 'value'
+    assert len(store.rerenders) == 1
@@ -0,0 +1,101 @@
+import pytest
+from PyQt6.QtWidgets import QLabel
+
+from component import NextPyComponent
+from lazy import NextPyLazyComponent
+from scheduler import scheduler
+from template_engine import NextPyTemplate
+from leak_check import flush_deleted_widgets
+from testing import mount
+
+
+class Chart(NextPyComponent):
+    template_path = 'chart.html'
+
+
+loads = []
+
+
+def load_chart():
+    loads.append(Chart)
+    return Chart
+
+
+# shared by every Dashboard, as components registered on the class would be
+lazy_chart = NextPyLazyComponent(load_chart, fallback='Loading chart')
+
+
+class Dashboard(NextPyComponent):
+    template_path = 'dashboard.html'
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.state = {'title': 'first'}
+        self.components = {'chart': lazy_chart}
+
+
+@pytest.fixture
+def engine(tmp_path):
+    loads.clear()
+    lazy_chart.component_class = None
+    (tmp_path / 'dashboard.html').write_text(
+        '<QWidget><QLabel>{{ state.title }}</QLabel>'
+        '<suspense fallback="Loading rows"><QLabel>row 1</QLabel><QLabel>row 2</QLabel></suspense>'
+        '<component name="chart"></component></QWidget>'
+    )
+    (tmp_path / 'chart.html').write_text('<QWidget><QLabel>chart</QLabel></QWidget>')
+    return NextPyTemplate(str(tmp_path))
+
+
+def texts(widget):
+    return sorted(label.text() for label in widget.findChildren(QLabel))
+
+
+def test_fallbacks_show_until_the_scheduler_runs(engine):
+    component = Dashboard(template_engine=engine)
+    widget = component.render()
+    assert texts(widget) == ['Loading chart', 'Loading rows', 'first']
+    assert loads == []
+
+    scheduler().run_all()
+    flush_deleted_widgets()
+
+    assert texts(widget) == ['chart', 'first', 'row 1', 'row 2']
+    assert loads == [Chart]
+    component.unmount()
+    widget.deleteLater()
+
+
+def test_lazy_component_loads_once(engine):
+    with mount(Dashboard(template_engine=engine)):
+        scheduler().run_all()
+    with mount(Dashboard(template_engine=engine)) as harness:
+        assert 'chart' in texts(harness.widget)
+
+    assert loads == [Chart]
+
+
+def test_rerender_creates_pending_suspense_children_once(engine):
+    component = Dashboard(template_engine=engine)
+    widget = component.render()
+
+    component.set_state({'title': 'second'})
+    scheduler().run_all()
+    flush_deleted_widgets()
+
+    assert texts(widget) == ['chart', 'row 1', 'row 2', 'second']
+    component.unmount()
+    widget.deleteLater()
+
+
+def test_unmounting_before_the_scheduler_runs_drops_the_pending_work(engine):
+    component = Dashboard(template_engine=engine)
+    widget = component.render()
+    component.unmount()
+    widget.deleteLater()
+    flush_deleted_widgets()
+
+    scheduler().run_all()
+
+    assert not scheduler().pending
+    assert loads == []
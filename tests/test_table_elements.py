@@ -0,0 +1,52 @@
+import pytest
+from PyQt6.QtWidgets import QStyleOptionViewItem, QTableView
+
+from component import NextPyComponent
+from table_elements import NextPyItemViewElement
+from template_engine import NextPyTemplate
+from testing import mount
+
+
+class Todos(NextPyComponent):
+    template_path = 'todos.html'
+    immutable_state = True
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.state = {'todos': [{'text': f"todo {i}", 'completed': False} for i in range(3)]}
+
+
+@pytest.fixture
+def engine(tmp_path):
+    (tmp_path / 'todos.html').write_text(
+        '<QWidget><QTable bind:rows="state.todos" columns="text,completed" cell_template="cell.html"/></QWidget>'
+    )
+    (tmp_path / 'cell.html').write_text('<b>{{ value }}</b>')
+    return NextPyTemplate(str(tmp_path))
+
+
+def measure_cells(view):
+    """Ask the delegate for the size of every cell, as the view does when laying out and painting"""
+    model, delegate = view.model(), view.itemDelegate()
+    for row in range(model.rowCount()):
+        for column in range(model.columnCount()):
+            delegate.sizeHint(QStyleOptionViewItem(), model.index(row, column))
+
+
+def test_item_view_element_is_abstract():
+    with pytest.raises(TypeError):
+        NextPyItemViewElement(None)
+
+
+def test_cell_templates_render_once_per_row_version(engine):
+    with mount(Todos(template_engine=engine)) as harness:
+        view = harness.find(QTableView)[0]
+        measure_cells(view)
+        measure_cells(view)
+        harness.assert_renders(6, 'cell.html')
+
+        harness.reset_counts()
+        harness.component.set_state_in(['todos', 1, 'text'], 'changed')
+        measure_cells(view)
+        harness.assert_renders(2, 'cell.html')
+        assert view.itemDelegate()._document(view.model().index(1, 0), -1).toPlainText() == 'changed'
@@ -0,0 +1,66 @@
+import logging
+
+import pytest
+from PyQt6.QtWidgets import QLabel
+
+from component import NextPyComponent
+from template_analyzer import state_reads
+from template_engine import NextPyTemplate
+from testing import mount
+
+
+class Broken(NextPyComponent):
+    template_path = 'broken.html'
+
+
+@pytest.fixture
+def engine(tmp_path):
+    (tmp_path / 'broken.html').write_text(
+        '<QWidget>\n<QBlink>hi</QBlink>\n<QPushButton on_click="missing()">Go</QPushButton>\n</QWidget>'
+    )
+    return NextPyTemplate(str(tmp_path))
+
+
+def test_issues_are_logged_once_per_template(engine, caplog, capsys):
+    with caplog.at_level(logging.WARNING):
+        with mount(Broken(template_engine=engine)) as harness:
+            harness.set_state({'renders': 2})
+        with mount(Broken(template_engine=engine)):
+            pass
+
+    messages = [record.getMessage() for record in caplog.records]
+    assert sum('qblink' in message for message in messages) == 1
+    assert sum('missing' in message for message in messages) == 1
+    assert capsys.readouterr().out == ''
+
+
+class StateMethods(NextPyComponent):
+    template_path = 'state_methods.html'
+    immutable_state = True
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.state = {'count': 1, 'other': 0}
+
+
+def test_state_read_through_methods_rerenders(tmp_path):
+    (tmp_path / 'state_methods.html').write_text(
+        '<QWidget>\n'
+        '<QLabel>get={{ state.get("count") }}</QLabel>\n'
+        '{% for key, value in state.items() %}<QLabel>{{ key }}={{ value }}</QLabel>{% endfor %}\n'
+        '</QWidget>'
+    )
+    engine = NextPyTemplate(str(tmp_path))
+
+    with mount(StateMethods(template_engine=engine)) as harness:
+        harness.set_state({'count': 2})
+        texts = [label.text() for label in harness.find(QLabel)]
+
+    assert texts == ['get=2', 'count=2', 'other=0']
+
+
+def test_state_get_reads_only_its_key(engine):
+    paths = set()
+    state_reads(engine.env.parse('{{ state.get("count", state.fallback) }} {{ state.todos.items() }}'), paths)
+
+    assert paths == {('count',), ('fallback',), ('todos',)}
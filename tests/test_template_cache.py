@@ -0,0 +1,43 @@
+import pytest
+
+from app import TodoApp
+from template_cache import disable_template_cache, enable_template_cache
+from testing import mount
+
+
+@pytest.fixture
+def cache(tmp_path):
+    cache = enable_template_cache(str(tmp_path))
+    yield cache
+    disable_template_cache()
+
+
+def add_todo(harness, text):
+    harness.type_text(text)
+    harness.click('Add')
+
+
+def test_rerenders_do_not_grow_the_cache(cache, template_engine):
+    with mount(TodoApp(template_engine=template_engine)) as harness:
+        add_todo(harness, 'milk')
+        cache.save()
+        entries = len(cache._entries())
+
+        for text in ('m', 'mi', 'mil'):
+            harness.type_text(text)
+        harness.call('update_todo_status', 0, True)
+        harness.call('update_todo_status', 0, False)
+
+        assert len(cache._entries()) == entries
+        assert not cache._dirty
+
+
+def test_first_renders_are_read_back_on_the_next_launch(cache, template_engine):
+    with mount(TodoApp(template_engine=template_engine)):
+        pass
+    disable_template_cache()
+
+    next_launch = enable_template_cache(cache.directory)
+    with mount(TodoApp(template_engine=template_engine)):
+        pass
+    assert (next_launch.hits, next_launch.misses) == (1, 0)
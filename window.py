@@ -1,17 +1,44 @@
+import weakref
+
 from PyQt6.QtCore import Qt
 from PyQt6.QtGui import QPalette, QColor
 from PyQt6.QtWidgets import QVBoxLayout, QWidget, QMainWindow
 
+from elements import parse_stylesheet
+from image_elements import pixmap_cache_stats
+from metrics import NextPyMetrics, NextPyMetricsServer
+from snapshot import restore_component
+from template_cache import template_cache
+
 
 class NextPyWindow(QMainWindow):
     """Main window that hosts the root component"""
 
-    def __init__(self, root_component, router, title="NextPy App", width=800, height=600, background_color="#222222", text_color="#d2d1d0"):
+    def __init__(self, root_component, router, title="NextPy App", width=800, height=600, background_color="#222222", text_color="#d2d1d0", time_sliced=False, route=None):
+        """
+        Constructor for NextPyWindow
+        :param root_component: the component shown first
+        :param router: the router used by navigate_to
+        :param route: the route name of root_component, its metrics are recorded under it
+        """
         super().__init__()
 
+        # Build large component trees over several event loop ticks instead of blocking
+        self.time_sliced = time_sliced
+
         # setup router
         self.router = router
 
+        # Render metrics, per route. Served with serve_metrics
+        self.metrics = NextPyMetrics()
+        self.metrics.register_cache('styles', lambda: parse_stylesheet.cache_info()[:2])
+        self.metrics.register_cache('templates', self._template_cache_stats)
+        self.metrics.register_cache('parsed_templates', self._parsed_template_cache_stats)
+        self.metrics.register_cache('pixmaps', pixmap_cache_stats)
+        self.metrics_server = None
+        # The template engines of every route shown, their lookups are summed in the templates cache metrics
+        self._template_engines = weakref.WeakSet()
+
         # Set up the window
         self.setWindowTitle(title)
         self.setGeometry(50, 50, width, height)
@@ -41,19 +68,58 @@ class NextPyWindow(QMainWindow):
         self.root_component = root_component
         self.root_component.set_window(self)  # Allow component to trigger window updates
 
+        self._set_route(route, root_component)
+
         # Initial render
         self.render()
 
-    def set_current_component(self, component):
+    def set_current_component(self, component, route=None):
         """Set a new root component and re-render the window"""
+        if self.root_component is not component:
+            self.root_component.unmount()
         self.root_component = component
         self.root_component.set_window(self)
+        self._set_route(route, component)
         self.render()
 
+    def _set_route(self, route, component):
+        """Record the following renders under the route, the component class name when it has none"""
+        if hasattr(component.template_engine, 'cache_hits'):
+            self._template_engines.add(component.template_engine)
+        self.metrics.set_route(route or type(component).__name__, component)
+
+    def _template_cache_stats(self):
+        engines = list(self._template_engines)
+        return sum(engine.cache_hits for engine in engines), sum(engine.cache_misses for engine in engines)
+
+    @staticmethod
+    def _parsed_template_cache_stats():
+        cache = template_cache()
+        return (cache.hits, cache.misses) if cache is not None else (0, 0)
+
     def navigate_to(self, route_name, **kwargs):
         """Use the router to navigate and update the window's current component"""
         new_component = self.router.navigate(route_name, **kwargs)
-        self.set_current_component(new_component)
+        self.set_current_component(new_component, route=route_name)
+
+    def serve_metrics(self, port=None, unix_socket=None):
+        """
+        Serve the render metrics in the Prometheus text format, see NextPyMetricsServer
+        e.g. window.serve_metrics(port=9464), then curl http://127.0.0.1:9464/metrics
+        """
+        if self.metrics_server is not None:
+            self.metrics_server.close()
+        self.metrics_server = NextPyMetricsServer(self.metrics, port=port, unix_socket=unix_socket, parent=self)
+        return self.metrics_server
+
+    def snapshot(self, include_vnodes=True):
+        """Snapshot the current component tree, see NextPyComponent.snapshot"""
+        return self.root_component.snapshot(include_vnodes=include_vnodes)
+
+    def restore(self, snapshot):
+        """Replace the current component with one restored from a snapshot"""
+        component = restore_component(snapshot, template_engine=self.root_component.template_engine)
+        self.set_current_component(component)
 
     def render(self):
         """Render or update the root component"""
@@ -64,11 +130,14 @@ class NextPyWindow(QMainWindow):
                 item.widget().deleteLater()
 
         # Render root component
-        root_widget = self.root_component.render()
+        if self.time_sliced:
+            root_widget = self.root_component.render_sliced()
+        else:
+            root_widget = self.root_component.render()
 
         self.layout.addWidget(root_widget)
 
 
     def rerender(self):
-        """Rerender the window - called by components when needed"""
-        self.render()
\ No newline at end of file
+        """Rerender the window in place - called by components when needed"""
+        self.root_component.renderer.rerender_component()
\ No newline at end of file